@@ -0,0 +1,128 @@
+"""Command line entry point, `python -m pylox <command>`."""
+import argparse
+import sys
+import time
+
+from typing import List
+
+from pylox.check import checkFiles, findSources, printReports
+from pylox.diagnostics import Diagnostics
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import resolve
+from pylox.runtime import LoxRuntimeError
+from pylox.scanner import Scanner
+from pylox.stats import Stats
+
+
+def check(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    reports = checkFiles(findSources(args.paths), args.jobs,
+                         args.stats is not None, args.max_errors)
+    printReports(reports, time.perf_counter() - start, args.verbose,
+                 args.format)
+
+    if args.stats is not None:
+        stats = Stats()
+        for report in reports:
+            stats.merge(report.stats)
+
+        if args.stats == "-":
+            print(stats.toJson())
+        else:
+            with open(args.stats, "w") as f:
+                f.write(stats.toJson())
+
+    return 1 if any(report.diagnostics for report in reports) else 0
+
+
+def execute(args: argparse.Namespace) -> int:
+    """Exit status 65 for errors found before running, 70 for runtime
+    errors"""
+    try:
+        with open(args.path) as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"{args.path}: cannot read file: {e}", file=sys.stderr)
+        return 66
+
+    diagnostics = Diagnostics()
+    statements = Parser(list(Scanner.scanBuffer(text)), args.path,
+                        diagnostics=diagnostics).parseProgram()
+    if not diagnostics:
+        resolution = resolve(statements, args.path, diagnostics)
+    if diagnostics:
+        diagnostics.render()
+        return 65
+
+    try:
+        Interpreter().run(statements, resolution)
+    except LoxRuntimeError as e:
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 70
+    return 0
+
+
+def startServer(args: argparse.Namespace) -> int:
+    # Imported here so the other commands don't pay for asyncio
+    from pylox.client import defaultSocket
+    from pylox.server import AstCache, serve
+
+    path = args.socket or defaultSocket()
+    try:
+        serve(path, AstCache(args.cache_size))
+    except OSError as e:
+        print(f"pylox: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="pylox")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    checker = commands.add_parser(
+        "check", help="report syntax errors in .lox files")
+    checker.add_argument(
+        "paths", nargs="+", help="directories to search and files to check")
+    checker.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="worker processes, defaults to the number of CPUs")
+    checker.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="print every file with its timing")
+    checker.add_argument(
+        "--format", choices=("human", "json"), default="human",
+        help="print diagnostics for people or as JSON lines for tools")
+    checker.add_argument(
+        "--max-errors", type=int, default=None, metavar="N",
+        help="stop checking a file after N errors")
+    checker.add_argument(
+        "--stats", metavar="FILE",
+        help="write phase, token and grammar rule statistics as JSON to "
+             "FILE, - for stdout")
+    checker.set_defaults(run=check)
+
+    runner = commands.add_parser("run", help="run a .lox program")
+    runner.add_argument("path")
+    runner.set_defaults(run=execute)
+
+    server = commands.add_parser(
+        "serve", help="answer pylox.client requests until shut down")
+    server.add_argument(
+        "--socket", default=None,
+        help="socket to listen on, defaults to $PYLOX_SOCKET or one per user "
+             "in the temporary directory")
+    server.add_argument(
+        "--cache-size", type=int, default=4096, metavar="N",
+        help="parsed files to keep in memory")
+    server.set_defaults(run=startServer)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+import enum
+
+from array import array
+from typing import Iterable, List, Optional
+
+from pylox.parser import Assign, BinaryOp, BlockStmt, Bool, Call, ClassStmt, \
+    Constant, ExpressionStmt, FunctionStmt, Get, IfStmt, Logical, Nil, Node, \
+    PrintStmt, ReturnStmt, Set, String, Super, This, UnaryOp, Variable, \
+    VarStmt, WhileStmt
+from pylox.token import TOKEN_CODES, TOKEN_TYPES
+from pylox.traverse import fold
+
+
+class NodeKind(enum.IntEnum):
+    CONSTANT = 0
+    BOOL = 1
+    STRING = 2
+    NIL = 3
+    BINARY = 4
+    UNARY = 5
+    # Everything below only turns up in programs
+    LOGICAL = 6
+    VARIABLE = 7
+    ASSIGN = 8
+    CALL = 9
+    GET = 10
+    SET = 11
+    THIS = 12
+    SUPER = 13
+    EXPRESSION = 14
+    PRINT = 15
+    VAR = 16
+    BLOCK = 17
+    IF = 18
+    WHILE = 19
+    RETURN = 20
+    FUNCTION = 21
+    CLASS = 22
+
+
+# Index used for a missing child or literal
+NO_NODE = -1
+
+_KINDS = {
+    Constant: NodeKind.CONSTANT,
+    Bool: NodeKind.BOOL,
+    String: NodeKind.STRING,
+    Nil: NodeKind.NIL,
+    BinaryOp: NodeKind.BINARY,
+    UnaryOp: NodeKind.UNARY,
+    Logical: NodeKind.LOGICAL,
+    Variable: NodeKind.VARIABLE,
+    Assign: NodeKind.ASSIGN,
+    Call: NodeKind.CALL,
+    Get: NodeKind.GET,
+    Set: NodeKind.SET,
+    This: NodeKind.THIS,
+    Super: NodeKind.SUPER,
+    ExpressionStmt: NodeKind.EXPRESSION,
+    PrintStmt: NodeKind.PRINT,
+    VarStmt: NodeKind.VAR,
+    BlockStmt: NodeKind.BLOCK,
+    IfStmt: NodeKind.IF,
+    WhileStmt: NodeKind.WHILE,
+    ReturnStmt: NodeKind.RETURN,
+    FunctionStmt: NodeKind.FUNCTION,
+    ClassStmt: NodeKind.CLASS,
+}
+
+# Kinds without children
+_LEAVES = {NodeKind.CONSTANT, NodeKind.BOOL, NodeKind.STRING, NodeKind.NIL,
+           NodeKind.VARIABLE, NodeKind.THIS, NodeKind.SUPER}
+
+_LITERALS = {
+    NodeKind.CONSTANT: Constant,
+    NodeKind.BOOL: Bool,
+    NodeKind.STRING: String,
+}
+
+
+def _symbol(symbol: Optional[int]) -> int:
+    return NO_NODE if symbol is None else symbol
+
+
+class Arena:
+    """Flat AST where nodes are rows of parallel arrays.
+
+    Trees are stored in post-order, so children always come before their
+    parent and a whole tree occupies a contiguous range ending at its root.
+    Bulk passes can run straight over the arrays in index order without
+    recursion or pointer chasing. Unary nodes only use `rights`, literal
+    values are deduplicated into `literals` and `lines` is only meaningful
+    for nodes that have a line.
+
+    Statements and the expressions only found in programs are rows too.
+    Names are stored in `literals` like strings. What doesn't fit in a row,
+    such as a name along with its symbol or a list of children, goes in
+    `extra` and the row's `values` entry is where it starts:
+
+        VARIABLE, ASSIGN, VAR  name, symbol
+        CALL, BLOCK            count, child...
+        FUNCTION               name, symbol, count, param..., count, child...
+        CLASS                  name, symbol, count, method...
+
+    The superclass of a class is its `lefts` entry, the else branch of an
+    if its `values` entry. Everything else uses `lefts` and `rights` in the
+    order of the node's children, and `values` for a name.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.ops = array("B")
+        self.lefts = array("i")
+        self.rights = array("i")
+        self.values = array("i")
+        self.lines = array("I")
+        self.literals = []
+        self.roots = array("i")
+        self.extra = array("i")
+        self.__literal_index = {}
+
+    @classmethod
+    def fromExprs(cls, nodes: Iterable[Node]) -> "Arena":
+        """Expressions, or statements as returned by Parser.parseProgram()"""
+        arena = cls()
+        for node in nodes:
+            arena.add(node)
+
+        return arena
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add(self, node: Node) -> int:
+        """Appends a tree and returns the index of its root"""
+        root = fold(node, self.__append)
+        self.roots.append(root)
+        return root
+
+    def __append(self, node: Node, children: List[int]) -> int:
+        kind = _KINDS[type(node)]
+        op = line = 0
+        left = right = value = NO_NODE
+
+        if kind == NodeKind.BINARY or kind == NodeKind.LOGICAL:
+            op = TOKEN_CODES[node._op]
+            line = node.line
+            left, right = children
+        elif kind == NodeKind.UNARY:
+            op = TOKEN_CODES[node._op]
+            line = node.line
+            right = children[0]
+        elif kind > NodeKind.LOGICAL:
+            line = getattr(node, "line", 0)
+            left, right, value = self.__compound(kind, node, children)
+        elif kind != NodeKind.NIL:
+            value = self.__literal(kind, node.value)
+
+        self.kinds.append(kind)
+        self.ops.append(op)
+        self.lefts.append(left)
+        self.rights.append(right)
+        self.values.append(value)
+        self.lines.append(line)
+
+        return len(self.kinds) - 1
+
+    def __literal(self, kind: NodeKind, value) -> int:
+        # repr keeps -0.0 apart from 0.0, which compare equal
+        key = (kind, repr(value))
+        index = self.__literal_index.get(key)
+        if index is None:
+            index = self.__literal_index[key] = len(self.literals)
+            self.literals.append(value)
+        return index
+
+    def __compound(self, kind: NodeKind, node: Node,
+                   children: List[int]) -> tuple:
+        """(left, right, value) of the row of a program only node, filling
+        in `extra` where it needs it"""
+        left = right = value = NO_NODE
+        extra = self.extra
+        start = len(extra)
+        if kind == NodeKind.GET or kind == NodeKind.SET:
+            left, *rest = children
+            right = rest[0] if rest else NO_NODE
+            value = self.__literal(NodeKind.STRING, node._name)
+        elif kind == NodeKind.SUPER:
+            value = self.__literal(NodeKind.STRING, node._method)
+        elif kind == NodeKind.IF:
+            left, right, *otherwise = children
+            value = otherwise[0] if otherwise else NO_NODE
+        elif kind in (NodeKind.WHILE, NodeKind.CALL):
+            left = children[0]
+            if kind == NodeKind.WHILE:
+                right = children[1]
+            else:
+                value = start
+                extra.append(len(children) - 1)
+                extra.extend(children[1:])
+        elif kind == NodeKind.BLOCK:
+            value = start
+            extra.append(len(children))
+            extra.extend(children)
+        elif kind in (NodeKind.FUNCTION, NodeKind.CLASS):
+            value = start
+            extra.append(self.__literal(NodeKind.STRING, node._name))
+            extra.append(_symbol(node._symbol))
+            if kind == NodeKind.FUNCTION:
+                extra.append(len(node._params))
+                extra.extend(self.__literal(NodeKind.STRING, param)
+                             for param in node._params)
+            elif node._superclass is not None:
+                left, *children = children
+            extra.append(len(children))
+            extra.extend(children)
+        elif kind in (NodeKind.VARIABLE, NodeKind.ASSIGN, NodeKind.VAR):
+            value = start
+            extra.append(self.__literal(NodeKind.STRING, node._name))
+            extra.append(_symbol(node._symbol))
+            if children:
+                right = children[0]
+        elif children:
+            # Expression, print and return statements
+            right = children[0]
+
+        return left, right, value
+
+    def __children(self, index: int) -> List[int]:
+        """Rows of the children of the node at `index`, in order"""
+        kind = self.kinds[index]
+        left, right = self.lefts[index], self.rights[index]
+        value, extra = self.values[index], self.extra
+        if kind == NodeKind.BLOCK or kind == NodeKind.CALL:
+            count = extra[value]
+            children = [left, *extra[value + 1:value + 1 + count]]
+        elif kind == NodeKind.FUNCTION or kind == NodeKind.CLASS:
+            if kind == NodeKind.FUNCTION:
+                value += extra[value + 2] + 1
+            count = extra[value + 2]
+            children = [left, *extra[value + 3:value + 3 + count]]
+        elif kind == NodeKind.IF:
+            children = [left, right, value]
+        elif kind in _LEAVES:
+            return []
+        else:
+            children = [left, right]
+        return [child for child in children if child != NO_NODE]
+
+    def toExpr(self, index: int) -> Node:
+        """Rebuilds the tree rooted at `index` as nodes"""
+        # The subtree starts at its first leaf
+        start = index
+        while True:
+            children = self.__children(start)
+            if not children:
+                break
+            start = children[0]
+
+        nodes = []
+        for idx in range(start, index + 1):
+            kind = self.kinds[idx]
+            if kind > NodeKind.UNARY:
+                node = self.__build(idx, nodes, start)
+            elif kind == NodeKind.BINARY:
+                node = BinaryOp(
+                    nodes[self.lefts[idx] - start],
+                    TOKEN_TYPES[self.ops[idx]],
+                    nodes[self.rights[idx] - start],
+                    self.lines[idx]
+                )
+            elif kind == NodeKind.UNARY:
+                node = UnaryOp(
+                    TOKEN_TYPES[self.ops[idx]],
+                    nodes[self.rights[idx] - start],
+                    self.lines[idx]
+                )
+            elif kind == NodeKind.NIL:
+                node = Nil()
+            else:
+                node = _LITERALS[kind](self.literals[self.values[idx]])
+            nodes.append(node)
+
+        return nodes[-1]
+
+    def __build(self, index: int, nodes: List[Node], start: int) -> Node:
+        """Program only node at `index`, its children found in `nodes`
+        shifted by `start`"""
+        kind = self.kinds[index]
+        left, right = self.lefts[index], self.rights[index]
+        value, line = self.values[index], self.lines[index]
+        literals, extra = self.literals, self.extra
+
+        def child(row: int) -> Optional[Node]:
+            return None if row == NO_NODE else nodes[row - start]
+
+        def sequence(at: int) -> List[Node]:
+            return [nodes[row - start]
+                    for row in extra[at + 1:at + 1 + extra[at]]]
+
+        if kind == NodeKind.LOGICAL:
+            return Logical(child(left), TOKEN_TYPES[self.ops[index]],
+                           child(right), line)
+        elif kind == NodeKind.GET:
+            return Get(child(left), literals[value], line)
+        elif kind == NodeKind.SET:
+            return Set(child(left), literals[value], child(right), line)
+        elif kind == NodeKind.THIS:
+            return This(line)
+        elif kind == NodeKind.SUPER:
+            return Super(literals[value], line)
+        elif kind == NodeKind.CALL:
+            return Call(child(left), tuple(sequence(value)), line)
+        elif kind == NodeKind.EXPRESSION:
+            return ExpressionStmt(child(right))
+        elif kind == NodeKind.PRINT:
+            return PrintStmt(child(right))
+        elif kind == NodeKind.BLOCK:
+            return BlockStmt(sequence(value))
+        elif kind == NodeKind.IF:
+            return IfStmt(child(left), child(right), child(value))
+        elif kind == NodeKind.WHILE:
+            return WhileStmt(child(left), child(right))
+        elif kind == NodeKind.RETURN:
+            return ReturnStmt(child(right), line)
+
+        name, symbol = literals[extra[value]], extra[value + 1]
+        symbol = None if symbol == NO_NODE else symbol
+        if kind == NodeKind.VARIABLE:
+            return Variable(name, symbol, line)
+        elif kind == NodeKind.ASSIGN:
+            return Assign(name, symbol, child(right), line)
+        elif kind == NodeKind.VAR:
+            return VarStmt(name, symbol, child(right), line)
+        elif kind == NodeKind.FUNCTION:
+            count = extra[value + 2]
+            params = tuple(literals[param]
+                           for param in extra[value + 3:value + 3 + count])
+            return FunctionStmt(name, symbol, params,
+                                sequence(value + 3 + count), line)
+        return ClassStmt(name, symbol, child(left), sequence(value + 2),
+                         line)
+
+    def toExprs(self) -> List[Node]:
+        """Rebuilds every tree in one pass over the arrays"""
+        nodes = []
+        append = nodes.append
+        literals = self.literals
+        # Plain ints, comparing IntEnum members is far slower
+        binary, unary, nil = int(NodeKind.BINARY), int(NodeKind.UNARY), \
+            int(NodeKind.NIL)
+        constant, string = int(NodeKind.CONSTANT), int(NodeKind.STRING)
+        boolean = int(NodeKind.BOOL)
+        build = self.__build
+
+        for kind, op, left, right, value, line in zip(
+                self.kinds, self.ops, self.lefts, self.rights, self.values,
+                self.lines):
+            if kind == binary:
+                append(BinaryOp(nodes[left], TOKEN_TYPES[op], nodes[right],
+                                line))
+            elif kind == constant:
+                append(Constant(literals[value]))
+            elif kind == unary:
+                append(UnaryOp(TOKEN_TYPES[op], nodes[right], line))
+            elif kind == string:
+                append(String(literals[value]))
+            elif kind == nil:
+                append(Nil())
+            elif kind == boolean:
+                append(Bool(literals[value]))
+            else:
+                append(build(len(nodes), nodes, 0))
+
+        return [nodes[root] for root in self.roots]
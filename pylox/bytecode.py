@@ -0,0 +1,180 @@
+"""Bytecode for the stack VM.
+
+A chunk is a flat byte string of instructions. Each instruction is an
+opcode byte, CONSTANT takes a one byte index into the constant pool and
+CONSTANT_LONG a three byte little endian one. GET_GLOBAL takes a three
+byte index of the variable's name in the pool. Every expression statement
+leaves its value on the stack and RESULT hands it to the caller.
+"""
+import bisect
+import enum
+
+from array import array
+from typing import Iterable, List
+
+from pylox.parser import BinaryOp, Bool, Expr, Nil, UnaryOp, Variable
+from pylox.token import TokenType
+from pylox.traverse import fold
+
+
+class OpCode(enum.IntEnum):
+    CONSTANT = 0
+    CONSTANT_LONG = 1
+    NIL = 2
+    TRUE = 3
+    FALSE = 4
+    NEGATE = 5
+    NOT = 6
+    ADD = 7
+    SUBTRACT = 8
+    MULTIPLY = 9
+    DIVIDE = 10
+    GREATER = 11
+    GREATER_EQUAL = 12
+    LESS = 13
+    LESS_EQUAL = 14
+    EQUAL = 15
+    NOT_EQUAL = 16
+    RESULT = 17
+    RETURN = 18
+    GET_GLOBAL = 19
+
+
+_BINARY = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.GREATER_THAN: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS_THAN: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.EXCLAIMATION_EQUAL: OpCode.NOT_EQUAL,
+}
+
+_UNARY = {
+    TokenType.MINUS: OpCode.NEGATE,
+    TokenType.EXCLAIMATION: OpCode.NOT,
+}
+
+# Largest pool index CONSTANT can encode before CONSTANT_LONG is needed
+_SHORT_CONSTANTS = 0xff
+
+
+class Chunk:
+    """Compiled code along with its constant pool and line table.
+
+    Constants are deduplicated, so a literal repeated throughout a program is
+    stored once. The line table is run length encoded: `line_starts` holds
+    the offset where each run of instructions from the same line begins and
+    `line_numbers` that line, which is a handful of entries per source line
+    instead of one per byte.
+    """
+
+    def __init__(self) -> None:
+        self.code = array("B")
+        self.constants = []
+        self.line_starts = array("I")
+        self.line_numbers = array("I")
+        self.__constant_index = {}
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def write(self, op: OpCode, line: int) -> None:
+        if not self.line_numbers or self.line_numbers[-1] != line:
+            self.line_starts.append(len(self.code))
+            self.line_numbers.append(line)
+        self.code.append(op)
+
+    def writeConstant(self, value, line: int) -> None:
+        index = self.addConstant(value)
+        if index <= _SHORT_CONSTANTS:
+            self.write(OpCode.CONSTANT, line)
+            self.code.append(index)
+        else:
+            self.write(OpCode.CONSTANT_LONG, line)
+            self.code.extend(index.to_bytes(3, "little"))
+
+    def addConstant(self, value) -> int:
+        # repr tells 0.0 from -0.0 and 1.0 from True, which == doesn't
+        key = (type(value), repr(value))
+        index = self.__constant_index.get(key)
+        if index is None:
+            index = self.__constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def getLine(self, offset: int) -> int:
+        """Source line of the instruction at `offset`"""
+        run = bisect.bisect_right(self.line_starts, offset) - 1
+        return self.line_numbers[run]
+
+
+def compileExprs(nodes: Iterable[Expr]) -> Chunk:
+    """Compiles expression statements into a single chunk, running it yields
+    each statement's value in order"""
+    chunk = Chunk()
+    # Literals carry no line, they take the line of the statement or of the
+    # operator emitted before them
+    line = 0
+
+    def emit(node: Expr, _) -> None:
+        nonlocal line
+        if isinstance(node, BinaryOp):
+            line = node.line
+            chunk.write(_BINARY[node._op], line)
+        elif isinstance(node, UnaryOp):
+            line = node.line
+            chunk.write(_UNARY[node._op], line)
+        elif isinstance(node, Bool):
+            chunk.write(OpCode.TRUE if node.value else OpCode.FALSE, line)
+        elif isinstance(node, Nil):
+            chunk.write(OpCode.NIL, line)
+        elif isinstance(node, Variable):
+            line = node.line
+            chunk.write(OpCode.GET_GLOBAL, line)
+            index = chunk.addConstant(node._name)
+            chunk.code.extend(index.to_bytes(3, "little"))
+        else:
+            chunk.writeConstant(node.value, line)
+
+    for node in nodes:
+        line = getattr(node, "line", line)
+        # Children are emitted before their parent, which is exactly the
+        # order a stack machine needs its operands in
+        fold(node, emit)
+        chunk.write(OpCode.RESULT, line)
+
+    chunk.write(OpCode.RETURN, line)
+    return chunk
+
+
+def disassemble(chunk: Chunk) -> List[str]:
+    """Human readable listing, one instruction per line"""
+    listing = []
+    offset = 0
+    previous = None
+    while offset < len(chunk.code):
+        op = OpCode(chunk.code[offset])
+        line = chunk.getLine(offset)
+        source = "   |" if line == previous else f"{line:4}"
+        previous = line
+
+        if op == OpCode.CONSTANT:
+            index = chunk.code[offset + 1]
+            size = 2
+        elif op in (OpCode.CONSTANT_LONG, OpCode.GET_GLOBAL):
+            index = int.from_bytes(chunk.code[offset + 1:offset + 4], "little")
+            size = 4
+        else:
+            listing.append(f"{offset:04} {source} {op.name}")
+            offset += 1
+            continue
+
+        listing.append(f"{offset:04} {source} {op.name:<16} {index:4} "
+                       f"{chunk.constants[index]!r}")
+        offset += size
+
+    return listing
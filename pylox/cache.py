@@ -0,0 +1,185 @@
+"""On-disk cache of scanned and parsed sources.
+
+Entries are content addressed: the file name is a hash of the source bytes,
+whether it was parsed as a program, the pylox version and the cache format,
+so an edited file or a new pylox simply looks up a different entry and
+stale ones age out of the LRU.
+"""
+import hashlib
+import io
+import marshal
+import os
+import sys
+import tempfile
+
+from typing import List, Optional, Tuple
+
+from pylox import __version__
+from pylox.arena import Arena
+from pylox.diagnostics import Diagnostics
+from pylox.parser import Node, Parser
+from pylox.scanner import Scanner
+from pylox.token import TokenBuffer
+
+# Bumped whenever the layout of an entry changes
+FORMAT = 4
+
+DEFAULT_DIRECTORY = "__loxcache__"
+DEFAULT_MAX_SIZE = 64 << 20
+
+_SUFFIX = ".loxcache"
+
+# Everything besides the source that decides what an entry contains. Arrays
+# are stored in native layout and marshal is versioned per interpreter.
+_SALT = f"pylox-{__version__}:{FORMAT}:{sys.implementation.cache_tag}:" \
+    f"{sys.byteorder}".encode()
+
+
+def _tokenArrays(tokens: TokenBuffer) -> tuple:
+    return tokens.types, tokens.starts, tokens.ends, tokens.lines
+
+
+def _arenaArrays(arena: Arena) -> tuple:
+    return (arena.kinds, arena.ops, arena.lefts, arena.rights, arena.values,
+            arena.lines, arena.roots, arena.extra)
+
+
+class Cache:
+    """Caches the TokenBuffer and AST of source files in a directory.
+
+    Entries hold the token arrays and the AST as an Arena, so loading one is
+    a handful of array copies instead of scanning and parsing, for programs
+    as well as expressions. Entries only hold arrays and plain values, so
+    loading one never runs code from the cache directory. Files with
+    parse errors are not cached, their errors are reported every time. The
+    directory is kept under `max_size` bytes by evicting the least recently
+    used entries, and entries are written to a temporary file and renamed
+    into place, so concurrent processes never see a partial one.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY,
+                 max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(source: bytes, program: bool = False) -> str:
+        salt = _SALT + b":program" if program else _SALT
+        return hashlib.sha256(salt + source).hexdigest()
+
+    def load(self, path: str,
+             program: bool = False) -> Tuple[TokenBuffer, List[Node]]:
+        """Tokens and AST of the file, from the cache when possible. The AST
+        is the file's expressions, or with `program` its statements."""
+        with open(path, "rb") as f:
+            source = f.read()
+
+        # Decode exactly like Scanner's open() does, newlines included
+        text = io.TextIOWrapper(io.BytesIO(source)).read()
+        entry = os.path.join(self.directory,
+                             self.key(source, program) + _SUFFIX)
+
+        cached = self.__read(entry, text)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        tokens = Scanner.scanBuffer(text)
+        diagnostics = Diagnostics()
+        parser = Parser(tokens, path, diagnostics=diagnostics)
+        nodes = parser.parseProgram() if program else parser.parse()
+
+        if diagnostics:
+            diagnostics.render()
+        else:
+            self.__write(entry, tokens, nodes)
+
+        return tokens, nodes
+
+    def clear(self) -> None:
+        for name in self.__entries():
+            self.__remove(name)
+
+    def __read(self, entry: str,
+               text: str) -> Optional[Tuple[TokenBuffer, List[Node]]]:
+        try:
+            with open(entry, "rb") as f:
+                data = marshal.load(f)
+            tokens = TokenBuffer(text)
+            # strict, a short entry raises instead of decoding to less
+            for target, raw in zip(_tokenArrays(tokens), data[:-1],
+                                   strict=True):
+                target.frombytes(raw)
+            tokens.internIdentifiers()
+            arena = Arena()
+            for target, raw in zip(_arenaArrays(arena), data[-1][:-1],
+                                   strict=True):
+                target.frombytes(raw)
+            arena.literals = data[-1][-1]
+            nodes = arena.toExprs()
+            # Reads count as uses for the LRU
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError, IndexError, KeyError):
+            # Corrupt or not written by this version, treat it like a miss
+            self.__remove(entry)
+            return None
+
+        return tokens, nodes
+
+    def __write(self, entry: str, tokens: TokenBuffer,
+                nodes: List[Node]) -> None:
+        arena = Arena.fromExprs(nodes)
+        ast = tuple(a.tobytes() for a in _arenaArrays(arena)) \
+            + (arena.literals,)
+        data = tuple(a.tobytes() for a in _tokenArrays(tokens)) + (ast,)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump(data, f)
+            os.replace(temp, entry)
+        except BaseException:
+            self.__remove(temp)
+            raise
+
+        self.__evict()
+
+    def __evict(self) -> None:
+        """Drops the least recently used entries until the directory fits"""
+        entries = []
+        for name in self.__entries():
+            try:
+                stat = os.stat(name)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        size = sum(size for _, size, _ in entries)
+        for _, entry_size, name in sorted(entries):
+            if size <= self.max_size:
+                break
+            self.__remove(name)
+            size -= entry_size
+
+    def __entries(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        return [os.path.join(self.directory, name) for name in names
+                if name.endswith(_SUFFIX)]
+
+    @staticmethod
+    def __remove(path: str) -> None:
+        # Another process may have evicted it first
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
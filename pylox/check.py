@@ -0,0 +1,140 @@
+"""Batch syntax checking of .lox files, spread over worker processes."""
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Iterable, List, Optional
+
+from pylox.diagnostics import Diagnostic, Diagnostics, renderHuman, \
+    renderJsonLines
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from pylox.stats import Stats
+
+# Files are sent to the workers in about this many batches per worker.
+# Bigger batches mean fewer messages, smaller ones balance uneven files.
+CHUNKS_PER_WORKER = 4
+
+
+class FileReport:
+    """Outcome of checking one file, small enough to send between
+    processes. `truncated` is set if checking stopped at the error cap."""
+
+    def __init__(self, path: str, diagnostics: List[Diagnostic],
+                 elapsed: float, tokens: int = 0, nodes: int = 0,
+                 stats: Optional[Stats] = None,
+                 truncated: bool = False) -> None:
+        self.path = path
+        self.diagnostics = diagnostics
+        self.truncated = truncated
+        self.elapsed = elapsed
+        self.tokens = tokens
+        self.nodes = nodes
+        self.stats = stats
+
+
+def findSources(paths: Iterable[str]) -> List[str]:
+    """Every .lox file under the given directories (files are taken as is),
+    sorted so reports come out in the same order every run"""
+    sources = set()
+    for path in paths:
+        if not os.path.isdir(path):
+            sources.add(path)
+            continue
+
+        for root, _, names in os.walk(path):
+            sources.update(os.path.join(root, name) for name in names
+                           if name.endswith(".lox"))
+
+    return sorted(sources)
+
+
+def _untimed(name: str) -> nullcontext:
+    return nullcontext()
+
+
+def checkFile(path: str, stats: bool = False,
+              max_errors: Optional[int] = None) -> FileReport:
+    """Scans and parses one file, collecting up to `max_errors` errors, and
+    with `stats` the per phase and per rule measurements of doing so"""
+    start = time.perf_counter()
+    diagnostics = Diagnostics(max_errors)
+    collected = Stats() if stats else None
+    phase = collected.phase if stats else _untimed
+    try:
+        with phase("read"):
+            with open(path) as f:
+                text = f.read()
+        with phase("scan"):
+            buffer = Scanner.scanBuffer(text)
+            tokens = list(buffer)
+        with phase("parse"):
+            nodes = Parser(tokens, path, diagnostics=diagnostics,
+                           stats=collected).parseProgram()
+    except (OSError, UnicodeDecodeError) as e:
+        diagnostic = Diagnostic(path, 0, 0, None, f"cannot read file: {e}")
+        return FileReport(path, [diagnostic], time.perf_counter() - start,
+                          stats=collected)
+    except (RecursionError, MemoryError) as e:
+        # Input too deep or too big for the parser, the rest of the batch
+        # still gets checked; anything else is a bug and propagates
+        diagnostic = Diagnostic(path, 0, 0, None,
+                                f"cannot check file: {e!r}")
+        return FileReport(path, [diagnostic], time.perf_counter() - start,
+                          stats=collected)
+
+    if stats:
+        collected.files = 1
+        collected.countTokens(buffer.types)
+
+    return FileReport(path, diagnostics.records, time.perf_counter() - start,
+                      len(tokens), len(nodes), collected, diagnostics.full)
+
+
+def checkFiles(paths: List[str], jobs: Optional[int] = None,
+               stats: bool = False,
+               max_errors: Optional[int] = None) -> List[FileReport]:
+    """Reports for every path, in the order given.
+
+    Files are distributed over `jobs` processes (one per CPU by default) in
+    chunks, so each worker gets a batch of files per message instead of one.
+    With a single job everything runs in this process.
+    """
+    check = partial(checkFile, stats=stats, max_errors=max_errors)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) <= 1:
+        return [check(path) for path in paths]
+
+    chunksize = max(1, len(paths) // (jobs * CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(jobs) as pool:
+        return list(pool.map(check, paths, chunksize=chunksize))
+
+
+def printReports(reports: List[FileReport], elapsed: float,
+                 verbose: bool = False, format: str = "human") -> None:
+    """Diagnostics in file order, per file timings when verbose, and a
+    summary line. The json format prints nothing but the diagnostics, one
+    JSON object per line."""
+    if format == "json":
+        for report in reports:
+            print(renderJsonLines(report.diagnostics, report.truncated),
+                  end="")
+        return
+
+    for report in reports:
+        if verbose:
+            status = f"{len(report.diagnostics)} errors" \
+                if report.diagnostics else "ok"
+            print(f"{report.path}: {status} ({report.elapsed * 1000:.1f}ms, "
+                  f"{report.tokens} tokens, {report.nodes} statements)")
+
+        print(renderHuman(report.diagnostics, truncated=report.truncated),
+              end="")
+
+    errors = sum(len(report.diagnostics) for report in reports)
+    failed = sum(1 for report in reports if report.diagnostics)
+    busy = sum(report.elapsed for report in reports)
+    print(f"checked {len(reports)} files: {errors} errors in {failed} files, "
+          f"{elapsed:.3f}s total ({busy:.3f}s in files)")
@@ -0,0 +1,91 @@
+"""Thin command line client of the pylox server, `python -m pylox.client`.
+
+Forwards check, parse and dump requests to a server started with
+`python -m pylox serve`, and runs them in this process when none is
+listening, with the same output either way. It imports nothing from pylox
+unless it has to fall back, so a request to a running server costs little
+more than starting Python.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+from typing import List, Optional
+
+# Seconds to wait for a server to answer before running the request here
+TIMEOUT = 60.0
+
+
+def defaultSocket() -> str:
+    """$PYLOX_SOCKET, or a socket per user in the temporary directory"""
+    path = os.environ.get("PYLOX_SOCKET")
+    if path:
+        return path
+    directory = os.environ.get("TMPDIR", "/tmp")
+    return os.path.join(directory, f"pylox-{os.getuid()}.sock")
+
+
+def request(message: dict, path: str,
+            timeout: Optional[float] = TIMEOUT) -> Optional[dict]:
+    """The server's response, or None if no server answered within
+    `timeout` seconds"""
+    connection = socket.socket(socket.AF_UNIX)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(path)
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        with connection.makefile("rb") as reply:
+            line = reply.readline()
+    except OSError:
+        return None
+    finally:
+        connection.close()
+
+    return json.loads(line) if line else None
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="pylox.client")
+    parser.add_argument(
+        "--socket", default=None,
+        help="server socket, defaults to $PYLOX_SOCKET or one per user in "
+             "the temporary directory")
+    parser.add_argument(
+        "--local", action="store_true",
+        help="run in this process without asking the server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command, help in (("check", "report syntax errors"),
+                          ("parse", "count statements and tokens"),
+                          ("dump", "print the AST")):
+        files = commands.add_parser(command, help=help)
+        files.add_argument("paths", nargs="+")
+        files.add_argument("--format", choices=("human", "json"),
+                           default="human", help="how to print diagnostics")
+    commands.add_parser("shutdown", help="stop the server")
+
+    args = parser.parse_args(argv)
+    message = {"command": args.command}
+    if args.command != "shutdown":
+        # The server may have been started somewhere else
+        message["paths"] = [os.path.abspath(path) for path in args.paths]
+        message["format"] = args.format
+
+    path = args.socket or defaultSocket()
+    response = None if args.local else request(message, path)
+    if response is None:
+        if args.command == "shutdown":
+            print(f"pylox: no server on {path}", file=sys.stderr)
+            return 1
+
+        from pylox.server import AstCache, handle
+        response = handle(message, AstCache())
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Structured error reporting.
+
+Errors are collected as Diagnostic records while parsing and rendered once
+at the end, either for people or as JSON lines for tools, instead of being
+written out one by one as they are found.
+"""
+import json
+import sys
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+RED = "\x1b[1;31m"
+RESET = "\x1b[0m"
+
+
+class Diagnostic:
+    # Lines and columns are 0 based, like everywhere else in pylox. The
+    # lexeme is "" at the end of the file and None for errors that aren't
+    # about a token, such as a file that can't be read.
+    __slots__ = ("filename", "line", "column", "lexeme", "message")
+
+    def __init__(self, filename: Optional[str], line: int, column: int,
+                 lexeme: Optional[str], message: str) -> None:
+        self.filename = filename
+        self.line = line
+        self.column = column
+        self.lexeme = lexeme
+        self.message = message
+
+    @property
+    def location(self) -> str:
+        where = f"{self.line}:{self.column}"
+        return f"{self.filename}:{where}" if self.filename else where
+
+    @property
+    def text(self) -> str:
+        """The message and what it was found at"""
+        if self.lexeme is None:
+            return f"error: {self.message}"
+        at = f"'{self.lexeme}'" if self.lexeme else "end"
+        return f"error at {at}: {self.message}"
+
+    def toDict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __str__(self):
+        return f"{self.location}: {self.text}"
+
+
+class Diagnostics:
+    """Collects diagnostics, up to `max_errors` of them if given.
+
+    Whoever reports into it stops once it is full, so a badly broken file
+    costs no more than its first few errors."""
+
+    def __init__(self, max_errors: Optional[int] = None) -> None:
+        self.max_errors = max_errors
+        self.records: List[Diagnostic] = []
+
+    def report(self, diagnostic: Diagnostic) -> bool:
+        """Adds a diagnostic, returns False once no more are wanted"""
+        self.records.append(diagnostic)
+        return not self.full
+
+    @property
+    def full(self) -> bool:
+        return self.max_errors is not None \
+            and len(self.records) >= self.max_errors
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Diagnostic]:
+        return iter(self.records)
+
+    def render(self, format: str = "human", file: TextIO = None,
+               color: bool = None) -> None:
+        """Writes every diagnostic to `file` (stderr by default) in one go.
+        Human output is colored when writing to a terminal."""
+        file = file or sys.stderr
+        if format == "human":
+            if color is None:
+                color = file.isatty()
+            text = renderHuman(self, color)
+        else:
+            text = RENDERERS[format](self)
+
+        if text:
+            file.write(text)
+            file.flush()
+
+
+def _truncated(diagnostics: Iterable[Diagnostic],
+               truncated: Optional[bool]) -> bool:
+    """Whether collection stopped at the cap. Plain lists of records don't
+    know, so whoever collected them says."""
+    if truncated is None:
+        return isinstance(diagnostics, Diagnostics) and diagnostics.full
+    return truncated
+
+
+def renderHuman(diagnostics: Iterable[Diagnostic], color: bool = False,
+                truncated: Optional[bool] = None) -> str:
+    """One `file:line:column: error at 'x': message` line per diagnostic,
+    noting if collection stopped at the cap"""
+    start, end = (RED, RESET) if color else ("", "")
+    lines = [f"{start}{d.location}:{end} {d.text}\n" for d in diagnostics]
+
+    if _truncated(diagnostics, truncated):
+        lines.append(f"stopped after {len(lines)} errors\n")
+
+    return "".join(lines)
+
+
+def renderJsonLines(diagnostics: Iterable[Diagnostic],
+                    truncated: Optional[bool] = None) -> str:
+    """One JSON object per line per diagnostic, followed by
+    `{"filename": ..., "stopped_after": N}` if collection stopped at the
+    cap"""
+    records = [d.toDict() for d in diagnostics]
+    if _truncated(diagnostics, truncated) and records:
+        records.append({"filename": records[-1]["filename"],
+                        "stopped_after": len(records)})
+
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+RENDERERS: Dict[str, Callable[..., str]] = {
+    "human": renderHuman,
+    "json": renderJsonLines,
+}
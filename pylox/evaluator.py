@@ -0,0 +1,196 @@
+"""Expression evaluation.
+
+Two evaluators with the same semantics: `evaluate` walks the tree every time
+it runs, `compileExpr` walks it once and returns a closure that computes the
+value without looking at nodes, types or operators again. Variables are
+looked up in a `globals` mapping when the expression runs.
+"""
+from functools import partial
+from typing import Callable, Mapping, Optional
+
+from pylox.parser import BinaryOp, Expr, UnaryOp, Variable
+from pylox.runtime import (ADD_OPERANDS, BINARY_OPERATIONS, NUMBER_OPERAND,
+                           NUMBER_OPERANDS, UNARY_OPERATIONS,
+                           LoxRuntimeError, divide)
+from pylox.token import TokenType
+from pylox.traverse import fold
+
+
+def evaluate(node: Expr, globals: Optional[Mapping[str, object]] = None):
+    """Tree walking evaluation, iterative so any depth works"""
+    return fold(node, partial(_visit, {} if globals is None else globals))
+
+
+def _visit(globals: Mapping[str, object], node: Expr, values: list):
+    if isinstance(node, BinaryOp):
+        return BINARY_OPERATIONS[node._op](values[0], values[1], node.line)
+    elif isinstance(node, UnaryOp):
+        return UNARY_OPERATIONS[node._op](values[0], node.line)
+    elif isinstance(node, Variable):
+        return _lookup(globals, node._name, node.line)
+    return node.value
+
+
+def _lookup(globals: Mapping[str, object], name: str, line: int):
+    try:
+        return globals[name]
+    except KeyError:
+        raise LoxRuntimeError(f"Undefined variable '{name}'.", line) from None
+
+
+def compileExpr(node: Expr, globals: Optional[Mapping[str, object]] = None
+                ) -> Callable[[], object]:
+    """Compiles the tree into a closure returning its value.
+
+    Each node becomes one closure specialized for its operator, so running it
+    costs a Python call per node and nothing else. Compiling is iterative,
+    but the closures call into each other, so running one recurses as deep
+    as the tree is; use `evaluate` for trees close to the recursion limit.
+    Variables are read from `globals` every time the closure runs.
+    """
+    return fold(node, partial(_compile, {} if globals is None else globals))
+
+
+def _compile(globals: Mapping[str, object], node: Expr,
+             children: list) -> Callable[[], object]:
+    if isinstance(node, BinaryOp):
+        return _COMPILE_BINARY[node._op](children[0], children[1], node.line)
+    elif isinstance(node, UnaryOp):
+        return _COMPILE_UNARY[node._op](children[0], node.line)
+    elif isinstance(node, Variable):
+        name, line = node._name, node.line
+        return lambda: _lookup(globals, name, line)
+
+    value = node.value
+    return lambda: value
+
+
+def _compileNegate(right, line: int):
+    def negate():
+        value = right()
+        if type(value) is not float:
+            raise LoxRuntimeError(NUMBER_OPERAND, line)
+        return -value
+    return negate
+
+
+def _compileNot(right, line: int):
+    def not_():
+        value = right()
+        return value is None or value is False
+    return not_
+
+
+def _compileAdd(left, right, line: int):
+    def add():
+        a = left()
+        b = right()
+        if type(a) is type(b) and (type(a) is float or type(a) is str):
+            return a + b
+        raise LoxRuntimeError(ADD_OPERANDS, line)
+    return add
+
+
+def _compileSubtract(left, right, line: int):
+    def subtract():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a - b
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return subtract
+
+
+def _compileMultiply(left, right, line: int):
+    def multiply():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a * b
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return multiply
+
+
+def _compileDivide(left, right, line: int):
+    def divide_():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a / b if b else divide(a, b)
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return divide_
+
+
+def _compileGreater(left, right, line: int):
+    def greater():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a > b
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return greater
+
+
+def _compileGreaterEqual(left, right, line: int):
+    def greater_equal():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a >= b
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return greater_equal
+
+
+def _compileLess(left, right, line: int):
+    def less():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a < b
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return less
+
+
+def _compileLessEqual(left, right, line: int):
+    def less_equal():
+        a = left()
+        b = right()
+        if type(a) is float and type(b) is float:
+            return a <= b
+        raise LoxRuntimeError(NUMBER_OPERANDS, line)
+    return less_equal
+
+
+def _compileEqual(left, right, line: int):
+    def equal():
+        a = left()
+        b = right()
+        return type(a) is type(b) and a == b
+    return equal
+
+
+def _compileNotEqual(left, right, line: int):
+    def not_equal():
+        a = left()
+        b = right()
+        return type(a) is not type(b) or a != b
+    return not_equal
+
+
+_COMPILE_UNARY = {
+    TokenType.MINUS: _compileNegate,
+    TokenType.EXCLAIMATION: _compileNot,
+}
+
+_COMPILE_BINARY = {
+    TokenType.PLUS: _compileAdd,
+    TokenType.MINUS: _compileSubtract,
+    TokenType.STAR: _compileMultiply,
+    TokenType.SLASH: _compileDivide,
+    TokenType.GREATER_THAN: _compileGreater,
+    TokenType.GREATER_EQUAL: _compileGreaterEqual,
+    TokenType.LESS_THAN: _compileLess,
+    TokenType.LESS_EQUAL: _compileLessEqual,
+    TokenType.EQUAL_EQUAL: _compileEqual,
+    TokenType.EXCLAIMATION_EQUAL: _compileNotEqual,
+}
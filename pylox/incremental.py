@@ -0,0 +1,160 @@
+from itertools import chain
+from typing import Iterable, Iterator, List
+
+from pylox.parser import Expr, Parser
+from pylox.scanner import Scanner
+from pylox.symbols import SymbolTable
+from pylox.token import Token, TokenType
+
+
+class TextEdit:
+    """Replaces the text between two (line, column) positions, both zero
+    based, with new text. Edits in a batch are applied in order, each one in
+    the coordinates left behind by the previous one."""
+
+    def __init__(self, start_line: int, start_column: int,
+                 end_line: int, end_column: int, text: str) -> None:
+        self.start_line = start_line
+        self.start_column = start_column
+        self.end_line = end_line
+        self.end_column = end_column
+        self.text = text
+
+
+class Document:
+    """Source text kept together with its tokens and parsed expressions so
+    that edits only re-scan the touched lines and re-parse the top level
+    steps around them.
+
+    Tokens and step starts are stored per line. Inserting or removing lines
+    just splices those lists, so nothing after an edit is renumbered up
+    front; token lines are restamped when the tokens are handed out again.
+    """
+
+    def __init__(self, text: str, filename: str = None) -> None:
+        self.__filename = filename
+        # Shared by every rescan so identifiers keep their IDs across edits
+        self.__symbols = SymbolTable()
+        self.__lines = text.split("\n")
+        self.__tokens = [[] for _ in self.__lines]
+        self.__steps = [[] for _ in self.__lines]
+        # Successful expressions per line, kept alongside the steps so the
+        # whole AST can be flattened without touching every step
+        self.__nodes = [[] for _ in self.__lines]
+
+        for token in Scanner.scanText(text, 0, self.__symbols):
+            self.__tokens[token.line].append(token)
+
+        self.__reparse(0)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.__lines)
+
+    @property
+    def symbols(self) -> SymbolTable:
+        return self.__symbols
+
+    def getTokens(self) -> List[Token]:
+        return list(self.__window(0, 0))
+
+    def parse(self) -> List[Expr]:
+        return list(chain.from_iterable(self.__nodes))
+
+    def apply(self, edits: Iterable[TextEdit]) -> List[Expr]:
+        """Applies the edits and returns the updated expressions. Expressions
+        outside of the re-parsed region are the same objects as before."""
+        lo = hi = None
+
+        for edit in edits:
+            first, last = edit.start_line, edit.end_line
+            prefix = self.__lines[first][:edit.start_column]
+            suffix = self.__lines[last][edit.end_column:]
+            lines = f"{prefix}{edit.text}{suffix}".split("\n")
+
+            self.__lines[first:last + 1] = lines
+            self.__tokens[first:last + 1] = [
+                list(Scanner.scanText(line, first + idx, self.__symbols))
+                for idx, line in enumerate(lines)
+            ]
+            self.__steps[first:last + 1] = [[] for _ in lines]
+            self.__nodes[first:last + 1] = [[] for _ in lines]
+
+            # Track the span of rescanned lines in current coordinates
+            end = first + len(lines)
+            if lo is None:
+                lo, hi = first, end
+            else:
+                delta = len(lines) - (last - first + 1)
+                lo = min(lo, first)
+                hi = max(end, hi + delta) if hi > last + 1 else end
+
+        if lo is not None:
+            self.__reparse(lo, hi)
+
+        return self.parse()
+
+    def __lastLine(self) -> int:
+        """Line of the EOF token, as the scanner would number it"""
+        count = len(self.__lines)
+        if count > 1 and not self.__lines[-1]:
+            count -= 1
+
+        return count - 1
+
+    def __window(self, line: int, column: int,
+                 where: dict = None) -> Iterator[Token]:
+        """Yields tokens from a position on, restamping their lines and
+        recording in `where` the position each one came from"""
+        for idx in range(line, len(self.__tokens)):
+            tokens = self.__tokens[idx]
+            for col in range(column, len(tokens)):
+                token = tokens[col]
+                token.line = idx
+                if where is not None:
+                    where[id(token)] = (idx, col)
+                yield token
+            column = 0
+
+        yield Token(TokenType.EOF, "", self.__lastLine())
+
+    def __reparse(self, lo: int, hi: int = None) -> None:
+        """Re-parses from the last step that started before line `lo` until
+        parsing lines up with an old step at or after line `hi` again"""
+        # Find a step start before the first changed token
+        line, column = 0, 0
+        for idx in range(lo - 1, -1, -1):
+            if self.__steps[idx]:
+                line, column = idx, self.__steps[idx][-1][0]
+                break
+
+        where = {}
+        parser = Parser(self.__window(line, column, where), self.__filename)
+        steps = []
+        end = None
+
+        for token, node in parser._steps():
+            pos = where[id(token)]
+            if hi is not None and pos[0] >= hi and \
+                    any(col == pos[1] for col, _ in self.__steps[pos[0]]):
+                end = pos
+                break
+            steps.append((pos, node))
+
+        # Drop the old steps that were re-parsed and add the new ones
+        stop = len(self.__steps) - 1 if end is None else end[0]
+        for idx in range(line, stop + 1):
+            self.__steps[idx] = [
+                s for s in self.__steps[idx]
+                if (idx, s[0]) < (line, column) or
+                (end is not None and (idx, s[0]) >= end)
+            ]
+
+        for (idx, col), node in steps:
+            self.__steps[idx].append((col, node))
+
+        for idx in range(line, stop + 1):
+            self.__steps[idx].sort(key=lambda s: s[0])
+            self.__nodes[idx] = [
+                node for _, node in self.__steps[idx] if node is not None
+            ]
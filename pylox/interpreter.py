@@ -0,0 +1,570 @@
+"""Runs whole programs over resolved, slot indexed variables.
+
+The Compiler turns statements into closures once, like
+evaluator.compileExpr does for expressions, using the Resolution to pick
+how each variable is reached: a global by name, a local by its slot in the
+frame list of the running call, or a captured variable through a cell.
+Compiled code takes the frame and the cells captured by the running
+closure, statements return None or a 1-tuple holding a returned value.
+"""
+import operator
+import sys
+import time
+
+from typing import Callable, Dict, List, TextIO, Tuple
+
+from pylox.parser import Assign, BinaryOp, BlockStmt, Call, ClassStmt, \
+    Expr, ExpressionStmt, FunctionStmt, Get, IfStmt, Logical, Node, \
+    PrintStmt, ReturnStmt, Set, Stmt, Super, This, UnaryOp, Variable, \
+    VarStmt, WhileStmt
+from pylox.resolver import Binding, Resolution
+from pylox.runtime import ADD_OPERANDS, NUMBER_OPERAND, NUMBER_OPERANDS, \
+    LoxRuntimeError, divide, stringify
+from pylox.token import TokenType
+from pylox.visitor import Visitor
+
+
+class Cell:
+    """A variable shared between a frame and the closures capturing it"""
+    __slots__ = ("value",)
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+class Code:
+    """What every closure made from one function declaration shares"""
+    __slots__ = ("name", "arity", "body", "size", "cells", "offset",
+                 "padding", "initializer")
+
+    def __init__(self, name: str, arity: int, body: Callable, size: int,
+                 cells: Tuple[int, ...], offset: int,
+                 initializer: bool) -> None:
+        self.name = name
+        self.arity = arity
+        self.body = body
+        self.size = size
+        # Slots of parameters captured by nested functions
+        self.cells = cells
+        # Methods take `this` in slot 0, parameters start after it
+        self.offset = offset
+        # Slots after the parameters, for the locals
+        self.padding = (None,) * (size - offset - arity)
+        self.initializer = initializer
+
+
+class LoxFunction:
+    __slots__ = ("code", "free", "receiver")
+
+    def __init__(self, code: Code, free: Tuple[Cell, ...],
+                 receiver: "LoxInstance" = None) -> None:
+        self.code = code
+        self.free = free
+        self.receiver = receiver
+
+    @property
+    def arity(self) -> int:
+        return self.code.arity
+
+    def bind(self, instance: "LoxInstance") -> "LoxFunction":
+        return LoxFunction(self.code, self.free, instance)
+
+    def call(self, arguments: list, line: int):
+        """The argument list becomes the frame, callers pass a new one"""
+        code = self.code
+        if len(arguments) != code.arity:
+            raise LoxRuntimeError(f"Expected {code.arity} arguments but got "
+                                  f"{len(arguments)}.", line)
+
+        frame = arguments
+        if code.offset:
+            frame.insert(0, self.receiver)
+        frame += code.padding
+        for slot in code.cells:
+            frame[slot] = Cell(frame[slot])
+
+        result = code.body(frame, self.free)
+        if code.initializer:
+            return self.receiver
+        return None if result is None else result[0]
+
+    def __str__(self):
+        return f"<fn {self.code.name}>"
+
+
+class NativeFunction:
+    __slots__ = ("name", "arity", "fn")
+
+    def __init__(self, name: str, arity: int, fn: Callable) -> None:
+        self.name = name
+        self.arity = arity
+        self.fn = fn
+
+    def call(self, arguments: list, line: int):
+        if len(arguments) != self.arity:
+            raise LoxRuntimeError(f"Expected {self.arity} arguments but got "
+                                  f"{len(arguments)}.", line)
+        return self.fn(*arguments)
+
+    def __str__(self):
+        return "<native fn>"
+
+
+class LoxClass:
+    __slots__ = ("name", "superclass", "methods")
+
+    def __init__(self, name: str, superclass: "LoxClass",
+                 methods: Dict[str, LoxFunction]) -> None:
+        self.name = name
+        self.superclass = superclass
+        self.methods = methods
+
+    def findMethod(self, name: str) -> LoxFunction:
+        klass = self
+        while klass is not None:
+            method = klass.methods.get(name)
+            if method is not None:
+                return method
+            klass = klass.superclass
+        return None
+
+    @property
+    def arity(self) -> int:
+        init = self.findMethod("init")
+        return 0 if init is None else init.arity
+
+    def call(self, arguments: list, line: int):
+        instance = LoxInstance(self)
+        init = self.findMethod("init")
+        if init is not None:
+            init.bind(instance).call(arguments, line)
+        elif arguments:
+            raise LoxRuntimeError(
+                f"Expected 0 arguments but got {len(arguments)}.", line)
+        return instance
+
+    def __str__(self):
+        return self.name
+
+
+class LoxInstance:
+    __slots__ = ("klass", "fields")
+
+    def __init__(self, klass: LoxClass) -> None:
+        self.klass = klass
+        self.fields = {}
+
+    def get(self, name: str, line: int):
+        if name in self.fields:
+            return self.fields[name]
+
+        method = self.klass.findMethod(name)
+        if method is None:
+            raise LoxRuntimeError(f"Undefined property '{name}'.", line)
+        return method.bind(self)
+
+    def __str__(self):
+        return f"{self.klass.name} instance"
+
+
+_CALLABLES = (LoxFunction, LoxClass, NativeFunction)
+
+
+def _numeric(op: Callable) -> Callable:
+    """Compiler for a binary operator on two numbers"""
+    def compile(left, right, line: int):
+        def run(frame, free):
+            a = left(frame, free)
+            b = right(frame, free)
+            if type(a) is float and type(b) is float:
+                return op(a, b)
+            raise LoxRuntimeError(NUMBER_OPERANDS, line)
+        return run
+    return compile
+
+
+def _compileAdd(left, right, line: int):
+    def add(frame, free):
+        a = left(frame, free)
+        b = right(frame, free)
+        if type(a) is type(b) and (type(a) is float or type(a) is str):
+            return a + b
+        raise LoxRuntimeError(ADD_OPERANDS, line)
+    return add
+
+
+def _compileEqual(left, right, line: int):
+    def equal(frame, free):
+        a = left(frame, free)
+        b = right(frame, free)
+        return type(a) is type(b) and a == b
+    return equal
+
+
+def _compileNotEqual(left, right, line: int):
+    def not_equal(frame, free):
+        a = left(frame, free)
+        b = right(frame, free)
+        return type(a) is not type(b) or a != b
+    return not_equal
+
+
+_COMPILE_BINARY = {
+    TokenType.PLUS: _compileAdd,
+    TokenType.MINUS: _numeric(operator.sub),
+    TokenType.STAR: _numeric(operator.mul),
+    TokenType.SLASH: _numeric(divide),
+    TokenType.GREATER_THAN: _numeric(operator.gt),
+    TokenType.GREATER_EQUAL: _numeric(operator.ge),
+    TokenType.LESS_THAN: _numeric(operator.lt),
+    TokenType.LESS_EQUAL: _numeric(operator.le),
+    TokenType.EQUAL_EQUAL: _compileEqual,
+    TokenType.EXCLAIMATION_EQUAL: _compileNotEqual,
+}
+
+
+def _nil(frame, free):
+    return None
+
+
+def sequence(statements: List[Callable]) -> Callable:
+    """Runs compiled statements in order until one returns"""
+    if len(statements) == 1:
+        return statements[0]
+
+    statements = tuple(statements)
+
+    def run(frame, free):
+        for statement in statements:
+            result = statement(frame, free)
+            if result is not None:
+                return result
+    return run
+
+
+class Compiler(Visitor):
+    """Compiles statements and expressions into closures taking
+    (frame, free)"""
+
+    def __init__(self, resolution: Resolution, globals: Dict[str, object],
+                 file: TextIO) -> None:
+        self.resolution = resolution
+        self.globals = globals
+        self.file = file
+        # The function whose body is being compiled
+        self.scope = resolution.script
+
+    def compile(self, statements: List[Stmt]) -> Callable:
+        return sequence([self.visit(statement) for statement in statements])
+
+    def read(self, binding: Binding, name: str, line: int) -> Callable:
+        if binding is None:
+            globals = self.globals
+
+            def global_(frame, free):
+                try:
+                    return globals[name]
+                except KeyError:
+                    raise LoxRuntimeError(
+                        f"Undefined variable '{name}'.", line) from None
+            return global_
+
+        depth, slot = binding
+        if depth:
+            index = self.scope.free.index(binding)
+            return lambda frame, free: free[index].value
+        elif slot in self.scope.cells:
+            return lambda frame, free: frame[slot].value
+        return lambda frame, free: frame[slot]
+
+    def declare(self, node: Node, make: Callable) -> Callable:
+        """Stores what make(frame, free) returns in a new variable. Cells
+        are created first, so functions can capture themselves."""
+        binding = self.resolution.bindings.get(node)
+        if binding is None:
+            globals = self.globals
+            name = node._name
+
+            def declare(frame, free):
+                globals[name] = make(frame, free)
+            return declare
+
+        slot = binding[1]
+        if slot in self.scope.cells:
+            def declare(frame, free):
+                cell = frame[slot] = Cell(None)
+                cell.value = make(frame, free)
+            return declare
+
+        def declare(frame, free):
+            frame[slot] = make(frame, free)
+        return declare
+
+    def closure(self, node: FunctionStmt, kind: str) -> Callable:
+        """Compiles a function, returns make(frame, free) creating a
+        closure over the running frame"""
+        scope = self.resolution.functions[node]
+        enclosing, self.scope = self.scope, scope
+        body = self.compile(node.body)
+        self.scope = enclosing
+
+        offset = 0 if kind == "function" else 1
+        params = range(offset + len(node._params))
+        code = Code(node._name, len(node._params), body, scope.size,
+                    tuple(slot for slot in params if slot in scope.cells),
+                    offset, kind == "initializer")
+
+        # Variables one function out are cells of the running frame, the
+        # rest are passed on from the running closure's own free variables
+        sources = tuple(
+            (True, slot) if depth == 1
+            else (False, enclosing.free.index((depth - 1, slot)))
+            for depth, slot in scope.free)
+
+        def make(frame, free):
+            return LoxFunction(code, tuple(
+                frame[index] if local else free[index]
+                for local, index in sources))
+        return make
+
+    def visitExpr(self, node: Expr) -> Callable:
+        value = node.value
+        return lambda frame, free: value
+
+    def visitBinaryOp(self, node: BinaryOp) -> Callable:
+        return _COMPILE_BINARY[node._op](
+            self.visit(node._left), self.visit(node._right), node.line)
+
+    def visitLogical(self, node: Logical) -> Callable:
+        left = self.visit(node._left)
+        right = self.visit(node._right)
+        if node._op == TokenType.OR:
+            def or_(frame, free):
+                value = left(frame, free)
+                if value is None or value is False:
+                    return right(frame, free)
+                return value
+            return or_
+
+        def and_(frame, free):
+            value = left(frame, free)
+            if value is None or value is False:
+                return value
+            return right(frame, free)
+        return and_
+
+    def visitUnaryOp(self, node: UnaryOp) -> Callable:
+        right = self.visit(node._right)
+        line = node.line
+        if node._op == TokenType.MINUS:
+            def negate(frame, free):
+                value = right(frame, free)
+                if type(value) is not float:
+                    raise LoxRuntimeError(NUMBER_OPERAND, line)
+                return -value
+            return negate
+
+        def not_(frame, free):
+            value = right(frame, free)
+            return value is None or value is False
+        return not_
+
+    def visitVariable(self, node: Variable) -> Callable:
+        return self.read(self.resolution.bindings.get(node), node._name,
+                         node.line)
+
+    def visitAssign(self, node: Assign) -> Callable:
+        value = self.visit(node._value)
+        binding = self.resolution.bindings.get(node)
+        name = node._name
+        line = node.line
+        if binding is None:
+            globals = self.globals
+
+            def assign(frame, free):
+                if name not in globals:
+                    raise LoxRuntimeError(f"Undefined variable '{name}'.",
+                                          line)
+                result = globals[name] = value(frame, free)
+                return result
+            return assign
+
+        depth, slot = binding
+        if depth:
+            index = self.scope.free.index(binding)
+
+            def assign(frame, free):
+                result = free[index].value = value(frame, free)
+                return result
+        elif slot in self.scope.cells:
+            def assign(frame, free):
+                result = frame[slot].value = value(frame, free)
+                return result
+        else:
+            def assign(frame, free):
+                result = frame[slot] = value(frame, free)
+                return result
+        return assign
+
+    def visitCall(self, node: Call) -> Callable:
+        callee = self.visit(node._callee)
+        arguments = tuple(self.visit(argument)
+                          for argument in node._arguments)
+        line = node.line
+
+        def call(frame, free):
+            function = callee(frame, free)
+            values = [argument(frame, free) for argument in arguments]
+            if not isinstance(function, _CALLABLES):
+                raise LoxRuntimeError("Can only call functions and classes.",
+                                      line)
+            try:
+                return function.call(values, line)
+            except RecursionError:
+                raise LoxRuntimeError("Stack overflow.", line) from None
+        return call
+
+    def visitGet(self, node: Get) -> Callable:
+        target = self.visit(node._object)
+        name = node._name
+        line = node.line
+
+        def get(frame, free):
+            instance = target(frame, free)
+            if type(instance) is not LoxInstance:
+                raise LoxRuntimeError("Only instances have properties.",
+                                      line)
+            return instance.get(name, line)
+        return get
+
+    def visitSet(self, node: Set) -> Callable:
+        target = self.visit(node._object)
+        value = self.visit(node._value)
+        name = node._name
+        line = node.line
+
+        def set_(frame, free):
+            instance = target(frame, free)
+            if type(instance) is not LoxInstance:
+                raise LoxRuntimeError("Only instances have fields.", line)
+            result = instance.fields[name] = value(frame, free)
+            return result
+        return set_
+
+    def visitThis(self, node: This) -> Callable:
+        return self.read(self.resolution.bindings[node], "this", node.line)
+
+    def visitSuper(self, node: Super) -> Callable:
+        superclass = self.read(self.resolution.bindings[node], "super",
+                               node.line)
+        this = self.read(self.resolution.receivers[node], "this", node.line)
+        name = node._method
+        line = node.line
+
+        def super_(frame, free):
+            method = superclass(frame, free).findMethod(name)
+            if method is None:
+                raise LoxRuntimeError(f"Undefined property '{name}'.", line)
+            return method.bind(this(frame, free))
+        return super_
+
+    def visitExpressionStmt(self, node: ExpressionStmt) -> Callable:
+        expression = self.visit(node._expression)
+
+        def run(frame, free):
+            expression(frame, free)
+        return run
+
+    def visitPrintStmt(self, node: PrintStmt) -> Callable:
+        expression = self.visit(node._expression)
+        write = self.file.write
+
+        def run(frame, free):
+            write(stringify(expression(frame, free)) + "\n")
+        return run
+
+    def visitVarStmt(self, node: VarStmt) -> Callable:
+        initializer = _nil if node._initializer is None \
+            else self.visit(node._initializer)
+        return self.declare(node, initializer)
+
+    def visitBlockStmt(self, node: BlockStmt) -> Callable:
+        # Block locals have their own slots in the function's frame, so
+        # entering a block costs nothing
+        return self.compile(node._statements)
+
+    def visitIfStmt(self, node: IfStmt) -> Callable:
+        condition = self.visit(node._condition)
+        then = self.visit(node._then)
+        otherwise = _nil if node._else is None else self.visit(node._else)
+
+        def run(frame, free):
+            value = condition(frame, free)
+            if value is None or value is False:
+                return otherwise(frame, free)
+            return then(frame, free)
+        return run
+
+    def visitWhileStmt(self, node: WhileStmt) -> Callable:
+        condition = self.visit(node._condition)
+        body = self.visit(node._body)
+
+        def run(frame, free):
+            while True:
+                value = condition(frame, free)
+                if value is None or value is False:
+                    return None
+                result = body(frame, free)
+                if result is not None:
+                    return result
+        return run
+
+    def visitReturnStmt(self, node: ReturnStmt) -> Callable:
+        value = _nil if node._value is None else self.visit(node._value)
+        return lambda frame, free: (value(frame, free),)
+
+    def visitFunctionStmt(self, node: FunctionStmt) -> Callable:
+        return self.declare(node, self.closure(node, "function"))
+
+    def visitClassStmt(self, node: ClassStmt) -> Callable:
+        name = node._name
+        line = node.line
+        superclass = None
+        if node._superclass is not None:
+            superclass = self.visit(node._superclass)
+            slot = self.resolution.supers[node]
+            captured = slot in self.scope.cells
+        methods = tuple(
+            (method._name, self.closure(
+                method, "initializer" if method._name == "init"
+                else "method"))
+            for method in node._methods)
+
+        def make(frame, free):
+            base = None
+            if superclass is not None:
+                base = superclass(frame, free)
+                if type(base) is not LoxClass:
+                    raise LoxRuntimeError("Superclass must be a class.",
+                                          line)
+                frame[slot] = Cell(base) if captured else base
+            return LoxClass(name, base, {
+                method: make(frame, free) for method, make in methods})
+        return self.declare(node, make)
+
+
+class Interpreter:
+    """Runs resolved programs. Globals persist from one run to the next."""
+
+    def __init__(self, file: TextIO = None) -> None:
+        self.file = file
+        self.globals: Dict[str, object] = {
+            "clock": NativeFunction("clock", 0, time.time),
+        }
+
+    def run(self, statements: List[Stmt], resolution: Resolution) -> None:
+        """Raises LoxRuntimeError if the program fails"""
+        compiler = Compiler(resolution, self.globals,
+                            self.file or sys.stdout)
+        body = compiler.compile(statements)
+        body([None] * resolution.script.size, ())
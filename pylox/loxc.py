@@ -0,0 +1,248 @@
+"""Reads and writes precompiled ASTs in the `.loxc` binary format.
+
+All integers are little endian. A file is laid out as:
+
+    header     magic, format version and the offset/count of each section
+    constants  fixed 12 byte records: type, padding, 8 byte payload which is
+               a double, a bool or the (offset, length) of a string
+    strings    UTF-8 text of the string constants, back to back
+    nodes      fixed 20 byte records in post-order: kind, op, padding,
+               left, right, constant index and line
+    roots      node index of each tree's root, one u32 per tree
+
+Nodes are the rows of an `Arena`, so children are referenced by index and
+every tree is the contiguous run of records ending at its root. Operators
+are stored by their position in `OPERATORS`, which is part of the format
+and doesn't change with the TokenType enum.
+"""
+import mmap
+import struct
+
+from typing import Iterable, Iterator
+
+from pylox.arena import Arena, NodeKind
+from pylox.parser import BinaryOp, Bool, Constant, Expr, Nil, String, UnaryOp
+from pylox.token import TOKEN_TYPES, TokenType
+
+MAGIC = b"LOXC"
+VERSION = 1
+
+OPERATORS = (
+    TokenType.PLUS,
+    TokenType.MINUS,
+    TokenType.STAR,
+    TokenType.SLASH,
+    TokenType.GREATER_THAN,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS_THAN,
+    TokenType.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL,
+    TokenType.EXCLAIMATION_EQUAL,
+    TokenType.EXCLAIMATION,
+)
+
+# Constant types
+NUMBER = 0
+STRING = 1
+BOOL = 2
+
+# magic, version, flags, then offset and count of constants, strings (in
+# bytes), nodes and roots
+_HEADER = struct.Struct("<4sHHIIIIIIII")
+_CONSTANT = struct.Struct("<B3xd")
+_STRING = struct.Struct("<B3xII")
+_BOOL = struct.Struct("<B3x?7x")
+_NODE = struct.Struct("<BBxxiiiI")
+_ROOT = struct.Struct("<I")
+
+_OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+
+# Plain ints for the decode loop, comparing IntEnum members is much slower
+_CONSTANT_KIND = int(NodeKind.CONSTANT)
+_BOOL_KIND = int(NodeKind.BOOL)
+_STRING_KIND = int(NodeKind.STRING)
+_BINARY_KIND = int(NodeKind.BINARY)
+_UNARY_KIND = int(NodeKind.UNARY)
+
+
+class LoxcError(Exception):
+    pass
+
+
+def writeLoxc(path: str, nodes: Iterable[Expr]) -> None:
+    """Writes the trees, as returned by Parser.parse(), to a .loxc file.
+    Raises LoxcError for anything the format has no records for, such as
+    statements."""
+    arena = Arena.fromExprs(nodes)
+    if any(kind > NodeKind.UNARY for kind in arena.kinds):
+        raise LoxcError(".loxc files only hold expressions")
+
+    constants = bytearray()
+    strings = bytearray()
+    for value in arena.literals:
+        if type(value) is float:
+            constants += _CONSTANT.pack(NUMBER, value)
+        elif type(value) is str:
+            encoded = value.encode()
+            constants += _STRING.pack(STRING, len(strings), len(encoded))
+            strings += encoded
+        else:
+            constants += _BOOL.pack(BOOL, value)
+
+    records = bytearray()
+    for kind, op, left, right, value, line in zip(
+            arena.kinds, arena.ops, arena.lefts, arena.rights, arena.values,
+            arena.lines):
+        if kind == NodeKind.BINARY or kind == NodeKind.UNARY:
+            op = _OPERATOR_CODES[TOKEN_TYPES[op]]
+        records += _NODE.pack(kind, op, left, right, value, line)
+
+    roots = b"".join(_ROOT.pack(root) for root in arena.roots)
+
+    # Sections follow the header in order, each aligned to 8 bytes
+    offsets = []
+    offset = _HEADER.size
+    for section in (constants, strings, records, roots):
+        offsets.append(offset)
+        offset += -(-len(section) // 8) * 8
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, 0,
+        offsets[0], len(arena.literals),
+        offsets[1], len(strings),
+        offsets[2], len(arena),
+        offsets[3], len(arena.roots))
+
+    with open(path, "wb") as f:
+        f.write(header)
+        for section_offset, section in zip(
+                offsets, (constants, strings, records, roots)):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(section)
+
+
+class LoxcReader:
+    """Memory maps a .loxc file and decodes trees when they are accessed.
+
+    Opening only parses the header. Indexing decodes the node records of that
+    one tree and the constants it uses, so the cost follows what a program
+    touches rather than the size of the file. Decoded trees and constants
+    are kept for later accesses.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            try:
+                self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise LoxcError(f"{path} is empty")
+
+        if len(self.__map) < _HEADER.size:
+            self.close()
+            raise LoxcError(f"{path} is truncated")
+
+        (magic, version, _,
+         self.__constants, self.__constant_count,
+         self.__strings, _,
+         self.__nodes, self.__node_count,
+         self.__roots, self.__root_count) = _HEADER.unpack_from(self.__map)
+
+        if magic != MAGIC:
+            self.close()
+            raise LoxcError(f"{path} is not a .loxc file")
+        if version != VERSION:
+            self.close()
+            raise LoxcError(
+                f"{path} is .loxc version {version}, expected {VERSION}")
+        if self.__roots + self.__root_count * _ROOT.size > len(self.__map):
+            self.close()
+            raise LoxcError(f"{path} is truncated")
+
+        self.__trees = {}
+        self.__values = {}
+
+    def __enter__(self) -> "LoxcReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.__map.close()
+
+    @property
+    def nodeCount(self) -> int:
+        return self.__node_count
+
+    @property
+    def constantCount(self) -> int:
+        return self.__constant_count
+
+    def __len__(self) -> int:
+        return self.__root_count
+
+    def __getitem__(self, index: int) -> Expr:
+        if index < 0:
+            index += self.__root_count
+        if not 0 <= index < self.__root_count:
+            raise IndexError("tree index out of range")
+
+        tree = self.__trees.get(index)
+        if tree is None:
+            tree = self.__trees[index] = self.__decode(index)
+        return tree
+
+    def __iter__(self) -> Iterator[Expr]:
+        for index in range(self.__root_count):
+            yield self[index]
+
+    def constant(self, index: int):
+        value = self.__values.get(index, self)
+        if value is not self:
+            return value
+
+        offset = self.__constants + index * _CONSTANT.size
+        type = self.__map[offset]
+        if type == NUMBER:
+            value = _CONSTANT.unpack_from(self.__map, offset)[1]
+        elif type == STRING:
+            _, start, length = _STRING.unpack_from(self.__map, offset)
+            start += self.__strings
+            value = self.__map[start:start + length].decode()
+        else:
+            value = _BOOL.unpack_from(self.__map, offset)[1]
+
+        self.__values[index] = value
+        return value
+
+    def __root(self, index: int) -> int:
+        return _ROOT.unpack_from(
+            self.__map, self.__roots + index * _ROOT.size)[0]
+
+    def __decode(self, index: int) -> Expr:
+        # A tree is the run of records after the previous tree's root
+        first = self.__root(index - 1) + 1 if index else 0
+        last = self.__root(index)
+        start = self.__nodes + first * _NODE.size
+        end = self.__nodes + (last + 1) * _NODE.size
+
+        nodes = []
+        append = nodes.append
+        constant = self.constant
+        for kind, op, left, right, value, line in _NODE.iter_unpack(
+                self.__map[start:end]):
+            if kind == _BINARY_KIND:
+                append(BinaryOp(nodes[left - first], OPERATORS[op],
+                                nodes[right - first], line))
+            elif kind == _UNARY_KIND:
+                append(UnaryOp(OPERATORS[op], nodes[right - first], line))
+            elif kind == _CONSTANT_KIND:
+                append(Constant(constant(value)))
+            elif kind == _STRING_KIND:
+                append(String(constant(value)))
+            elif kind == _BOOL_KIND:
+                append(Bool(constant(value)))
+            else:
+                append(Nil())
+
+        return nodes[-1]
@@ -0,0 +1,199 @@
+import copy
+import operator
+
+from typing import Iterable, List, Tuple
+
+from pylox.parser import BinaryOp, Bool, Constant, Expr, Logical, Nil, \
+    String, UnaryOp
+from pylox.runtime import isEqual, isTruthy
+from pylox.token import TokenType
+from pylox.traverse import fold, walk
+
+# Static types inferred for folded nodes. A node typed NUMBER either
+# evaluates to a number or fails at runtime, which is all the identities
+# below need to know.
+NUMBER = "number"
+STRING = "string"
+BOOL = "bool"
+NIL = "nil"
+
+_LITERAL_TYPES = {
+    Constant: NUMBER,
+    String: STRING,
+    Bool: BOOL,
+    Nil: NIL,
+}
+
+_LITERALS = tuple(_LITERAL_TYPES)
+
+_ARITHMETIC = {
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+}
+
+_COMPARISON = {
+    TokenType.GREATER_THAN: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS_THAN: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+}
+
+
+class Optimizer:
+    """Constant folding and algebraic simplification over Expr trees.
+
+    Folds literal-only subtrees and applies identities that can't change
+    the result (x * 1, 1 * x, x / 1, -(-x) for numbers and !!b for bools).
+    `and` and `or` with a literal left hand side are replaced by the
+    operand they evaluate to. Anything that would fail at runtime, like
+    division by zero or mixing types, is left in place so the error still
+    happens. Input trees are never modified, rewritten nodes are copies and
+    untouched subtrees are shared. `eliminated` counts the nodes removed so
+    far.
+    """
+
+    def __init__(self) -> None:
+        self.eliminated = 0
+
+    def optimize(self, node: Expr) -> Expr:
+        return fold(node, self.__visit)[0]
+
+    def optimizeAll(self, nodes: Iterable[Expr]) -> List[Expr]:
+        return [self.optimize(node) for node in nodes]
+
+    def __visit(self, node: Expr, children: list) -> Tuple[Expr, str]:
+        """Returns the rewritten node along with its static type, or None if
+        the type isn't known"""
+        if isinstance(node, Logical):
+            (left, left_type), (right, right_type) = children
+            return self.__logical(node, left, left_type, right, right_type)
+        elif isinstance(node, BinaryOp):
+            (left, left_type), (right, right_type) = children
+            return self.__binary(node, left, left_type, right, right_type)
+        elif isinstance(node, UnaryOp):
+            return self.__unary(node, *children[0])
+
+        # Calls, assignments and the like keep what was folded inside them,
+        # copied like the Transformer does
+        values = [child for child, _ in children]
+        if any(value is not child
+               for value, child in zip(values, node.children())):
+            node = copy.copy(node)
+            node._setChildren(values)
+        return node, _LITERAL_TYPES.get(type(node))
+
+    def __logical(self, node: Logical, left: Expr, left_type: str,
+                  right: Expr, right_type: str) -> Tuple[Expr, str]:
+        """Either operand is the result, so the type is only known when
+        both have the same one"""
+        if isinstance(left, _LITERALS):
+            if isTruthy(left.value) == (node._op == TokenType.OR):
+                # The right hand side never runs
+                return self.__folded(left, left_type,
+                                     1 + len(list(walk(right))))
+            return self.__folded(right, right_type, 2)
+
+        result_type = left_type if left_type == right_type else None
+        return self.__rebuilt(node, left, right), result_type
+
+    def __binary(self, node: BinaryOp, left: Expr, left_type: str,
+                 right: Expr, right_type: str) -> Tuple[Expr, str]:
+        op = node._op
+        literals = isinstance(left, _LITERALS) and isinstance(right, _LITERALS)
+        numbers = left_type == NUMBER and right_type == NUMBER
+
+        if op in (TokenType.EQUAL_EQUAL, TokenType.EXCLAIMATION_EQUAL):
+            if literals:
+                equal = isEqual(left.value, right.value)
+                return self.__folded(
+                    Bool(equal if op == TokenType.EQUAL_EQUAL else not equal),
+                    BOOL, 2)
+            return self.__rebuilt(node, left, right), BOOL
+
+        if op in _COMPARISON:
+            if literals and numbers:
+                return self.__folded(
+                    Bool(_COMPARISON[op](left.value, right.value)), BOOL, 2)
+            return self.__rebuilt(node, left, right), BOOL
+
+        if op == TokenType.PLUS:
+            if literals and left_type == right_type \
+                    and left_type in (NUMBER, STRING):
+                literal = Constant if left_type == NUMBER else String
+                return self.__folded(
+                    literal(left.value + right.value), left_type, 2)
+            result_type = left_type if left_type == right_type \
+                and left_type in (NUMBER, STRING) else None
+            return self.__rebuilt(node, left, right), result_type
+
+        # - * / only work on numbers
+        if literals and numbers and \
+                not (op == TokenType.SLASH and right.value == 0):
+            return self.__folded(
+                Constant(_ARITHMETIC[op](left.value, right.value)), NUMBER, 2)
+
+        if op in (TokenType.STAR, TokenType.SLASH) and \
+                isinstance(right, Constant) and right.value == 1 \
+                and left_type == NUMBER:
+            self.eliminated += 2
+            return left, NUMBER
+        if op == TokenType.STAR and isinstance(left, Constant) \
+                and left.value == 1 and right_type == NUMBER:
+            self.eliminated += 2
+            return right, NUMBER
+
+        return self.__rebuilt(node, left, right), NUMBER
+
+    def __unary(self, node: UnaryOp, right: Expr,
+                right_type: str) -> Tuple[Expr, str]:
+        if node._op == TokenType.EXCLAIMATION:
+            if isinstance(right, _LITERALS):
+                return self.__folded(Bool(not isTruthy(right.value)), BOOL, 1)
+            if isinstance(right, UnaryOp) and \
+                    right._op == TokenType.EXCLAIMATION:
+                inner, inner_type = right._right, self.__typeOf(right._right)
+                if inner_type == BOOL:
+                    self.eliminated += 2
+                    return inner, BOOL
+            return self.__rebuilt(node, None, right), BOOL
+
+        if isinstance(right, Constant):
+            return self.__folded(Constant(-right.value), NUMBER, 1)
+        if isinstance(right, UnaryOp) and right._op == TokenType.MINUS \
+                and self.__typeOf(right._right) == NUMBER:
+            self.eliminated += 2
+            return right._right, NUMBER
+
+        return self.__rebuilt(node, None, right), NUMBER
+
+    def __typeOf(self, node: Expr) -> str:
+        """Static type of an already optimized node, from its shape alone"""
+        if isinstance(node, UnaryOp):
+            return BOOL if node._op == TokenType.EXCLAIMATION else NUMBER
+        elif isinstance(node, Logical):
+            # Evaluates to one of its operands, not to a bool
+            return None
+        elif isinstance(node, BinaryOp):
+            if node._op in _ARITHMETIC:
+                return NUMBER
+            elif node._op == TokenType.PLUS:
+                return None
+            return BOOL
+
+        return _LITERAL_TYPES.get(type(node))
+
+    def __folded(self, node: Expr, type: str, eliminated: int):
+        self.eliminated += eliminated
+        return node, type
+
+    def __rebuilt(self, node: Expr, left: Expr, right: Expr) -> Expr:
+        """Copy-on-write: only allocate a new node if a child changed"""
+        if isinstance(node, BinaryOp):
+            if left is node._left and right is node._right:
+                return node
+            return type(node)(left, node._op, right, node.line)
+
+        if right is node._right:
+            return node
+        return UnaryOp(node._op, right, node.line)
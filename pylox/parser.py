@@ -1,24 +1,143 @@
-import os
-import sys
+import enum
 
-from typing import List
+from collections import deque
+from itertools import islice
+from operator import length_hint
+from typing import Iterable, Iterator, List, Optional, Sequence, TextIO, \
+    Tuple, Union
 
-from pylox.token import Token, TokenType
+from pylox.diagnostics import Diagnostic, Diagnostics
+from pylox.stats import Stats
+from pylox.token import TOKEN_CODES, Token, TokenBuffer, TokenType
+from pylox.visitor import Printer
 
 
 class ParseError(Exception):
-    pass
+    """Raised by the grammar rules. The parser reports it as a Diagnostic
+    at the token it stopped at."""
 
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class _Abort(Exception):
+    """Unwinds a program parse once the diagnostics are full"""
+
+
+class ParseEngine(enum.Enum):
+    # Recursive descent, one method per grammar rule
+    RECURSIVE = "recursive"
+    # Precedence climbing driven by Parser's prefix/infix tables
+    PRATT = "pratt"
+    # Operator precedence parsing on explicit stacks, never recurses
+    ITERATIVE = "iterative"
+
+
+class Precedence(enum.IntEnum):
+    """Binding power of infix operators for the Pratt and iterative
+    engines, lowest first"""
+    NONE = 0
+    ASSIGNMENT = 1
+    OR = 2
+    AND = 3
+    EQUALITY = 4
+    COMPARISON = 5
+    TERM = 6
+    FACTOR = 7
+    UNARY = 8
+    CALL = 9
+
+
+# Looking up an Enum member costs as much as a function call, so the Pratt
+# engine binds the few it needs in its hot path once
+_COMMA = TokenType.COMMA
+_DOT = TokenType.DOT
+_EQUAL = TokenType.EQUAL
+_EXCLAIMATION = TokenType.EXCLAIMATION
+_IDENTIFIER = TokenType.IDENTIFIER
+_LEFT_PAREN = TokenType.LEFT_PAREN
+_MINUS = TokenType.MINUS
+_RIGHT_PAREN = TokenType.RIGHT_PAREN
+_NONE = Precedence.NONE
+_ASSIGNMENT = Precedence.ASSIGNMENT
+_UNARY = Precedence.UNARY
+
+_LEFT_BRACE_CODE = TOKEN_CODES[TokenType.LEFT_BRACE]
+_RIGHT_BRACE_CODE = TOKEN_CODES[TokenType.RIGHT_BRACE]
+
+# Statements that error recovery can resume at
+_STATEMENT_STARTS = (
+    TokenType.CLASS,
+    TokenType.FUN,
+    TokenType.VAR,
+    TokenType.FOR,
+    TokenType.IF,
+    TokenType.WHILE,
+    TokenType.PRINT,
+    TokenType.RETURN,
+)
+
+
+def _matchBrace(tokens: Sequence[Token], start: int, end: int) -> Optional[int]:
+    """Index of the brace closing the one at `start`, None if the tokens
+    run out first"""
+    depth = 0
+    if isinstance(tokens, TokenBuffer):
+        # Scan the type codes without creating any views
+        codes = tokens.types
+        for index in range(start, end):
+            code = codes[index]
+            if code == _LEFT_BRACE_CODE:
+                depth += 1
+            elif code == _RIGHT_BRACE_CODE:
+                depth -= 1
+                if not depth:
+                    return index
+        return None
+
+    left, right = TokenType.LEFT_BRACE, TokenType.RIGHT_BRACE
+    for index in range(start, end):
+        type = tokens[index].type
+        if type is left:
+            depth += 1
+        elif type is right:
+            depth -= 1
+            if not depth:
+                return index
+    return None
+
+
+class Node:
+    # Nodes are created in bulk, slots keep them free of per instance dicts
+    __slots__ = ()
+
+    def children(self) -> Tuple["Node", ...]:
+        return ()
+
+    def print(self, level: int = 0, indent: int = 2, file: TextIO = None):
+        """Prints the tree to `file`, stdout by default, see
+        visitor.Printer"""
+        Printer(indent).print(self, level, file)
+
+
+class Expr(Node):
+    __slots__ = ("value",)
 
-class Expr:
     def __init__(self, value) -> None:
         self.value = value
 
-    def print(self, level: int = 0, indent: int = 2):
-        print(f"{' ' * level * indent}{self}")
+
+class Stmt(Node):
+    __slots__ = ()
+
+    def __str__(self):
+        return type(self).__name__
 
 
 class Constant(Expr):
+    __slots__ = ()
+
     def __init__(self, value: float) -> None:
         super().__init__(value)
 
@@ -27,6 +146,8 @@ class Constant(Expr):
 
 
 class Bool(Expr):
+    __slots__ = ()
+
     def __init__(self, value: bool) -> None:
         super().__init__(value)
 
@@ -35,6 +156,8 @@ class Bool(Expr):
 
 
 class String(Expr):
+    __slots__ = ()
+
     def __init__(self, value: str) -> None:
         super().__init__(value)
 
@@ -43,6 +166,8 @@ class String(Expr):
 
 
 class Nil(Expr):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(None)
 
@@ -50,64 +175,478 @@ class Nil(Expr):
         return f"NIL[]"
 
 
-class BinaryOp(Expr):
-    def __init__(self, left: Expr, op: TokenType, right: Expr) -> None:
+class Compound(Expr):
+    """Expressions made of other nodes or names rather than a literal"""
+    __slots__ = ()
+
+    @property
+    def value(self):
+        """Compound nodes are their own value. Computed rather than stored
+        so the node doesn't hold a reference cycle to itself."""
+        return self
+
+    def __reduce__(self):
+        # The inherited value slot is shadowed by the property, so the
+        # default slot based pickling can't restore it. Constructors take
+        # their arguments in the order of the nearest non empty __slots__,
+        # subclasses like Logical only change behavior.
+        slots = next(cls.__slots__ for cls in type(self).__mro__
+                     if cls.__dict__.get("__slots__"))
+        return (type(self), tuple(getattr(self, name) for name in slots))
+
+    def __str__(self):
+        return type(self).__name__
+
+
+class BinaryOp(Compound):
+    __slots__ = ("_left", "_op", "_right", "line")
+
+    def __init__(self, left: Expr, op: TokenType, right: Expr,
+                 line: int = 0) -> None:
         self._left = left
         self._op = op
         self._right = right
+        # Line of the operator, for runtime errors
+        self.line = line
 
-        super().__init__(self)
+    def children(self) -> Tuple[Expr, ...]:
+        return (self._left, self._right)
 
-    def print(self, level: int = 0, indent: int = 2):
-        print(f"{' ' * level * indent}Binary[")
-        self._left.print(level+1, indent)
-        print(f"{' ' * level * indent}{' ' * indent}{self._op}")
-        self._right.print(level+1, indent)
-        print(f"{' ' * level * indent}]")
+    def _setChildren(self, children) -> None:
+        self._left, self._right = children
 
 
-class UnaryOp(Expr):
-    def __init__(self, op: TokenType, right: Expr) -> None:
+class UnaryOp(Compound):
+    __slots__ = ("_op", "_right", "line")
+
+    def __init__(self, op: TokenType, right: Expr, line: int = 0) -> None:
         self._op = op
         self._right = right
+        self.line = line
+
+    def children(self) -> Tuple[Expr, ...]:
+        return (self._right,)
+
+    def _setChildren(self, children) -> None:
+        (self._right,) = children
+
+
+class Logical(BinaryOp):
+    """`and` / `or`, which only evaluate their right side when needed"""
+    __slots__ = ()
+
+
+class Variable(Compound):
+    # Names keep the scanner's symbol ID alongside the text
+    __slots__ = ("_name", "_symbol", "line")
+
+    def __init__(self, name: str, symbol: int, line: int = 0) -> None:
+        self._name = name
+        self._symbol = symbol
+        self.line = line
+
+    def __str__(self):
+        return f"Variable[{self._name}]"
+
+
+class Assign(Compound):
+    __slots__ = ("_name", "_symbol", "_value", "line")
+
+    def __init__(self, name: str, symbol: int, value: Expr,
+                 line: int = 0) -> None:
+        self._name = name
+        self._symbol = symbol
+        self._value = value
+        self.line = line
+
+    def children(self) -> Tuple[Expr, ...]:
+        return (self._value,)
+
+    def _setChildren(self, children) -> None:
+        (self._value,) = children
+
+    def __str__(self):
+        return f"Assign {self._name}"
+
+
+class Call(Compound):
+    __slots__ = ("_callee", "_arguments", "line")
+
+    def __init__(self, callee: Expr, arguments: Tuple[Expr, ...],
+                 line: int = 0) -> None:
+        self._callee = callee
+        self._arguments = arguments
+        self.line = line
+
+    def children(self) -> Tuple[Expr, ...]:
+        return (self._callee, *self._arguments)
+
+    def _setChildren(self, children) -> None:
+        self._callee, *arguments = children
+        self._arguments = tuple(arguments)
+
+
+class Get(Compound):
+    __slots__ = ("_object", "_name", "line")
+
+    def __init__(self, object: Expr, name: str, line: int = 0) -> None:
+        self._object = object
+        self._name = name
+        self.line = line
+
+    def children(self) -> Tuple[Expr, ...]:
+        return (self._object,)
+
+    def _setChildren(self, children) -> None:
+        (self._object,) = children
+
+    def __str__(self):
+        return f"Get .{self._name}"
+
+
+class Set(Compound):
+    __slots__ = ("_object", "_name", "_value", "line")
+
+    def __init__(self, object: Expr, name: str, value: Expr,
+                 line: int = 0) -> None:
+        self._object = object
+        self._name = name
+        self._value = value
+        self.line = line
+
+    def children(self) -> Tuple[Expr, ...]:
+        return (self._object, self._value)
+
+    def _setChildren(self, children) -> None:
+        self._object, self._value = children
+
+    def __str__(self):
+        return f"Set .{self._name}"
+
+
+class This(Compound):
+    __slots__ = ("line",)
+
+    def __init__(self, line: int = 0) -> None:
+        self.line = line
+
+    def __str__(self):
+        return "This[]"
 
-        super().__init__(self)
 
-    def print(self, level: int = 0, indent: int = 2):
-        print(f"{' ' * level * indent}Unary[")
-        print(f"{' ' * level * indent}{' ' * indent}{self._op}")
-        self._right.print(level+1, indent)
-        print(f"{' ' * level * indent}]")
+class Super(Compound):
+    __slots__ = ("_method", "line")
+
+    def __init__(self, method: str, line: int = 0) -> None:
+        self._method = method
+        self.line = line
+
+    def __str__(self):
+        return f"Super[{self._method}]"
+
+
+class ExpressionStmt(Stmt):
+    __slots__ = ("_expression",)
+
+    def __init__(self, expression: Expr) -> None:
+        self._expression = expression
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self._expression,)
+
+    def _setChildren(self, children) -> None:
+        (self._expression,) = children
+
+
+class PrintStmt(Stmt):
+    __slots__ = ("_expression",)
+
+    def __init__(self, expression: Expr) -> None:
+        self._expression = expression
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self._expression,)
+
+    def _setChildren(self, children) -> None:
+        (self._expression,) = children
+
+
+class VarStmt(Stmt):
+    __slots__ = ("_name", "_symbol", "_initializer", "line")
+
+    def __init__(self, name: str, symbol: int, initializer: Optional[Expr],
+                 line: int = 0) -> None:
+        self._name = name
+        self._symbol = symbol
+        self._initializer = initializer
+        self.line = line
+
+    def children(self) -> Tuple[Node, ...]:
+        return () if self._initializer is None else (self._initializer,)
+
+    def _setChildren(self, children) -> None:
+        (self._initializer,) = children
+
+    def __str__(self):
+        return f"Var {self._name}"
+
+
+class BlockStmt(Stmt):
+    __slots__ = ("_statements",)
+
+    def __init__(self, statements: List[Stmt]) -> None:
+        self._statements = statements
+
+    def children(self) -> Tuple[Node, ...]:
+        return tuple(self._statements)
+
+    def _setChildren(self, children) -> None:
+        self._statements = list(children)
+
+
+class IfStmt(Stmt):
+    __slots__ = ("_condition", "_then", "_else")
+
+    def __init__(self, condition: Expr, then: Stmt,
+                 otherwise: Optional[Stmt]) -> None:
+        self._condition = condition
+        self._then = then
+        self._else = otherwise
+
+    def children(self) -> Tuple[Node, ...]:
+        if self._else is None:
+            return (self._condition, self._then)
+        return (self._condition, self._then, self._else)
+
+    def _setChildren(self, children) -> None:
+        self._condition, self._then, *otherwise = children
+        self._else = otherwise[0] if otherwise else None
+
+
+class WhileStmt(Stmt):
+    # `for` loops are desugared into while loops
+    __slots__ = ("_condition", "_body")
+
+    def __init__(self, condition: Expr, body: Stmt) -> None:
+        self._condition = condition
+        self._body = body
+
+    def children(self) -> Tuple[Node, ...]:
+        return (self._condition, self._body)
+
+    def _setChildren(self, children) -> None:
+        self._condition, self._body = children
+
+
+class ReturnStmt(Stmt):
+    __slots__ = ("_value", "line")
+
+    def __init__(self, value: Optional[Expr], line: int = 0) -> None:
+        self._value = value
+        self.line = line
+
+    def children(self) -> Tuple[Node, ...]:
+        return () if self._value is None else (self._value,)
+
+    def _setChildren(self, children) -> None:
+        (self._value,) = children
+
+
+class FunctionStmt(Stmt):
+    """Functions and methods. In lazy mode the body starts out as a
+    LazyBody and is parsed the first time `body` is read."""
+    __slots__ = ("_name", "_symbol", "_params", "_body", "line")
+
+    def __init__(self, name: str, symbol: int, params: Tuple[str, ...],
+                 body: Union[List[Stmt], "LazyBody"], line: int = 0) -> None:
+        self._name = name
+        self._symbol = symbol
+        self._params = params
+        self._body = body
+        self.line = line
+
+    @property
+    def body(self) -> List[Stmt]:
+        body = self._body
+        if isinstance(body, LazyBody):
+            body = self._body = body.parse()
+        return body
+
+    @property
+    def parsed(self) -> bool:
+        return not isinstance(self._body, LazyBody)
+
+    def children(self) -> Tuple[Node, ...]:
+        return tuple(self.body)
+
+    def _setChildren(self, children) -> None:
+        self._body = list(children)
+
+    def __str__(self):
+        return f"Function {self._name}({', '.join(self._params)})"
+
+
+class ClassStmt(Stmt):
+    __slots__ = ("_name", "_symbol", "_superclass", "_methods", "line")
+
+    def __init__(self, name: str, symbol: int, superclass: Optional[Variable],
+                 methods: List[FunctionStmt], line: int = 0) -> None:
+        self._name = name
+        self._symbol = symbol
+        self._superclass = superclass
+        self._methods = methods
+        self.line = line
+
+    def children(self) -> Tuple[Node, ...]:
+        if self._superclass is None:
+            return tuple(self._methods)
+        return (self._superclass, *self._methods)
+
+    def _setChildren(self, children) -> None:
+        if self._superclass is not None:
+            self._superclass, *children = children
+        self._methods = list(children)
+
+    def __str__(self):
+        return f"Class {self._name}"
+
+
+class LazyBody:
+    """Token range of a function body that hasn't been parsed yet, along
+    with what is needed to parse it the same way as the rest of the file"""
+    __slots__ = ("tokens", "start", "end", "filename", "diagnostics",
+                 "engine")
+
+    def __init__(self, tokens: Sequence[Token], start: int, end: int,
+                 filename: Optional[str],
+                 diagnostics: Optional[Diagnostics],
+                 engine: ParseEngine = ParseEngine.RECURSIVE) -> None:
+        self.tokens = tokens
+        self.start = start
+        self.end = end
+        self.filename = filename
+        self.diagnostics = diagnostics
+        self.engine = engine
+
+    def parse(self) -> List[Stmt]:
+        return Parser(self, self.filename, self.engine, self.diagnostics,
+                      lazy=True).parseProgram()
 
 
 class Parser:
-    def __init__(self, tokens: List[Token], filename: str = None) -> None:
-        self.__tokens = tokens
-        self.__index = 0
-        self.__current_token = self.__tokens[self.__index]
+    def __init__(self, tokens: Iterable[Token], filename: str = None,
+                 engine: ParseEngine = ParseEngine.RECURSIVE,
+                 diagnostics: Diagnostics = None,
+                 stats: Stats = None, lazy: bool = False) -> None:
+        """Tokens can be a list or any iterator, such as
+        Scanner.iter_tokens(), in which case tokens are pulled as parsing
+        proceeds and only the lookahead buffer is kept in memory.
+
+        Errors are collected in `diagnostics` and parsing stops early once
+        it is full. Without one, errors are printed to stderr all at once
+        when parsing ends. Grammar rule timings and error recoveries are
+        recorded in `stats` if one is given.
+
+        With `lazy`, parseProgram() only brace matches function and method
+        bodies and parses each one the first time it is used. That needs
+        random access, so other iterables are read into a list first."""
+        self.__engine = engine
+        self.__print = diagnostics is None
+        self.__diagnostics = Diagnostics() if diagnostics is None \
+            else diagnostics
+        self.__stats = stats
+        if stats is not None:
+            stats.instrument(self)
+        self.__program = False
+        # Blocks being parsed, recovery leaves their closing brace alone
+        self.__blocks = 0
+        self.__lazy = lazy
+        self.__indices = None
+        self.__terminator = None
+        if isinstance(tokens, LazyBody):
+            self.__lazy = True
+            self.__start(tokens.tokens, tokens.start, tokens.end)
+        elif lazy:
+            if not isinstance(tokens, (list, tuple, TokenBuffer)):
+                tokens = list(tokens)
+            self.__start(tokens, 0, len(tokens))
+        else:
+            self.__tokens = iter(tokens)
+        self.__lookahead = deque()
+        self.__current_token = None
+        self.__current_token = self.__next()
         self.__expressions = []
         self.__filename = filename
+        # Engine tables, parseProgram() swaps in the ones with the program
+        # only operators
+        self.__prefix = self._PREFIX
+        self.__infix = self._INFIX
+        self.__literals = self._LITERALS
+        self.__binary = self._BINARY
+
+    def __start(self, tokens: Sequence[Token], start: int, end: int) -> None:
+        """Reads tokens[start:end] by index, so bodies can be skipped"""
+        self.__base = tokens
+        self.__end = end
+        # A body ends at its closing brace, the EOF standing in for it
+        # points at the brace so errors there read like the eager parse's
+        self.__terminator = tokens[end] if end < len(tokens) else None
+        self.__indices = iter(range(start, end))
+        self.__tokens = map(tokens.__getitem__, self.__indices)
+
+    def __next(self) -> Token:
+        """Pulls the next token, synthesizing EOF if the stream runs dry"""
+        if self.__lookahead:
+            return self.__lookahead.popleft()
+
+        token = next(self.__tokens, None)
+        if token is None:
+            end = self.__terminator
+            if end is not None:
+                return Token(TokenType.EOF, end.lexeme, end.line, end.column)
+            line = self.__current_token.line if self.__current_token else 0
+            token = Token(TokenType.EOF, "", line)
+
+        return token
+
+    def _peek(self, distance: int = 1) -> Token:
+        """Returns the token `distance` places after the current token
+        without consuming anything"""
+        while len(self.__lookahead) < distance:
+            token = next(self.__tokens, None)
+            if token is None:
+                last = self.__lookahead[-1] if self.__lookahead \
+                    else self.__current_token
+                if last.type == TokenType.EOF:
+                    return last
+                token = Token(TokenType.EOF, "", last.line)
+            self.__lookahead.append(token)
+
+        return self.__lookahead[distance - 1]
 
     def _consume(self, type: TokenType):
         """Consumes tokens as we identify valid expressions"""
         if self.__current_token.type == type:
-            self.__index += 1
-            self.__current_token = self.__tokens[self.__index]
+            self.__current_token = self.__next()
+
+    def _expect(self, type: TokenType, message: str) -> Token:
+        """Consumes a token that has to be there, unlike _consume"""
+        token = self.__current_token
+        if token.type != type:
+            raise ParseError(message)
+
+        self.__current_token = self.__next()
+        return token
 
     def _primary(self):
         """Primary detector
-        (NUMBER "." NUMBER) | NUMBER | STRING | true | false | nil
+        NUMBER | STRING | true | false | nil
+        | IDENTIFIER | this | super "." IDENTIFIER  (programs only)
         """
         token = self.__current_token
         if token.type == TokenType.NUMBER:
             self._consume(token.type)
-            if self.__current_token.type == TokenType.DOT:
-                self._consume(TokenType.DOT)
-                decimal = self.__current_token
-                self._consume(TokenType.NUMBER)
-                return Constant(float(f"{token.lexeme}.{decimal.lexeme}"))
-            else:
-                return Constant(float(token.lexeme))
+            return Constant(token.value)
         elif token.type == TokenType.STRING:
             self._consume(token.type)
             return String(token.lexeme)
@@ -120,8 +659,21 @@ class Parser:
         elif token.type == TokenType.NIL:
             self._consume(token.type)
             return Nil()
-        else:
-            raise ParseError(f"Not a valid token {self.__current_token}")
+        elif self.__program:
+            if token.type == TokenType.IDENTIFIER:
+                self._consume(token.type)
+                return Variable(token.lexeme, token.symbol, token.line)
+            elif token.type == TokenType.THIS:
+                self._consume(token.type)
+                return This(token.line)
+            elif token.type == TokenType.SUPER:
+                self._consume(token.type)
+                self._expect(TokenType.DOT, "expected '.' after 'super'")
+                method = self._expect(TokenType.IDENTIFIER,
+                                      "expected a superclass method name")
+                return Super(method.lexeme, token.line)
+
+        raise ParseError("expected an expression")
 
     def _grouping(self):
         """Grouping detector
@@ -141,14 +693,17 @@ class Parser:
         """Unary detector
         ( "!" | "-" ) unary
         | grouping
+        | call  (programs only)
         """
         token = self.__current_token
         if token.type == TokenType.EXCLAIMATION:
             self._consume(token.type)
-            return UnaryOp(TokenType.EXCLAIMATION, self._unary())
+            return UnaryOp(TokenType.EXCLAIMATION, self._unary(), token.line)
         elif token.type == TokenType.MINUS:
             self._consume(token.type)
-            return UnaryOp(TokenType.MINUS, self._unary())
+            return UnaryOp(TokenType.MINUS, self._unary(), token.line)
+        elif self.__program:
+            return self._call()
         else:
             return self._grouping()
 
@@ -166,7 +721,7 @@ class Parser:
         while self.__current_token.type in match:
             token = self.__current_token
             self._consume(token.type)
-            node = BinaryOp(node, token.type, self._unary())
+            node = BinaryOp(node, token.type, self._unary(), token.line)
 
         return node
 
@@ -184,7 +739,7 @@ class Parser:
         while self.__current_token.type in match:
             token = self.__current_token
             self._consume(token.type)
-            node = BinaryOp(node, token.type, self._factor())
+            node = BinaryOp(node, token.type, self._factor(), token.line)
 
         return node
 
@@ -204,7 +759,7 @@ class Parser:
         while self.__current_token.type in match:
             token = self.__current_token
             self._consume(token.type)
-            node = BinaryOp(node, token.type, self._term())
+            node = BinaryOp(node, token.type, self._term(), token.line)
 
         return node
 
@@ -222,17 +777,750 @@ class Parser:
         while self.__current_token.type in match:
             token = self.__current_token
             self._consume(token.type)
-            node = BinaryOp(node, token.type, self._compare())
+            node = BinaryOp(node, token.type, self._compare(), token.line)
 
         return node
 
     def _exp(self):
         """Highest level detector
         equality
+        | assignment  (programs only)
         """
+        if self.__engine == ParseEngine.PRATT:
+            return self._pratt(_NONE)
+        elif self.__engine == ParseEngine.ITERATIVE:
+            return self._iterative()
+        elif self.__program:
+            return self._assignment()
+
         return self._equality()
 
+    def _assignment(self):
+        """Assignment detector
+        ( call "." )? IDENTIFIER "=" assignment
+        | or
+        """
+        node = self._or()
+        token = self.__current_token
+        if token.type != TokenType.EQUAL:
+            return node
+
+        self._consume(token.type)
+        return self.__assign(node, token.type, self._assignment(), token)
+
+    def _or(self):
+        """Or detector
+        and ( "or" and ) *
+        """
+        node = self._and()
+        while self.__current_token.type == TokenType.OR:
+            token = self.__current_token
+            self._consume(token.type)
+            node = Logical(node, token.type, self._and(), token.line)
+
+        return node
+
+    def _and(self):
+        """And detector
+        equality ( "and" equality ) *
+        """
+        node = self._equality()
+        while self.__current_token.type == TokenType.AND:
+            token = self.__current_token
+            self._consume(token.type)
+            node = Logical(node, token.type, self._equality(), token.line)
+
+        return node
+
+    def _call(self):
+        """Call detector
+        grouping ( "(" arguments? ")" | "." IDENTIFIER ) *
+        """
+        node = self._grouping()
+        while True:
+            token = self.__current_token
+            if token.type == TokenType.LEFT_PAREN:
+                self._consume(token.type)
+                arguments = []
+                if self.__current_token.type != TokenType.RIGHT_PAREN:
+                    arguments.append(self._exp())
+                    while self.__current_token.type == TokenType.COMMA:
+                        self._consume(TokenType.COMMA)
+                        arguments.append(self._exp())
+                self._expect(TokenType.RIGHT_PAREN,
+                             "expected ')' after arguments")
+                node = Call(node, tuple(arguments), token.line)
+            elif token.type == TokenType.DOT:
+                self._consume(token.type)
+                name = self._expect(TokenType.IDENTIFIER,
+                                    "expected a property name after '.'")
+                node = Get(node, name.lexeme, name.line)
+            else:
+                return node
+
+    def _declaration(self):
+        """Declaration detector, recovers from errors inside it
+        classDecl | "fun" function | varDecl | statement
+        """
+        try:
+            type = self.__current_token.type
+            if type == TokenType.CLASS:
+                return self._classDecl()
+            elif type == TokenType.FUN:
+                self._consume(type)
+                return self._function("function")
+            elif type == TokenType.VAR:
+                return self._varDecl()
+
+            return self._statement()
+        except ParseError as error:
+            self.__report(self.__current_token, error.message)
+            self.__synchronize()
+            return None
+
+    def _classDecl(self):
+        """Class detector
+        "class" IDENTIFIER ( "<" IDENTIFIER )? "{" function * "}" ";"?
+
+        The trailing semicolon is optional, testing/src/class.lox has one.
+        """
+        self._consume(TokenType.CLASS)
+        name = self._expect(TokenType.IDENTIFIER, "expected a class name")
+        superclass = None
+        if self.__current_token.type == TokenType.LESS_THAN:
+            self._consume(TokenType.LESS_THAN)
+            base = self._expect(TokenType.IDENTIFIER,
+                                "expected a superclass name")
+            superclass = Variable(base.lexeme, base.symbol, base.line)
+
+        self._expect(TokenType.LEFT_BRACE, "expected '{' before class body")
+        methods = []
+        while self.__current_token.type not in (TokenType.RIGHT_BRACE,
+                                                TokenType.EOF):
+            methods.append(self._function("method"))
+        self._expect(TokenType.RIGHT_BRACE, "expected '}' after class body")
+        self._consume(TokenType.SEMICOLON)
+
+        return ClassStmt(name.lexeme, name.symbol, superclass, methods,
+                         name.line)
+
+    def _function(self, kind: str):
+        """Function detector
+        IDENTIFIER "(" parameters? ")" block
+        """
+        name = self._expect(TokenType.IDENTIFIER, f"expected a {kind} name")
+        self._expect(TokenType.LEFT_PAREN, f"expected '(' after {kind} name")
+        params = []
+        if self.__current_token.type != TokenType.RIGHT_PAREN:
+            params.append(self._expect(TokenType.IDENTIFIER,
+                                       "expected a parameter name").lexeme)
+            while self.__current_token.type == TokenType.COMMA:
+                self._consume(TokenType.COMMA)
+                params.append(self._expect(
+                    TokenType.IDENTIFIER, "expected a parameter name").lexeme)
+        self._expect(TokenType.RIGHT_PAREN, "expected ')' after parameters")
+
+        body = None
+        if self.__lazy and self.__current_token.type == TokenType.LEFT_BRACE:
+            body = self.__skipBody()
+        if body is None:
+            self._expect(TokenType.LEFT_BRACE,
+                         f"expected '{{' before {kind} body")
+            body = self._block()
+
+        return FunctionStmt(name.lexeme, name.symbol, tuple(params), body,
+                            name.line)
+
+    def __skipBody(self) -> Optional[LazyBody]:
+        """Jumps from the current "{" past its matching "}" and returns the
+        tokens in between, or None if it is never closed"""
+        # The lookahead was pulled from the indices after the current token
+        start = self.__end - length_hint(self.__indices) \
+            - len(self.__lookahead) - 1
+        close = _matchBrace(self.__base, start, self.__end)
+        if close is None:
+            return None
+
+        self.__lookahead.clear()
+        skip = close + 1 - (self.__end - length_hint(self.__indices))
+        next(islice(self.__indices, skip, skip), None)
+        self.__current_token = self.__next()
+
+        return LazyBody(self.__base, start + 1, close, self.__filename,
+                        None if self.__print else self.__diagnostics,
+                        self.__engine)
+
+    def _varDecl(self):
+        """Variable detector
+        "var" IDENTIFIER ( "=" expression )? ";"
+        """
+        self._consume(TokenType.VAR)
+        name = self._expect(TokenType.IDENTIFIER, "expected a variable name")
+        initializer = None
+        if self.__current_token.type == TokenType.EQUAL:
+            self._consume(TokenType.EQUAL)
+            initializer = self._exp()
+        self._expect(TokenType.SEMICOLON,
+                     "expected ';' after variable declaration")
+
+        return VarStmt(name.lexeme, name.symbol, initializer, name.line)
+
+    def _statement(self):
+        """Statement detector
+        forStmt | ifStmt | printStmt | returnStmt | whileStmt | block
+        | exprStmt
+        """
+        type = self.__current_token.type
+        if type == TokenType.FOR:
+            return self._forStmt()
+        elif type == TokenType.IF:
+            return self._ifStmt()
+        elif type == TokenType.PRINT:
+            return self._printStmt()
+        elif type == TokenType.RETURN:
+            return self._returnStmt()
+        elif type == TokenType.WHILE:
+            return self._whileStmt()
+        elif type == TokenType.LEFT_BRACE:
+            self._consume(type)
+            return BlockStmt(self._block())
+
+        return self._expressionStatement()
+
+    def _forStmt(self):
+        """For detector, desugared into a while loop
+        "for" "(" ( varDecl | exprStmt | ";" ) expression? ";"
+        expression? ")" statement
+        """
+        self._consume(TokenType.FOR)
+        self._expect(TokenType.LEFT_PAREN, "expected '(' after 'for'")
+        type = self.__current_token.type
+        if type == TokenType.SEMICOLON:
+            self._consume(type)
+            initializer = None
+        elif type == TokenType.VAR:
+            initializer = self._varDecl()
+        else:
+            initializer = self._expressionStatement()
+
+        condition = None
+        if self.__current_token.type != TokenType.SEMICOLON:
+            condition = self._exp()
+        self._expect(TokenType.SEMICOLON, "expected ';' after loop condition")
+
+        increment = None
+        if self.__current_token.type != TokenType.RIGHT_PAREN:
+            increment = self._exp()
+        self._expect(TokenType.RIGHT_PAREN, "expected ')' after for clauses")
+
+        body = self._statement()
+        if increment is not None:
+            body = BlockStmt([body, ExpressionStmt(increment)])
+        body = WhileStmt(Bool(True) if condition is None else condition,
+                         body)
+        if initializer is not None:
+            body = BlockStmt([initializer, body])
+
+        return body
+
+    def _ifStmt(self):
+        """If detector
+        "if" "(" expression ")" statement ( "else" statement )?
+        """
+        self._consume(TokenType.IF)
+        self._expect(TokenType.LEFT_PAREN, "expected '(' after 'if'")
+        condition = self._exp()
+        self._expect(TokenType.RIGHT_PAREN, "expected ')' after if condition")
+        then = self._statement()
+        otherwise = None
+        if self.__current_token.type == TokenType.ELSE:
+            self._consume(TokenType.ELSE)
+            otherwise = self._statement()
+
+        return IfStmt(condition, then, otherwise)
+
+    def _printStmt(self):
+        """Print detector
+        "print" expression ";"
+        """
+        self._consume(TokenType.PRINT)
+        value = self._exp()
+        self._expect(TokenType.SEMICOLON, "expected ';' after value")
+        return PrintStmt(value)
+
+    def _returnStmt(self):
+        """Return detector
+        "return" expression? ";"
+        """
+        keyword = self.__current_token
+        self._consume(TokenType.RETURN)
+        value = None
+        if self.__current_token.type != TokenType.SEMICOLON:
+            value = self._exp()
+        self._expect(TokenType.SEMICOLON, "expected ';' after return value")
+        return ReturnStmt(value, keyword.line)
+
+    def _whileStmt(self):
+        """While detector
+        "while" "(" expression ")" statement
+        """
+        self._consume(TokenType.WHILE)
+        self._expect(TokenType.LEFT_PAREN, "expected '(' after 'while'")
+        condition = self._exp()
+        self._expect(TokenType.RIGHT_PAREN, "expected ')' after condition")
+        return WhileStmt(condition, self._statement())
+
+    def _block(self):
+        """Block detector, after the opening brace
+        declaration * "}"
+        """
+        statements = []
+        self.__blocks += 1
+        try:
+            while self.__current_token.type not in (TokenType.RIGHT_BRACE,
+                                                    TokenType.EOF):
+                statement = self._declaration()
+                if statement is not None:
+                    statements.append(statement)
+        finally:
+            self.__blocks -= 1
+        self._expect(TokenType.RIGHT_BRACE, "expected '}' after block")
+        return statements
+
+    def _expressionStatement(self):
+        """Expression statement detector
+        expression ";"
+        """
+        expression = self._exp()
+        self._expect(TokenType.SEMICOLON, "expected ';' after expression")
+        return ExpressionStmt(expression)
+
+    def _pratt(self, precedence: int):
+        """Precedence climbing detector
+        prefix ( infix ) *
+
+        Keeps folding infix operators into the left hand side for as long as
+        they bind tighter than `precedence`. Builds the same trees as the
+        recursive descent rules above.
+        """
+        prefix = self.__prefix.get(self.__current_token.type)
+        if prefix is None:
+            raise ParseError("expected an expression")
+
+        node = prefix(self)
+
+        infix = self.__infix
+        while True:
+            rule = infix.get(self.__current_token.type)
+            if rule is None or rule[0] <= precedence:
+                return node
+
+            node = rule[1](self, node, rule[0])
+
+    def _prattNumber(self):
+        """Number literal for the Pratt engine"""
+        node = Constant(self.__current_token.value)
+        self.__current_token = self.__next()
+        return node
+
+    def _prattString(self):
+        """String literal for the Pratt engine"""
+        node = String(self.__current_token.lexeme)
+        self.__current_token = self.__next()
+        return node
+
+    def _prattTrue(self):
+        """true for the Pratt engine"""
+        self.__current_token = self.__next()
+        return Bool(True)
+
+    def _prattFalse(self):
+        """false for the Pratt engine"""
+        self.__current_token = self.__next()
+        return Bool(False)
+
+    def _prattNil(self):
+        """nil for the Pratt engine"""
+        self.__current_token = self.__next()
+        return Nil()
+
+    def _prattVariable(self):
+        """Variable for the Pratt engine, programs only"""
+        token = self.__current_token
+        self.__current_token = self.__next()
+        return Variable(token.lexeme, token.symbol, token.line)
+
+    def _prattThis(self):
+        """this for the Pratt engine, programs only"""
+        line = self.__current_token.line
+        self.__current_token = self.__next()
+        return This(line)
+
+    def _prattSuper(self):
+        """Superclass method for the Pratt engine, programs only
+        "super" "." IDENTIFIER
+        """
+        line = self.__current_token.line
+        self.__current_token = self.__next()
+        self._expect(_DOT, "expected '.' after 'super'")
+        method = self._expect(_IDENTIFIER, "expected a superclass method name")
+        return Super(method.lexeme, line)
+
+    def _prattGrouping(self):
+        """Grouping for the Pratt engine
+        "(" expr ")"
+        """
+        self.__current_token = self.__next()
+        node = self._pratt(_NONE)
+        self._consume(_RIGHT_PAREN)
+        return node
+
+    def _prattUnary(self):
+        """Unary operator for the Pratt engine
+        ( "!" | "-" ) prefix
+        """
+        token = self.__current_token
+        self.__current_token = self.__next()
+        return UnaryOp(token.type, self._pratt(_UNARY), token.line)
+
+    def _prattBinary(self, left: Expr, precedence: int):
+        """Left associative binary operator for the Pratt engine
+        expr op expr
+        """
+        token = self.__current_token
+        self.__current_token = self.__next()
+        return BinaryOp(left, token.type, self._pratt(precedence), token.line)
+
+    def _prattLogical(self, left: Expr, precedence: int):
+        """and/or for the Pratt engine, programs only
+        expr ( "and" | "or" ) expr
+        """
+        token = self.__current_token
+        self.__current_token = self.__next()
+        return Logical(left, token.type, self._pratt(precedence), token.line)
+
+    def _prattAssign(self, left: Expr, precedence: int):
+        """Right associative assignment for the Pratt engine, programs only
+        ( call "." )? IDENTIFIER "=" expr
+        """
+        token = self.__current_token
+        self.__current_token = self.__next()
+        return self.__assign(left, token.type, self._pratt(_NONE), token)
+
+    def _prattCall(self, left: Expr, precedence: int):
+        """Call for the Pratt engine, programs only
+        expr "(" arguments? ")"
+        """
+        token = self.__current_token
+        self.__current_token = self.__next()
+        arguments = []
+        if self.__current_token.type is not _RIGHT_PAREN:
+            arguments.append(self._pratt(_NONE))
+            while self.__current_token.type is _COMMA:
+                self.__current_token = self.__next()
+                arguments.append(self._pratt(_NONE))
+        self._expect(_RIGHT_PAREN, "expected ')' after arguments")
+        return Call(left, tuple(arguments), token.line)
+
+    def _prattGet(self, left: Expr, precedence: int):
+        """Property access for the Pratt engine, programs only
+        expr "." IDENTIFIER
+        """
+        self.__current_token = self.__next()
+        name = self._expect(_IDENTIFIER, "expected a property name after '.'")
+        return Get(left, name.lexeme, name.line)
+
+    def __assign(self, target: Expr, op: TokenType, value: Expr,
+                 token: Token) -> Expr:
+        """Assignment of `value` to `target`, reporting at the "=" `token`
+        and keeping the target if it can't be assigned to. Takes the
+        arguments of a node class, for the iterative engine."""
+        if isinstance(target, Variable):
+            return Assign(target._name, target._symbol, value, target.line)
+        elif isinstance(target, Get):
+            return Set(target._object, target._name, value, target.line)
+
+        # Nothing to recover from, the parser is still in a sane state
+        self.__report(token, "invalid assignment target")
+        return target
+
+    def _iterative(self):
+        """Explicit stack detector
+        equality
+        | assignment  (programs only)
+
+        Shunting-yard over the same grammar and precedence table as the
+        Pratt engine. Pending operators, open groups and the calls whose
+        arguments are being parsed live on lists instead of the call stack,
+        so nesting depth is only limited by memory. Builds the same trees as
+        the other engines.
+        """
+        program = self.__program
+        literals = self.__literals
+        binary = self.__binary
+        # Left operands waiting for their right hand side
+        operands = []
+        # (precedence, op, line, make) for pending operators, where make
+        # builds the node, None for an open group or call
+        ops = []
+        # For each None in ops: None for a group, [callee, arguments, line]
+        # for a call
+        groups = []
+
+        while True:
+            type = self.__current_token.type
+            if type is _MINUS or type is _EXCLAIMATION:
+                ops.append((_UNARY, type, self.__current_token.line, None))
+                self.__current_token = self.__next()
+                continue
+            elif type is _LEFT_PAREN:
+                ops.append(None)
+                groups.append(None)
+                self.__current_token = self.__next()
+                continue
+
+            literal = literals.get(type)
+            if literal is None:
+                raise ParseError("expected an expression")
+            node = literal(self)
+
+            while True:
+                type = self.__current_token.type
+                if program and (type is _DOT or type is _LEFT_PAREN):
+                    # Calls and property access bind tightest of all
+                    token = self.__current_token
+                    self.__current_token = self.__next()
+                    if type is _DOT:
+                        name = self._expect(
+                            _IDENTIFIER, "expected a property name after '.'")
+                        node = Get(node, name.lexeme, name.line)
+                        continue
+                    elif self.__current_token.type is _RIGHT_PAREN:
+                        self.__current_token = self.__next()
+                        node = Call(node, (), token.line)
+                        continue
+
+                    ops.append(None)
+                    groups.append([node, [], token.line])
+                    break
+
+                # Prefix operators bind tighter than anything that follows
+                while ops and ops[-1] is not None and ops[-1][0] is _UNARY:
+                    _, op, line, _ = ops.pop()
+                    node = UnaryOp(op, node, line)
+
+                rule = binary.get(type)
+                if rule is not None:
+                    precedence, make = rule
+                    if precedence is _ASSIGNMENT:
+                        # Right associative, and the target is checked once
+                        # the value parsed, like the other engines do
+                        while ops and ops[-1] is not None \
+                                and ops[-1][0] > precedence:
+                            _, op, line, build = ops.pop()
+                            node = build(operands.pop(), op, node, line)
+                        operands.append(node)
+                        ops.append((precedence, type, self.__current_token,
+                                    self.__assign))
+                        self.__current_token = self.__next()
+                        break
+
+                    while ops and ops[-1] is not None \
+                            and ops[-1][0] >= precedence:
+                        _, op, line, build = ops.pop()
+                        node = build(operands.pop(), op, node, line)
+
+                    operands.append(node)
+                    ops.append(
+                        (precedence, type, self.__current_token.line, make))
+                    self.__current_token = self.__next()
+                    break
+
+                # No operator follows, so this closes a group, an argument
+                # or the whole expression
+                while ops and ops[-1] is not None:
+                    _, op, line, build = ops.pop()
+                    node = build(operands.pop(), op, node, line)
+
+                if not ops:
+                    return node
+
+                ops.pop()
+                call = groups.pop()
+                if call is None:
+                    self._consume(_RIGHT_PAREN)
+                    continue
+
+                call[1].append(node)
+                if self.__current_token.type is _COMMA:
+                    self.__current_token = self.__next()
+                    ops.append(None)
+                    groups.append(call)
+                    break
+
+                self._expect(_RIGHT_PAREN, "expected ')' after arguments")
+                node = Call(call[0], tuple(call[1]), call[2])
+
+    # Pratt tables. New operators only need an entry here: prefix handlers
+    # take the parser, infix rules are (precedence, handler(parser, left,
+    # precedence))
+    _PREFIX = {
+        TokenType.NUMBER: _prattNumber,
+        TokenType.STRING: _prattString,
+        TokenType.TRUE: _prattTrue,
+        TokenType.FALSE: _prattFalse,
+        TokenType.NIL: _prattNil,
+        TokenType.LEFT_PAREN: _prattGrouping,
+        TokenType.EXCLAIMATION: _prattUnary,
+        TokenType.MINUS: _prattUnary,
+    }
+
+    _INFIX = {
+        TokenType.EQUAL_EQUAL: (Precedence.EQUALITY, _prattBinary),
+        TokenType.EXCLAIMATION_EQUAL: (Precedence.EQUALITY, _prattBinary),
+        TokenType.GREATER_THAN: (Precedence.COMPARISON, _prattBinary),
+        TokenType.GREATER_EQUAL: (Precedence.COMPARISON, _prattBinary),
+        TokenType.LESS_THAN: (Precedence.COMPARISON, _prattBinary),
+        TokenType.LESS_EQUAL: (Precedence.COMPARISON, _prattBinary),
+        TokenType.PLUS: (Precedence.TERM, _prattBinary),
+        TokenType.MINUS: (Precedence.TERM, _prattBinary),
+        TokenType.STAR: (Precedence.FACTOR, _prattBinary),
+        TokenType.SLASH: (Precedence.FACTOR, _prattBinary),
+    }
+
+    # What only programs have on top: variables, this, super, assignment,
+    # and/or, calls and property access
+    _PROGRAM_PREFIX = {
+        **_PREFIX,
+        TokenType.IDENTIFIER: _prattVariable,
+        TokenType.THIS: _prattThis,
+        TokenType.SUPER: _prattSuper,
+    }
+
+    _PROGRAM_INFIX = {
+        **_INFIX,
+        TokenType.EQUAL: (Precedence.ASSIGNMENT, _prattAssign),
+        TokenType.OR: (Precedence.OR, _prattLogical),
+        TokenType.AND: (Precedence.AND, _prattLogical),
+        TokenType.LEFT_PAREN: (Precedence.CALL, _prattCall),
+        TokenType.DOT: (Precedence.CALL, _prattGet),
+    }
+
+    # Subsets of the Pratt tables that the iterative engine can handle
+    # without recursing: operands, and (precedence, node class) of binary
+    # operators. Unary operators, groups, calls and property access are
+    # built into the engine.
+    _LITERALS = {
+        TokenType.NUMBER: _prattNumber,
+        TokenType.STRING: _prattString,
+        TokenType.TRUE: _prattTrue,
+        TokenType.FALSE: _prattFalse,
+        TokenType.NIL: _prattNil,
+    }
+
+    _PROGRAM_LITERALS = {
+        **_LITERALS,
+        TokenType.IDENTIFIER: _prattVariable,
+        TokenType.THIS: _prattThis,
+        TokenType.SUPER: _prattSuper,
+    }
+
+    _BINARY = {type: (rule[0], BinaryOp) for type, rule in _INFIX.items()}
+
+    # The assignment's node is built by the parser, which reports invalid
+    # targets
+    _PROGRAM_BINARY = {
+        **_BINARY,
+        TokenType.EQUAL: (Precedence.ASSIGNMENT, None),
+        TokenType.OR: (Precedence.OR, Logical),
+        TokenType.AND: (Precedence.AND, Logical),
+    }
+
     def parse(self) -> List[Expr]:
+        self.__expressions.extend(self.iter_parse())
+        return self.__expressions
+
+    def parseProgram(self) -> List[Stmt]:
+        """Parses declarations and statements instead of bare expressions.
+        Statements always use the recursive descent rules, expressions in
+        them the engine's.
+
+        Only the recursive rules nest on the call stack. Code nested deeper
+        than that allows, such as thousands of parentheses with the
+        recursive engine, is reported as an error and skipped like any
+        other."""
+        self.__program = True
+        self.__prefix = self._PROGRAM_PREFIX
+        self.__infix = self._PROGRAM_INFIX
+        self.__literals = self._PROGRAM_LITERALS
+        self.__binary = self._PROGRAM_BINARY
+        statements = []
+        try:
+            while self.__current_token.type != TokenType.EOF:
+                try:
+                    statement = self._declaration()
+                except RecursionError:
+                    # Unwound all the way, so reporting has the stack back
+                    self.__report(self.__current_token, "nested too deeply")
+                    self.__synchronize()
+                    continue
+                if statement is not None:
+                    statements.append(statement)
+        except _Abort:
+            pass
+        finally:
+            if self.__print:
+                self.__diagnostics.render()
+
+        return statements
+
+    def __report(self, token: Token, message: str) -> bool:
+        """Adds a diagnostic at `token`. Returns False once no more are
+        wanted, program parses unwind straight away instead."""
+        if self.__diagnostics.report(Diagnostic(
+                self.__filename, token.line, token.column, token.lexeme,
+                message)):
+            return True
+        elif self.__program:
+            raise _Abort()
+        return False
+
+    def __synchronize(self) -> None:
+        """Skips to the end of the broken statement, or to where the next
+        one obviously starts"""
+        skipped = 0
+        token = self.__current_token
+        # The token that broke the statement always goes, unless it closes
+        # an enclosing block
+        if not (self.__blocks and token.type == TokenType.RIGHT_BRACE):
+            type = token.type
+            self._consume(type)
+            skipped += 1
+            while type != TokenType.SEMICOLON \
+                    and self.__current_token.type != TokenType.EOF:
+                type = self.__current_token.type
+                if type in _STATEMENT_STARTS \
+                        or (self.__blocks and type == TokenType.RIGHT_BRACE):
+                    break
+                self._consume(type)
+                skipped += 1
+
+        if self.__stats is not None:
+            self.__stats.recoveries += 1
+            self.__stats.skipped += skipped
+
+    def iter_parse(self) -> Iterator[Expr]:
+        """Yields expressions as soon as they are parsed"""
+        for _, node in self._steps():
+            if node is not None:
+                yield node
+
+    def _steps(self) -> Iterator[Tuple[Token, Expr]]:
+        """Yields the token each top level step started at along with the
+        expression it produced, or None if it failed and had to synchronize.
+
+        The parser carries no state between steps, so every step start is a
+        safe point to resume parsing from."""
         # Synchronization Symbols
         synchronize = (
             TokenType.CLASS,
@@ -240,29 +1528,38 @@ class Parser:
             # etc..
         )
 
-        while self.__current_token.type != TokenType.EOF:
-            try:
-                self.__expressions.append(self._exp())
-                self._consume(TokenType.SEMICOLON)
-            except ParseError:
-                # Print the error
-                file = os.path.basename(self.__filename) if self.__filename else self.__filename
-                line = self.__current_token.line
-                lexeme = self.__current_token.lexeme
-                fstr = f"{file}:{line}" if file else f"{line}"
-                print(
-                    f"\x1b[1;31mParseError at [{fstr}]:\x1b[0m error with '{lexeme}'",
-                    file=sys.stderr
-                )
-
-                # Synchronize
-                while self.__current_token.type != TokenType.EOF:
-                    self._consume(self.__current_token.type)
-
-                    if self.__current_token.type in synchronize:
-                        break
-                    elif self.__current_token.type == TokenType.SEMICOLON:
-                        self._consume(TokenType.SEMICOLON)
-                        break
+        diagnostics = self.__diagnostics
+        try:
+            while self.__current_token.type != TokenType.EOF:
+                start = self.__current_token
+                try:
+                    node = self._exp()
+                    self._consume(TokenType.SEMICOLON)
+                except ParseError as error:
+                    node = None
+                    if not self.__report(self.__current_token, error.message):
+                        # Enough errors, stop rather than recover
+                        yield start, node
+                        return
 
-        return self.__expressions
+                    # Synchronize
+                    skipped = 0
+                    while self.__current_token.type != TokenType.EOF:
+                        self._consume(self.__current_token.type)
+                        skipped += 1
+
+                        if self.__current_token.type in synchronize:
+                            break
+                        elif self.__current_token.type == TokenType.SEMICOLON:
+                            self._consume(TokenType.SEMICOLON)
+                            break
+
+                    if self.__stats is not None:
+                        self.__stats.recoveries += 1
+                        self.__stats.skipped += skipped
+
+                yield start, node
+        finally:
+            # Also when the caller stops early, whatever was found so far
+            if self.__print:
+                diagnostics.render()
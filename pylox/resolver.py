@@ -0,0 +1,240 @@
+"""Static resolution of variables.
+
+Every local variable gets a slot in the frame of the function declaring it,
+blocks included, so the interpreter can keep a call's locals in one fixed
+size list. Each reference is resolved to (depth, slot): how many functions
+out the variable lives, 0 for the current one, and its slot there. Names
+that aren't declared in any enclosing scope are globals and get no binding.
+
+Variables used by nested functions are recorded as cells of the function
+declaring them and as free variables of every function in between, so a
+closure only captures what it uses instead of its whole environment.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from pylox.diagnostics import Diagnostic, Diagnostics
+from pylox.parser import Assign, BlockStmt, ClassStmt, FunctionStmt, Node, \
+    ReturnStmt, Stmt, Super, This, Variable, VarStmt
+from pylox.visitor import Visitor
+
+Binding = Tuple[int, int]
+
+_FUNCTION = "function"
+_METHOD = "method"
+_INITIALIZER = "initializer"
+
+_CLASS = "class"
+_SUBCLASS = "subclass"
+
+
+class FunctionScope:
+    # Slots of the frame, the slots that nested functions capture, and the
+    # (depth, slot) of every variable from outside used in the function or
+    # in functions nested in it, in capture order
+    __slots__ = ("size", "cells", "free")
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.cells = set()
+        self.free: List[Binding] = []
+
+
+class Resolution:
+    def __init__(self) -> None:
+        # Variable, Assign, This, Super and local declarations -> binding
+        self.bindings: Dict[Node, Binding] = {}
+        # The `this` a super expression binds its method to
+        self.receivers: Dict[Super, Binding] = {}
+        # Slot of `super` for classes with a superclass
+        self.supers: Dict[ClassStmt, int] = {}
+        self.functions: Dict[FunctionStmt, FunctionScope] = {}
+        # Frame of the top level code, for variables of top level blocks
+        self.script = FunctionScope()
+
+
+class Resolver(Visitor):
+    def __init__(self, filename: str = None,
+                 diagnostics: Diagnostics = None) -> None:
+        """Errors are collected in `diagnostics`, or printed to stderr at
+        the end without one, like the Parser does"""
+        self.__filename = filename
+        self.__print = diagnostics is None
+        self.__diagnostics = Diagnostics() if diagnostics is None \
+            else diagnostics
+
+    def resolve(self, statements: List[Stmt]) -> Resolution:
+        self.__resolution = Resolution()
+        self.__functions = [self.__resolution.script]
+        # Block scopes as (name -> slot, index of the owning function). A
+        # slot of None is a variable whose initializer is being resolved.
+        self.__scopes: List[Tuple[Dict[str, Optional[int]], int]] = []
+        self.__function = None
+        self.__class = None
+        try:
+            for statement in statements:
+                self.visit(statement)
+        finally:
+            if self.__print:
+                self.__diagnostics.render()
+
+        return self.__resolution
+
+    def __error(self, line: int, lexeme: str, message: str) -> None:
+        self.__diagnostics.report(
+            Diagnostic(self.__filename, line, 0, lexeme, message))
+
+    def __declare(self, name: str, line: int) -> None:
+        names, _ = self.__scopes[-1]
+        if name in names:
+            self.__error(line, name,
+                         "Already a variable with this name in this scope.")
+        names[name] = None
+
+    def __define(self, name: str) -> Binding:
+        names, level = self.__scopes[-1]
+        function = self.__functions[level]
+        slot = names[name] = function.size
+        function.size += 1
+        return (0, slot)
+
+    def __local(self, node: Node, name: str, line: int) -> None:
+        """Declares and defines a name at once, globals at the top level"""
+        if self.__scopes:
+            self.__declare(name, line)
+            self.__resolution.bindings[node] = self.__define(name)
+
+    def __lookup(self, node: Node, name: str, line: int,
+                 table: Dict[Node, Binding] = None) -> None:
+        table = self.__resolution.bindings if table is None else table
+        current = len(self.__functions) - 1
+        for names, level in reversed(self.__scopes):
+            if name in names:
+                slot = names[name]
+                if slot is None:
+                    self.__error(
+                        line, name,
+                        "Can't read local variable in its own initializer.")
+                    return
+
+                depth = current - level
+                table[node] = (depth, slot)
+                if depth:
+                    self.__capture(level, slot)
+                return
+
+    def __capture(self, level: int, slot: int) -> None:
+        self.__functions[level].cells.add(slot)
+        for index in range(level + 1, len(self.__functions)):
+            free = self.__functions[index].free
+            binding = (index - level, slot)
+            if binding not in free:
+                free.append(binding)
+
+    def __resolveFunction(self, node: FunctionStmt, kind: str) -> None:
+        scope = FunctionScope()
+        self.__functions.append(scope)
+        self.__scopes.append(({}, len(self.__functions) - 1))
+        enclosing, self.__function = self.__function, kind
+        # Methods get the instance in slot 0, then the parameters
+        if kind != _FUNCTION:
+            self.__declare("this", node.line)
+            self.__define("this")
+        for param in node._params:
+            self.__declare(param, node.line)
+            self.__define(param)
+
+        for statement in node.body:
+            self.visit(statement)
+
+        self.__function = enclosing
+        self.__scopes.pop()
+        self.__functions.pop()
+        self.__resolution.functions[node] = scope
+
+    def visitNode(self, node: Node) -> None:
+        for child in node.children():
+            self.visit(child)
+
+    def visitBlockStmt(self, node: BlockStmt) -> None:
+        self.__scopes.append(({}, len(self.__functions) - 1))
+        for statement in node._statements:
+            self.visit(statement)
+        self.__scopes.pop()
+
+    def visitVarStmt(self, node: VarStmt) -> None:
+        if not self.__scopes:
+            self.visitNode(node)
+            return
+
+        self.__declare(node._name, node.line)
+        self.visitNode(node)
+        self.__resolution.bindings[node] = self.__define(node._name)
+
+    def visitFunctionStmt(self, node: FunctionStmt) -> None:
+        # Declared first so the function can call itself
+        self.__local(node, node._name, node.line)
+        self.__resolveFunction(node, _FUNCTION)
+
+    def visitClassStmt(self, node: ClassStmt) -> None:
+        self.__local(node, node._name, node.line)
+        enclosing, self.__class = self.__class, _CLASS
+
+        superclass = node._superclass
+        if superclass is not None:
+            if superclass._name == node._name:
+                self.__error(superclass.line, superclass._name,
+                             "A class can't inherit from itself.")
+            self.visit(superclass)
+            self.__class = _SUBCLASS
+            # `super` lives in a scope around the methods
+            self.__scopes.append(({}, len(self.__functions) - 1))
+            self.__declare("super", node.line)
+            self.__resolution.supers[node] = self.__define("super")[1]
+
+        for method in node._methods:
+            kind = _INITIALIZER if method._name == "init" else _METHOD
+            self.__resolveFunction(method, kind)
+
+        if superclass is not None:
+            self.__scopes.pop()
+        self.__class = enclosing
+
+    def visitReturnStmt(self, node: ReturnStmt) -> None:
+        if self.__function is None:
+            self.__error(node.line, "return",
+                         "Can't return from top-level code.")
+        elif node._value is not None and self.__function == _INITIALIZER:
+            self.__error(node.line, "return",
+                         "Can't return a value from an initializer.")
+        self.visitNode(node)
+
+    def visitVariable(self, node: Variable) -> None:
+        self.__lookup(node, node._name, node.line)
+
+    def visitAssign(self, node: Assign) -> None:
+        self.visit(node._value)
+        self.__lookup(node, node._name, node.line)
+
+    def visitThis(self, node: This) -> None:
+        if self.__class is None:
+            self.__error(node.line, "this",
+                         "Can't use 'this' outside of a class.")
+            return
+        self.__lookup(node, "this", node.line)
+
+    def visitSuper(self, node: Super) -> None:
+        if self.__class is None:
+            self.__error(node.line, "super",
+                         "Can't use 'super' outside of a class.")
+        elif self.__class != _SUBCLASS:
+            self.__error(node.line, "super",
+                         "Can't use 'super' in a class with no superclass.")
+        else:
+            self.__lookup(node, "super", node.line)
+            self.__lookup(node, "this", node.line,
+                          self.__resolution.receivers)
+
+
+def resolve(statements: List[Stmt], filename: str = None,
+            diagnostics: Diagnostics = None) -> Resolution:
+    return Resolver(filename, diagnostics).resolve(statements)
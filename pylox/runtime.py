@@ -0,0 +1,107 @@
+"""Lox value semantics shared by everything that computes with values.
+
+Lox values map onto Python ones: numbers are floats, strings are str,
+booleans are bool and nil is None.
+"""
+import math
+
+from pylox.token import TokenType
+
+NUMBER_OPERAND = "Operand must be a number."
+NUMBER_OPERANDS = "Operands must be numbers."
+ADD_OPERANDS = "Operands must be two numbers or two strings."
+
+
+def isTruthy(value) -> bool:
+    """nil and false are falsey, everything else is truthy"""
+    return not (value is None or value is False)
+
+
+def isEqual(a, b) -> bool:
+    """Values of different types are never equal, there is no implicit
+    conversion (so 1 != true, unlike in Python)"""
+    return type(a) is type(b) and a == b
+
+
+class LoxRuntimeError(Exception):
+    """An operation was applied to values of the wrong type"""
+
+    def __init__(self, message: str, line: int) -> None:
+        super().__init__(message, line)
+        self.message = message
+        self.line = line
+
+    def __str__(self):
+        return f"{self.message} [line {self.line}]"
+
+
+def divide(a: float, b: float) -> float:
+    """Lox division follows IEEE 754, dividing by zero gives inf or nan
+    instead of raising"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def stringify(value) -> str:
+    """How Lox prints a value, integral numbers drop the trailing .0"""
+    if value is None:
+        return "nil"
+    elif value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif type(value) is float:
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+    # Strings as they are, functions, classes and instances name themselves
+    return value if type(value) is str else str(value)
+
+
+# Operators as functions of their operands and the operator's line, which
+# is only used for errors
+def negate(value, line: int):
+    if type(value) is not float:
+        raise LoxRuntimeError(NUMBER_OPERAND, line)
+    return -value
+
+
+def logicalNot(value, line: int):
+    return not isTruthy(value)
+
+
+def numeric(fn):
+    """Wraps a binary operation on two numbers with Lox's type check"""
+    def operation(a, b, line: int):
+        if type(a) is not float or type(b) is not float:
+            raise LoxRuntimeError(NUMBER_OPERANDS, line)
+        return fn(a, b)
+    return operation
+
+
+def add(a, b, line: int):
+    if type(a) is type(b) and type(a) in (float, str):
+        return a + b
+    raise LoxRuntimeError(ADD_OPERANDS, line)
+
+
+UNARY_OPERATIONS = {
+    TokenType.MINUS: negate,
+    TokenType.EXCLAIMATION: logicalNot,
+}
+
+BINARY_OPERATIONS = {
+    TokenType.PLUS: add,
+    TokenType.MINUS: numeric(lambda a, b: a - b),
+    TokenType.STAR: numeric(lambda a, b: a * b),
+    TokenType.SLASH: numeric(divide),
+    TokenType.GREATER_THAN: numeric(lambda a, b: a > b),
+    TokenType.GREATER_EQUAL: numeric(lambda a, b: a >= b),
+    TokenType.LESS_THAN: numeric(lambda a, b: a < b),
+    TokenType.LESS_EQUAL: numeric(lambda a, b: a <= b),
+    TokenType.EQUAL_EQUAL: lambda a, b, line: isEqual(a, b),
+    TokenType.EXCLAIMATION_EQUAL: lambda a, b, line: not isEqual(a, b),
+}
@@ -1,33 +1,328 @@
+import enum
+import io
+import mmap
+import os
 import re
 
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
 
-from pylox.token import Token, TokenType, TokenKeywords, TokenCharacters
+from typing import Iterator, List, Tuple
+
+from pylox.symbols import SymbolTable
+from pylox.token import Token, TokenBuffer, TokenType, TokenKeywords, TokenCharacters
+
+
+# Smallest number of bytes worth sending to another process
+PARALLEL_CHUNK = 1 << 20
+
+
+def _decode(raw: bytes) -> str:
+    """Decodes like reading a file opened in text mode does"""
+    return io.TextIOWrapper(io.BytesIO(raw)).read()
+
+
+def _scanChunk(path: str, start: int, end: int, offset: int,
+               line_num: int) -> Tuple[bytes, ...]:
+    """Worker side of Scanner.getTokenBufferParallel()"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            text = _decode(source[start:end])
+
+    buffer = TokenBuffer(text)
+    Scanner._scanInto(buffer.append, text, offset, line_num)
+    return (buffer.types.tobytes(), buffer.starts.tobytes(),
+            buffer.ends.tobytes(), buffer.lines.tobytes())
+
+
+class ScanEngine(enum.Enum):
+    # Original line based scanner, kept around so outputs can be diffed
+    LEGACY = "legacy"
+    # Single pass scanner driven by one precompiled regex
+    REGEX = "regex"
+
+
+# O(1) lookups for the regex engine
+KEYWORDS = {t.value.value: t.value for t in TokenKeywords}
+CHARACTERS = {
+    t.value.value: t.value for t in TokenCharacters if t != TokenCharacters.QUOTE
+}
+
+
+# Integer or decimal literal with an optional exponent, e.g. 12, 1.5, 2e-3.
+# A dot has to be followed by digits to be part of the number.
+NUMBER = r"\d+(?:\.\d+)?(?:[eE][+-]?\d+)?"
+_NUMBER_PATTERN = re.compile(NUMBER)
+# Splits a line for the legacy engine, numbers stay in one piece
+_LEGACY_SPLIT = re.compile(f"(\\b{NUMBER}\\b|\\W)")
+
+
+def _buildPattern() -> re.Pattern:
+    """Builds the master regex from TokenType.
+
+    The alternatives mirror the quirks of the legacy scanner so both engines
+    produce the same token stream: whitespace is trimmed from both ends of a
+    line but only spaces are skipped inside it, two character operators may
+    have spaces between their characters, an unterminated string runs to the
+    end of the (trimmed) line and any other non word character is emitted as
+    a single character identifier.
+    """
+    operators = []
+    for lexeme in sorted(CHARACTERS, key=len, reverse=True):
+        if len(lexeme) > 1:
+            operators.append(" *".join(re.escape(c) for c in lexeme))
+        else:
+            operators.append(re.escape(lexeme))
+
+    return re.compile("|".join((
+        r"(?P<NEWLINE>\n)",
+        r"(?P<SKIP>^[^\S\n]+|[^\S\n]+(?=\n|\Z)| +)",
+        r'"(?P<STRING>[^"\n]*)"',
+        r'"(?P<OPEN_STRING>[^"\n]*?)[^\S\n]*(?=\n|\Z)',
+        f"(?P<NUMBER>{NUMBER})(?!\\w)",
+        r"(?P<WORD>\w+)",
+        f"(?P<OPERATOR>{'|'.join(operators)})",
+        r"(?P<OTHER>.)",
+    )), re.MULTILINE)
+
+
+PATTERN = _buildPattern()
 
 
 class Scanner:
-    def __init__(self, src: str) -> None:
+    # Number of characters read from the source at a time while streaming
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, src: str, engine: ScanEngine = ScanEngine.REGEX,
+                 symbols: SymbolTable = None) -> None:
+        """Identifiers are interned into `symbols`, or a new table which is
+        shared by everything this scanner produces"""
         self.__src = src
-        self.__tokens = []
+        self.__engine = engine
+        self.__tokens = None
+        self.__symbols = SymbolTable() if symbols is None else symbols
 
-        self.__scan()
+    @property
+    def symbols(self) -> SymbolTable:
+        return self.__symbols
 
-    def __scan(self) -> None:
+    def getTokens(self) -> List[Token]:
+        """Scans the whole source on first use and returns the token list"""
+        if self.__tokens is None:
+            self.__tokens = list(self.iter_tokens())
+
+        return self.__tokens
+
+    def getTokenBuffer(self) -> TokenBuffer:
+        """Scans the source into a compact TokenBuffer.
+
+        Always uses the regex engine since the buffer needs source offsets.
+        Lexemes are not copied, the buffer keeps a reference to the source.
+        """
         with open(self.__src) as f:
-            lines = f.readlines()
+            return Scanner.scanBuffer(f.read(), self.__symbols)
 
-            last_line = 0
-            for idx, line in enumerate(lines):
-                last_line = idx
-                tokens = Scanner.__processLine(line, idx)
-                self.__tokens += tokens
+    def getTokenBufferParallel(self, jobs: int = None,
+                               min_chunk: int = PARALLEL_CHUNK) -> TokenBuffer:
+        """Same result as getTokenBuffer(), scanned by worker processes.
 
-        self.__tokens.append(Token(TokenType.EOF, "", last_line))
+        Lines are scanned independently, so the file is cut into chunks at
+        line ends and every worker maps the file and scans its own byte
+        range; only the chunk boundaries go to the workers and only the
+        token arrays come back. Chunks are at least `min_chunk` bytes, a
+        smaller file is scanned in this process.
+        """
+        with open(self.__src, "rb") as f:
+            raw = f.read()
 
-    def getTokens(self) -> List[Token]:
-        return self.__tokens
+        jobs = jobs or os.cpu_count() or 1
+        count = min(jobs * 4, len(raw) // min_chunk)
+        if jobs == 1 or count < 2:
+            return Scanner.scanBuffer(_decode(raw), self.__symbols)
+
+        # Cut just after a newline, a \r\n pair or a multi byte character
+        # is never split. Each chunk is decoded on its own here as well to
+        # find where it starts in the decoded text, in characters and lines.
+        chunks = []
+        texts = []
+        start = offset = line_num = 0
+        for index in range(1, count + 1):
+            end = raw.find(b"\n", len(raw) * index // count) + 1 \
+                if index < count else len(raw)
+            if end <= start:
+                continue
+            text = _decode(raw[start:end])
+            chunks.append((self.__src, start, end, offset, line_num))
+            texts.append(text)
+            offset += len(text)
+            line_num += text.count("\n")
+            start = end
+
+        text = "".join(texts)
+        buffer = TokenBuffer(text, self.__symbols)
+        with ProcessPoolExecutor(jobs) as pool:
+            for arrays in pool.map(_scanChunk, *zip(*chunks)):
+                for target, data in zip((buffer.types, buffer.starts,
+                                         buffer.ends, buffer.lines), arrays):
+                    target.frombytes(data)
+        # Workers have tables of their own, intern in source order here
+        buffer.internIdentifiers()
+
+        if line_num and text.endswith("\n"):
+            line_num -= 1
+        buffer.append(TokenType.EOF, len(text), len(text), line_num)
+
+        return buffer
+
+    @staticmethod
+    def scanBuffer(text: str, symbols: SymbolTable = None) -> TokenBuffer:
+        """Scans a whole source text into a TokenBuffer, ending with EOF"""
+        buffer = TokenBuffer(text, symbols)
+        line_num = Scanner._scanInto(buffer.append, text, 0, 0)
+        buffer.internIdentifiers()
+
+        if line_num and text.endswith("\n"):
+            line_num -= 1
+        buffer.append(TokenType.EOF, len(text), len(text), line_num)
+
+        return buffer
+
+    @staticmethod
+    def _scanInto(append, text: str, offset: int, line_num: int) -> int:
+        """Appends the tokens of text, which starts at character `offset` and
+        line `line_num` of the source, and returns the line it ends on"""
+        for match in PATTERN.finditer(text):
+            kind = match.lastgroup
+
+            if kind == "WORD":
+                type = KEYWORDS.get(match.group(), TokenType.IDENTIFIER)
+                append(type, match.start() + offset, match.end() + offset,
+                       line_num)
+            elif kind == "NUMBER":
+                append(TokenType.NUMBER, match.start() + offset,
+                       match.end() + offset, line_num)
+            elif kind == "OPERATOR":
+                lexeme = match.group()
+                if len(lexeme) > 2:
+                    lexeme = lexeme.replace(" ", "")
+                append(CHARACTERS[lexeme], match.start() + offset,
+                       match.end() + offset, line_num)
+            elif kind == "SKIP":
+                continue
+            elif kind == "NEWLINE":
+                line_num += 1
+            elif kind == "OTHER":
+                append(TokenType.IDENTIFIER, match.start() + offset,
+                       match.end() + offset, line_num)
+            else:
+                append(TokenType.STRING, match.start(kind) + offset,
+                       match.end(kind) + offset, line_num)
+
+        return line_num
+
+    def iter_tokens(self, chunk_size: int = CHUNK_SIZE) -> Iterator[Token]:
+        """Lazily yields tokens while reading the source in chunks.
+
+        Only whole lines are handed to the engine, so memory is bounded by the
+        chunk size and the longest line rather than by the file size. The
+        stream always ends with a single EOF token.
+        """
+        with open(self.__src) as f:
+            if self.__engine == ScanEngine.LEGACY:
+                last_line = 0
+                for idx, line in enumerate(f):
+                    last_line = idx
+                    yield from Scanner.__processLine(
+                        line, idx, self.__symbols)
+            else:
+                line_num = 0
+                pending = []
+                for chunk in iter(lambda: f.read(chunk_size), ""):
+                    cut = chunk.rfind("\n") + 1
+                    if not cut:
+                        pending.append(chunk)
+                        continue
+
+                    pending.append(chunk[:cut])
+                    block = "".join(pending)
+                    pending = [chunk[cut:]]
+
+                    yield from Scanner.__processText(
+                        block, line_num, self.__symbols)
+                    line_num += block.count("\n")
+
+                # Whatever is left is the final line without a newline
+                block = "".join(pending)
+                yield from Scanner.__processText(
+                    block, line_num, self.__symbols)
+                last_line = line_num if block else max(line_num - 1, 0)
+
+        yield Token(TokenType.EOF, "", last_line)
+
+    @staticmethod
+    def scanText(text: str, line_num: int = 0,
+                 symbols: SymbolTable = None) -> Iterator[Token]:
+        """Scans source text with the regex engine without appending EOF.
+
+        Lines are independent of each other, so any run of whole lines can
+        be scanned on its own given the number of its first line, and the
+        symbol table to keep identifier IDs consistent with the rest.
+        """
+        if symbols is None:
+            symbols = SymbolTable()
+        return Scanner.__processText(text, line_num, symbols)
+
+    def __processText(text: str, line_num: int,
+                      symbols: SymbolTable) -> Iterator[Token]:
+        """Scans a block of whole lines in a single pass of the master regex"""
+        intern = symbols.intern
+        names = symbols.names
+        number = symbols.number
+        numbers = symbols.numbers
+        line_start = 0
+        for match in PATTERN.finditer(text):
+            kind = match.lastgroup
+
+            if kind == "NUMBER":
+                lexeme = match.group()
+                # Cache hits skip the method call
+                value = numbers.get(lexeme)
+                if value is None:
+                    value = number(lexeme)
+                yield Token(TokenType.NUMBER, lexeme, line_num,
+                            match.start() - line_start, value=value)
+            elif kind == "WORD":
+                lexeme = match.group()
+                type = KEYWORDS.get(lexeme)
+                if type is not None:
+                    yield Token(type, lexeme, line_num,
+                                match.start() - line_start)
+                else:
+                    # Every occurrence shares the interned string
+                    symbol = intern(lexeme)
+                    yield Token(TokenType.IDENTIFIER, names[symbol],
+                                line_num, match.start() - line_start, symbol)
+            elif kind == "OPERATOR":
+                lexeme = match.group()
+                if len(lexeme) > 2:
+                    lexeme = lexeme.replace(" ", "")
+                yield Token(CHARACTERS[lexeme], lexeme, line_num,
+                            match.start() - line_start)
+            elif kind == "SKIP":
+                continue
+            elif kind == "NEWLINE":
+                line_num += 1
+                line_start = match.end()
+            elif kind == "OTHER":
+                symbol = intern(match.group())
+                yield Token(TokenType.IDENTIFIER, names[symbol], line_num,
+                            match.start() - line_start, symbol)
+            else:
+                # Strings point at their opening quote
+                yield Token(TokenType.STRING, match.group(kind), line_num,
+                            match.start() - line_start)
 
-    def __processLine(line: str, line_num: int) -> List[Token]:
+    def __processLine(line: str, line_num: int,
+                      symbols: SymbolTable) -> List[Token]:
         tokens = []
 
         for idx, s in enumerate(line.rstrip().lstrip().split("\"")):
@@ -36,7 +331,7 @@ class Scanner:
             if idx % 2 == 1:
                 tokens.append(Token(TokenType.STRING, s, line_num))
             else:
-                lexemes_with_ws = re.split('(\\W)', s)
+                lexemes_with_ws = _LEGACY_SPLIT.split(s)
 
                 # Remove whitespace and empty lexemes
                 lexemes = []
@@ -81,9 +376,10 @@ class Scanner:
                             continue
 
                     # Look for numbers
-                    if lexeme.isnumeric():
+                    if _NUMBER_PATTERN.fullmatch(lexeme):
                         tokens.append(
-                            Token(TokenType.NUMBER, lexeme, line_num))
+                            Token(TokenType.NUMBER, lexeme, line_num,
+                                  value=symbols.number(lexeme)))
                         continue
 
                     # Anything left is an identifier
@@ -91,8 +387,10 @@ class Scanner:
                         assert lexeme.find(t.value) < 0, \
                             f"{t.value} found when there should only be identifiers"
 
-                    tokens.append(
-                        Token(TokenType.IDENTIFIER, lexeme, line_num))
+                    symbol = symbols.intern(lexeme)
+                    tokens.append(Token(TokenType.IDENTIFIER,
+                                        symbols.names[symbol], line_num,
+                                        symbol=symbol))
 
         return tokens
 
@@ -0,0 +1,241 @@
+"""A long lived process answering check, parse and dump requests.
+
+Build tools that run pylox on thousands of files pay for starting Python and
+importing pylox on every run. The server pays that once, and keeps the
+parsed files in memory so asking about an unchanged file again skips
+scanning and parsing too. It listens on a Unix domain socket. Requests and
+responses are one JSON object per line each, and a connection can send any
+number of requests:
+
+    {"command": "check", "paths": ["/abs/a.lox"], "format": "human"}
+    {"status": 0, "stdout": "...", "stderr": "..."}
+
+`handle` answers a request, and the client runs it in process when no
+server is listening, so both give the same output.
+"""
+import asyncio
+import io
+import json
+import os
+import socket
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from pylox.diagnostics import RENDERERS, Diagnostic, Diagnostics
+from pylox.parser import Parser, Stmt
+from pylox.scanner import Scanner
+
+DEFAULT_SIZE = 4096
+
+# Reading a request line stops here, enough for a few thousand paths
+REQUEST_LIMIT = 1 << 24
+
+COMMANDS = ("check", "parse", "dump", "shutdown")
+
+
+class Parsed:
+    """A file's text and what parsing it gave"""
+    __slots__ = ("text", "statements", "diagnostics", "tokens")
+
+    def __init__(self, text: str, statements: List[Stmt],
+                 diagnostics: List[Diagnostic], tokens: int) -> None:
+        self.text = text
+        self.statements = statements
+        self.diagnostics = diagnostics
+        self.tokens = tokens
+
+
+class AstCache:
+    """Parsed files by path, keeping the `size` most recently used.
+
+    The file is read on every load and the entry used only if the text is
+    unchanged, which costs a read and a compare instead of trusting
+    timestamps.
+    """
+
+    def __init__(self, size: int = DEFAULT_SIZE) -> None:
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.__entries: "OrderedDict[str, Parsed]" = OrderedDict()
+
+    def load(self, path: str) -> Parsed:
+        """Raises OSError or UnicodeDecodeError if the file can't be read"""
+        with open(path) as f:
+            text = f.read()
+
+        entry = self.__entries.get(path)
+        if entry is not None and entry.text == text:
+            self.hits += 1
+            self.__entries.move_to_end(path)
+            return entry
+
+        self.misses += 1
+        diagnostics = Diagnostics()
+        tokens = list(Scanner.scanBuffer(text))
+        statements = Parser(tokens, path,
+                            diagnostics=diagnostics).parseProgram()
+        entry = self.__entries[path] = Parsed(
+            text, statements, diagnostics.records, len(tokens))
+        self.__entries.move_to_end(path)
+        while len(self.__entries) > self.size:
+            self.__entries.popitem(last=False)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+def _error(message: str) -> dict:
+    return {"status": 2, "stdout": "", "stderr": f"pylox: {message}\n"}
+
+
+def handle(request: dict, cache: AstCache) -> dict:
+    """Runs one request. `check` prints diagnostics like `pylox check`,
+    `parse` a line per file that parsed and `dump` the AST, both with
+    diagnostics on stderr. The status is 1 if any file had errors and 2 for
+    a malformed request."""
+    if not isinstance(request, dict) or request.get("command") not in \
+            COMMANDS:
+        return _error("unknown command")
+    command = request["command"]
+    if command == "shutdown":
+        # The server stops once it has answered
+        return {"status": 0, "stdout": "", "stderr": ""}
+    paths = request.get("paths", [])
+    format = request.get("format", "human")
+    if format not in RENDERERS or not isinstance(paths, list) \
+            or not all(isinstance(path, str) for path in paths):
+        return _error(f"bad {command} request")
+
+    render = RENDERERS[format]
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    status = 0
+    for path in paths:
+        try:
+            parsed = cache.load(path)
+        except (OSError, UnicodeDecodeError) as e:
+            parsed = None
+            diagnostics = [
+                Diagnostic(path, 0, 0, None, f"cannot read file: {e}")]
+        else:
+            diagnostics = parsed.diagnostics
+
+        if diagnostics:
+            status = 1
+        if command == "check":
+            stdout.write(render(diagnostics))
+            continue
+
+        stderr.write(render(diagnostics))
+        if parsed is None:
+            continue
+        elif command == "parse":
+            stdout.write(f"{path}: {len(parsed.statements)} statements, "
+                         f"{parsed.tokens} tokens\n")
+        else:
+            for statement in parsed.statements:
+                statement.print(file=stdout)
+
+    return {"status": status, "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue()}
+
+
+class Server:
+    """Serves requests from any number of clients at once. Requests run one
+    at a time on a thread of their own, so they share the cache without
+    locks while the event loop keeps accepting connections and reading
+    requests. A request that fails gets an error response instead of
+    ending its connection."""
+
+    def __init__(self, path: str, cache: Optional[AstCache] = None) -> None:
+        self.path = path
+        self.cache = AstCache() if cache is None else cache
+        self.__server = None
+        self.__stopped = None
+        self.__executor = None
+
+    async def start(self) -> None:
+        """Listens on the socket, replacing one left behind by a server that
+        is gone. Raises OSError if a server is listening there."""
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX)
+            try:
+                probe.connect(self.path)
+            except ConnectionRefusedError:
+                os.remove(self.path)
+            else:
+                raise OSError(f"a server is already listening on {self.path}")
+            finally:
+                probe.close()
+
+        self.__stopped = asyncio.Event()
+        self.__executor = ThreadPoolExecutor(1)
+        self.__server = await asyncio.start_unix_server(
+            self.__serve, self.path, limit=REQUEST_LIMIT)
+
+    async def run(self) -> None:
+        """Serves until a shutdown request"""
+        await self.start()
+        try:
+            await self.__stopped.wait()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        self.__server.close()
+        await self.__server.wait_closed()
+        self.__executor.shutdown()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def __serve(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(self.__encode(_error("request too long")))
+                    break
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                    response = _error("request is not JSON")
+                else:
+                    response = await asyncio.get_running_loop() \
+                        .run_in_executor(self.__executor, self.__handle,
+                                         request)
+                writer.write(self.__encode(response))
+                await writer.drain()
+                if isinstance(request, dict) \
+                        and request.get("command") == "shutdown":
+                    self.__stopped.set()
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def __handle(self, request) -> dict:
+        try:
+            return handle(request, self.cache)
+        except Exception as e:
+            # Such as a RecursionError from a file nested too deeply
+            return _error(f"internal error: {e!r}")
+
+    @staticmethod
+    def __encode(response: dict) -> bytes:
+        return json.dumps(response).encode() + b"\n"
+
+
+def serve(path: str, cache: Optional[AstCache] = None) -> None:
+    """Runs a server on `path` until it is asked to shut down"""
+    asyncio.run(Server(path, cache).run())
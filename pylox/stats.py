@@ -0,0 +1,146 @@
+"""Opt-in instrumentation of the scanner and parser.
+
+A Stats object records where the time went for one or more files: wall time
+per phase (read, scan, parse), the number of tokens of each type, calls,
+cumulative time and time spent in the rule itself per grammar rule, and how
+often the parser had to recover from an error. Nothing is measured unless a
+Stats object is handed to the Parser, which then wraps the rules of that one
+instance, so parsing without one runs the plain methods.
+"""
+import json
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from pylox.token import TOKEN_TYPES
+
+# Parser methods timed as grammar rules. The Pratt engine's prefix and infix
+# handlers are called through its tables rather than the instance, their
+# time shows up under _pratt.
+RULES = (
+    "_exp",
+    "_equality",
+    "_compare",
+    "_term",
+    "_factor",
+    "_unary",
+    "_grouping",
+    "_primary",
+    "_pratt",
+    "_iterative",
+    "_assignment",
+    "_or",
+    "_and",
+    "_call",
+    "_declaration",
+    "_classDecl",
+    "_function",
+    "_varDecl",
+    "_statement",
+    "_forStmt",
+    "_ifStmt",
+    "_printStmt",
+    "_returnStmt",
+    "_whileStmt",
+    "_block",
+    "_expressionStatement",
+)
+
+
+class Stats:
+    def __init__(self) -> None:
+        # Phase name -> seconds
+        self.phases: Dict[str, float] = {}
+        # TokenType name -> count
+        self.tokens: Counter = Counter()
+        # Rule name -> [calls, cumulative seconds, seconds in the rule itself]
+        self.rules: Dict[str, list] = {}
+        # Errors recovered from, and tokens skipped while synchronizing
+        self.recoveries = 0
+        self.skipped = 0
+        self.files = 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Adds the wall time of the with block to the phase `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) \
+                + time.perf_counter() - start
+
+    def countTokens(self, types: Iterable[int]) -> None:
+        """Counts token type codes, such as TokenBuffer.types"""
+        for code, count in Counter(types).items():
+            self.tokens[TOKEN_TYPES[code].name] += count
+
+    def instrument(self, parser) -> None:
+        """Replaces the grammar rules of one parser instance with timed
+        versions. Rules call each other through self, so every call,
+        recursive ones included, goes through the wrappers."""
+        # Time spent in nested rules, one entry per active call
+        children = []
+        for name in RULES:
+            setattr(parser, name,
+                    self.__timed(name, getattr(parser, name), children))
+
+    def __timed(self, name: str, rule: Callable,
+                children: List[float]) -> Callable:
+        entry = self.rules.setdefault(name, [0, 0.0, 0.0])
+        clock = time.perf_counter
+        # Only the outermost of nested calls to the same rule adds to the
+        # cumulative time, so recursion isn't counted twice
+        depth = 0
+
+        def timed(*args):
+            nonlocal depth
+            entry[0] += 1
+            depth += 1
+            children.append(0.0)
+            start = clock()
+            try:
+                return rule(*args)
+            finally:
+                elapsed = clock() - start
+                depth -= 1
+                if not depth:
+                    entry[1] += elapsed
+                entry[2] += elapsed - children.pop()
+                if children:
+                    children[-1] += elapsed
+
+        return timed
+
+    def merge(self, other: "Stats") -> None:
+        """Adds the counts and times of another Stats, e.g. from a worker"""
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.tokens.update(other.tokens)
+        for name, values in other.rules.items():
+            entry = self.rules.setdefault(name, [0, 0.0, 0.0])
+            for index, value in enumerate(values):
+                entry[index] += value
+        self.recoveries += other.recoveries
+        self.skipped += other.skipped
+        self.files += other.files
+
+    def toDict(self) -> dict:
+        return {
+            "files": self.files,
+            "phases": dict(self.phases),
+            "tokens": dict(self.tokens.most_common()),
+            "rules": {
+                name: {"calls": calls, "seconds": seconds,
+                       "self_seconds": own}
+                for name, (calls, seconds, own) in self.rules.items()
+                if calls
+            },
+            "recoveries": self.recoveries,
+            "skipped_tokens": self.skipped,
+        }
+
+    def toJson(self) -> str:
+        return json.dumps(self.toDict(), indent=2)
@@ -0,0 +1,52 @@
+from typing import Dict, Iterator, List, Optional
+
+
+class SymbolTable:
+    """Interned identifiers and number literals of one compilation.
+
+    Every distinct name gets a dense integer ID in the order it is first
+    seen, so later stages can index lists by symbol instead of hashing
+    strings, and every occurrence of a name shares one string object.
+    Number literals are converted once per distinct lexeme and equal values
+    share one float.
+    """
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        # Lexeme -> value, and value -> the one shared float
+        self.numbers: Dict[str, float] = {}
+        self.__values: Dict[float, float] = {}
+
+    def number(self, lexeme: str) -> float:
+        value = self.numbers.get(lexeme)
+        if value is None:
+            value = float(lexeme)
+            value = self.numbers[lexeme] = \
+                self.__values.setdefault(value, value)
+
+        return value
+
+    def intern(self, name: str) -> int:
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+
+        return symbol
+
+    def lookup(self, name: str) -> Optional[int]:
+        """ID of a name without adding it"""
+        return self.ids.get(name)
+
+    def name(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
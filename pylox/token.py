@@ -1,6 +1,11 @@
 import enum
 
-from pyparsing import Enum
+from array import array
+from itertools import compress
+
+from typing import Optional
+
+from pylox.symbols import SymbolTable
 
 
 class TokenType(enum.Enum):
@@ -55,8 +60,17 @@ class TokenType(enum.Enum):
 
     EOF = "eof"
 
+    # Members are singletons compared by identity, so the identity hash is
+    # consistent with equality and skips Enum's Python level __hash__. Token
+    # types are used as dict keys in every hot lookup table.
+    __hash__ = object.__hash__
+
 
-class TokenKeywords(Enum):
+# Enum member lookups are slow, Token.__init__ runs for every token
+_NUMBER = TokenType.NUMBER
+
+
+class TokenKeywords(enum.Enum):
     """This is a helper enum so we can easily search for tokens that can only
     exist as keywords"""
     AND = TokenType.AND
@@ -76,7 +90,7 @@ class TokenKeywords(Enum):
     VAR = TokenType.VAR
     WHILE = TokenType.WHILE
 
-class TokenCharacters(Enum):
+class TokenCharacters(enum.Enum):
     """This is a helper enum so we can easily search for tokens that don't need
     to exist by themselves"""
     COMMA = TokenType.COMMA
@@ -101,10 +115,170 @@ class TokenCharacters(Enum):
     LESS_EQUAL = TokenType.LESS_EQUAL
 
 class Token:
-    def __init__(self, type: TokenType, lexeme: str, line: int):
+    # Symbol table ID of an identifier and the converted value of a number.
+    # Only tokens that have one store it, every other token falls back to
+    # these class attributes.
+    symbol = None
+    value = None
+
+    def __init__(self, type: TokenType, lexeme: str, line: int,
+                 column: int = 0, symbol: int = None, value: float = None):
         self.type = type
         self.lexeme = lexeme
         self.line = line
+        # Only used to point at errors, so not part of equality. The legacy
+        # scanner doesn't track it and leaves it at 0.
+        self.column = column
+        if symbol is not None:
+            self.symbol = symbol
+        if value is not None:
+            self.value = value
+        elif type is _NUMBER:
+            # Scanners hand in shared values, this covers tokens made by hand
+            self.value = float(lexeme)
+
+    def __str__(self) -> str:
+        return f"[{self.line}] {self.lexeme} -> {self.type}"
+
+    def __eq__(self, obj):
+        return self.type == obj.type \
+            and self.lexeme == obj.lexeme \
+            and self.line == obj.line
+
+
+# Small integer codes for each TokenType, used by compact token storage
+TOKEN_TYPES = tuple(TokenType)
+TOKEN_CODES = {t: code for code, t in enumerate(TOKEN_TYPES)}
+_STRING_CODE = TOKEN_CODES[TokenType.STRING]
+_IDENTIFIER_CODE = TOKEN_CODES[TokenType.IDENTIFIER]
+_NUMBER_CODE = TOKEN_CODES[TokenType.NUMBER]
+# Maps identifier codes to 1 and every other code to 0
+_IDENTIFIER_MASK = bytes(
+    code == _IDENTIFIER_CODE for code in range(256))
+
+# Lexemes that are fully determined by the token type. Literals are the only
+# tokens whose text has to come from the source.
+_FIXED_LEXEMES = tuple(
+    None if t in (TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING)
+    else "" if t == TokenType.EOF
+    else t.value
+    for t in TOKEN_TYPES
+)
+
+
+class TokenBuffer:
+    """Struct of arrays token storage.
+
+    Token types are stored as one byte codes and offsets/lines as unsigned
+    ints, so a token costs 13 bytes instead of a full Token object. Lexemes
+    are only sliced out of the source when they are asked for.
+    """
+
+    def __init__(self, source: str, symbols: SymbolTable = None) -> None:
+        self.source = source
+        # Whoever fills the buffer interns its identifiers, see
+        # internIdentifiers()
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.types = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.lines = array("I")
+
+    def append(self, type: TokenType, start: int, end: int, line: int) -> None:
+        self.types.append(TOKEN_CODES[type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def internIdentifiers(self) -> None:
+        """Interns every identifier in source order, which gives them the
+        symbol IDs Scanner.getTokens() gives the same source"""
+        # Everything runs in C but interning the distinct names
+        mask = self.types.tobytes().translate(_IDENTIFIER_MASK)
+        slices = map(slice, compress(self.starts, mask),
+                     compress(self.ends, mask))
+        for name in dict.fromkeys(map(self.source.__getitem__, slices)):
+            self.symbols.intern(name)
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        lexeme = _FIXED_LEXEMES[self.types[index]]
+        if lexeme is None:
+            lexeme = self.source[self.starts[index]:self.ends[index]]
+
+        return lexeme
+
+    def line(self, index: int) -> int:
+        return self.lines[index]
+
+    def symbol(self, index: int) -> Optional[int]:
+        if self.types[index] != _IDENTIFIER_CODE:
+            return None
+        return self.symbols.intern(self.lexeme(index))
+
+    def value(self, index: int) -> Optional[float]:
+        """Converted on first use through the symbol table's literal cache"""
+        if self.types[index] != _NUMBER_CODE:
+            return None
+        return self.symbols.number(self.lexeme(index))
+
+    def column(self, index: int) -> int:
+        """Computed from the source, since only errors ever need it"""
+        start = self.starts[index]
+        if self.types[index] == _STRING_CODE:
+            # Strings are stored without quotes, point at the opening one
+            start -= 1
+        return start - self.source.rfind("\n", 0, start) - 1
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> "TokenView":
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError("token index out of range")
+
+        return TokenView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
+
+
+class TokenView:
+    """Token compatible view of a single entry in a TokenBuffer"""
+    __slots__ = ("_buffer", "_index")
+
+    def __init__(self, buffer: TokenBuffer, index: int) -> None:
+        self._buffer = buffer
+        self._index = index
+
+    @property
+    def type(self) -> TokenType:
+        return TOKEN_TYPES[self._buffer.types[self._index]]
+
+    @property
+    def lexeme(self) -> str:
+        return self._buffer.lexeme(self._index)
+
+    @property
+    def line(self) -> int:
+        return self._buffer.lines[self._index]
+
+    @property
+    def column(self) -> int:
+        return self._buffer.column(self._index)
+
+    @property
+    def symbol(self) -> Optional[int]:
+        return self._buffer.symbol(self._index)
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._buffer.value(self._index)
 
     def __str__(self) -> str:
         return f"[{self.line}] {self.lexeme} -> {self.type}"
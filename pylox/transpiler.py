@@ -0,0 +1,178 @@
+"""Runs Lox expressions as CPython bytecode.
+
+Expression trees are translated into a Python `ast`, compiled once with
+`compile()` and then executed as native code objects. Lox and Python
+disagree on truthiness, equality and `+`, so operators whose operand types
+aren't known statically call the helpers from `pylox.runtime`. When both
+operands are known numbers (or strings for `+`) the native operator is used
+instead. Generated nodes carry their Lox line, so tracebacks point at the
+right line of the script (Python counts from 1, Lox lines from 0) and helper
+errors are LoxRuntimeErrors like everywhere else. Variables become Python
+globals of the generated code, prefixed so they can't shadow the helpers.
+"""
+import ast
+
+from types import CodeType
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+from pylox.optimizer import BOOL, NIL, NUMBER, STRING
+from pylox.parser import (BinaryOp, Bool, Constant, Expr, Nil, String,
+                          UnaryOp, Variable)
+from pylox.runtime import BINARY_OPERATIONS, UNARY_OPERATIONS, LoxRuntimeError
+from pylox.token import TokenType
+from pylox.traverse import fold
+
+_LITERAL_TYPES = {
+    Constant: NUMBER,
+    String: STRING,
+    Bool: BOOL,
+    Nil: NIL,
+}
+
+# Native operators, only emitted when operand types make them match Lox
+_ARITHMETIC = {
+    TokenType.PLUS: ast.Add,
+    TokenType.MINUS: ast.Sub,
+    TokenType.STAR: ast.Mult,
+    TokenType.SLASH: ast.Div,
+}
+
+_COMPARISON = {
+    TokenType.GREATER_THAN: ast.Gt,
+    TokenType.GREATER_EQUAL: ast.GtE,
+    TokenType.LESS_THAN: ast.Lt,
+    TokenType.LESS_EQUAL: ast.LtE,
+}
+
+_EQUALITY = {
+    TokenType.EQUAL_EQUAL: ast.Eq,
+    TokenType.EXCLAIMATION_EQUAL: ast.NotEq,
+}
+
+
+def _helper(prefix: str, op: TokenType) -> str:
+    return f"_{prefix}_{op.name.lower()}"
+
+
+_VARIABLE = "_var_"
+
+
+# Globals the generated code runs with, nothing but the helpers
+_NAMESPACE = {"__builtins__": {}}
+_NAMESPACE.update(
+    (_helper("unary", op), fn) for op, fn in UNARY_OPERATIONS.items())
+_NAMESPACE.update(
+    (_helper("binary", op), fn) for op, fn in BINARY_OPERATIONS.items())
+
+
+def transpile(nodes: Iterable[Expr]) -> ast.Expression:
+    """Python expression evaluating to the list of the statements' values"""
+    values = [fold(node, _translate)[0] for node in nodes]
+    tree = ast.Expression(
+        body=_at(ast.List(elts=values, ctx=ast.Load()), 1))
+    return ast.fix_missing_locations(tree)
+
+
+def compileProgram(nodes: Iterable[Expr],
+                   filename: str = "<lox>") -> CodeType:
+    """Code object for the statements, hand it to `run` as often as needed.
+
+    CPython's compiler recurses on nesting, so very deep expressions fail
+    here with a RecursionError instead of at runtime.
+    """
+    return compile(transpile(nodes), filename, "eval")
+
+
+def run(code: CodeType,
+        globals: Optional[Mapping[str, object]] = None) -> List:
+    """Executes a compiled program and returns every statement's value,
+    variables are read from `globals`"""
+    namespace = dict(_NAMESPACE)
+    if globals:
+        namespace.update(
+            (_VARIABLE + name, value) for name, value in globals.items())
+    try:
+        return eval(code, namespace)
+    except NameError as e:
+        # Only variables are looked up by name, the innermost frame is the
+        # generated code and its line is the variable's
+        traceback = e.__traceback__
+        while traceback.tb_next is not None:
+            traceback = traceback.tb_next
+        name = e.name[len(_VARIABLE):]
+        raise LoxRuntimeError(f"Undefined variable '{name}'.",
+                              traceback.tb_lineno - 1) from None
+
+
+def _translate(node: Expr, children: list) -> Tuple[ast.expr, str]:
+    """Python expression for the node and its static type, None if
+    unknown"""
+    if isinstance(node, BinaryOp):
+        (left, left_type), (right, right_type) = children
+        return _binary(node, left, left_type, right, right_type)
+    elif isinstance(node, UnaryOp):
+        return _unary(node, *children[0])
+    elif isinstance(node, Variable):
+        name = ast.Name(_VARIABLE + node._name, ast.Load())
+        return _at(name, node.line + 1), None
+
+    return ast.Constant(node.value), _LITERAL_TYPES[type(node)]
+
+
+def _binary(node: BinaryOp, left: ast.expr, left_type: str,
+            right: ast.expr, right_type: str) -> Tuple[ast.expr, str]:
+    op = node._op
+    line = node.line + 1
+    numbers = left_type == NUMBER and right_type == NUMBER
+
+    if op in _EQUALITY:
+        if left_type is not None and left_type == right_type:
+            compare = ast.Compare(left, [_EQUALITY[op]()], [right])
+            return _at(compare, line), BOOL
+        return _call("binary", node, [left, right]), BOOL
+
+    if op in _COMPARISON:
+        if numbers:
+            compare = ast.Compare(left, [_COMPARISON[op]()], [right])
+            return _at(compare, line), BOOL
+        return _call("binary", node, [left, right]), BOOL
+
+    if op == TokenType.PLUS:
+        if left_type == right_type and left_type in (NUMBER, STRING):
+            return _at(ast.BinOp(left, ast.Add(), right), line), left_type
+        return _call("binary", node, [left, right]), None
+
+    # Dividing by zero has to give inf or nan, so only a literal non zero
+    # divisor can use the native operator
+    native = numbers and (op != TokenType.SLASH or (
+        isinstance(right, ast.Constant) and right.value != 0))
+    if native:
+        return _at(ast.BinOp(left, _ARITHMETIC[op](), right), line), NUMBER
+    return _call("binary", node, [left, right]), NUMBER
+
+
+def _unary(node: UnaryOp, right: ast.expr,
+           right_type: str) -> Tuple[ast.expr, str]:
+    if node._op == TokenType.EXCLAIMATION:
+        if right_type == BOOL:
+            return _at(ast.UnaryOp(ast.Not(), right), node.line + 1), BOOL
+        return _call("unary", node, [right]), BOOL
+
+    if right_type == NUMBER:
+        return _at(ast.UnaryOp(ast.USub(), right), node.line + 1), NUMBER
+    return _call("unary", node, [right]), NUMBER
+
+
+def _at(node: ast.AST, line: int) -> ast.AST:
+    """Places the node on a Python line, children without one inherit it"""
+    node.lineno = node.end_lineno = line
+    node.col_offset = node.end_col_offset = 0
+    return node
+
+
+def _call(prefix: str, node: Expr, args: List[ast.expr]) -> ast.Call:
+    """Calls the runtime helper for the node's operator, which reports errors
+    with the node's line"""
+    line = node.line + 1
+    function = _at(ast.Name(_helper(prefix, node._op), ast.Load()), line)
+    return _at(ast.Call(function, args + [ast.Constant(node.line)], []), line)
@@ -0,0 +1,42 @@
+from typing import Any, Callable, Iterator, List
+
+from pylox.parser import Expr
+
+
+def walk(node: Expr) -> Iterator[Expr]:
+    """Yields every node of the tree in pre-order without recursing"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children()))
+
+
+def fold(node: Expr, fn: Callable[[Expr, List[Any]], Any]) -> Any:
+    """Post-order reduction without recursing.
+
+    fn is called once per node with the node and the results of its
+    children, in order, and its return value is handed to the parent. This
+    is the building block for evaluating or rewriting deep trees.
+    """
+    # Each frame is a node and the results of the children visited so far
+    stack = [(node, [])]
+    while True:
+        node, values = stack[-1]
+        children = node.children()
+
+        if len(values) < len(children):
+            stack.append((children[len(values)], []))
+            continue
+
+        stack.pop()
+        result = fn(node, values)
+        if not stack:
+            return result
+
+        stack[-1][1].append(result)
+
+
+def depth(node: Expr) -> int:
+    """Height of the tree, a single node has depth 1"""
+    return fold(node, lambda _, values: 1 + max(values, default=0))
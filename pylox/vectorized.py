@@ -0,0 +1,321 @@
+"""Columnar evaluation of Lox expressions over NumPy arrays.
+
+`evaluateColumns` evaluates one expression for every row of a table at
+once: variables name columns, and each operator runs as a single array
+operation. Lox semantics are kept per row. Nil rows are tracked with masks,
+operands of the wrong type raise for the first row that would fail in a row
+by row evaluation, and `and`/`or` only hold the right side to account for
+the rows that actually evaluate it.
+
+Only expressions over literals and variables can be vectorized. Calls,
+property access, assignment and the like raise VectorizeError.
+"""
+from typing import Mapping, Optional
+
+import numpy as np
+
+from pylox.parser import BinaryOp, Compound, Expr, ExpressionStmt, \
+    Logical, Node, UnaryOp, Variable
+from pylox.runtime import ADD_OPERANDS, NUMBER_OPERAND, NUMBER_OPERANDS, \
+    LoxRuntimeError, divide
+from pylox.token import TokenType
+from pylox.visitor import Visitor
+
+NUMBER = "number"
+BOOL = "bool"
+STRING = "string"
+NIL = "nil"
+
+
+class VectorizeError(Exception):
+    """The expression uses something that can't run as array operations"""
+
+    def __init__(self, message: str, line: int) -> None:
+        super().__init__(message, line)
+        self.message = message
+        self.line = line
+
+    def __str__(self):
+        return f"{self.message} [line {self.line}]"
+
+
+class RowError(LoxRuntimeError):
+    """A runtime error, at the first row that would have failed"""
+
+    def __init__(self, message: str, line: int, row: int) -> None:
+        super().__init__(message, line)
+        self.row = row
+
+    def __str__(self):
+        return f"{self.message} [line {self.line}, row {self.row}]"
+
+
+class Column:
+    """Values of one expression for every row, all of one Lox type.
+
+    `values` is an array, or a single value shared by every row for
+    literals, and `nil` marks the rows that are nil, None if none are. What
+    `values` holds in nil rows doesn't matter.
+    """
+    __slots__ = ("kind", "values", "nil")
+
+    def __init__(self, kind: str, values, nil=None) -> None:
+        self.kind = kind
+        self.values = values
+        self.nil = nil
+
+
+def _column(name: str, array, rows: int) -> Column:
+    """Converts an input array, with None or a mask for nil"""
+    nil = np.ma.getmaskarray(array) if np.ma.isMaskedArray(array) else None
+    values = np.ma.getdata(array)
+    if len(values) != rows:
+        raise ValueError(f"column '{name}' has {len(values)} rows, "
+                         f"expected {rows}")
+
+    code = values.dtype.kind
+    if code == "b":
+        return Column(BOOL, values, nil)
+    elif code in "iuf":
+        return Column(NUMBER, values.astype(np.float64, copy=False), nil)
+    elif code in "US":
+        return Column(STRING, values.astype(str).astype(object), nil)
+
+    # Object arrays are whatever Python values they hold, None for nil
+    none = np.equal(values, None)
+    nil = none if nil is None else nil | none
+    types = {type(value) for value in values[~nil]}
+    if not types:
+        return Column(NIL, None, np.True_)
+    elif types == {str}:
+        kind = STRING
+    elif types == {bool}:
+        kind = BOOL
+    elif types <= {int, float}:
+        kind = NUMBER
+    else:
+        names = ", ".join(sorted(t.__name__ for t in types))
+        raise VectorizeError(f"column '{name}' mixes {names} values", 0)
+    return Column(kind, _fill(kind, values, nil), nil)
+
+
+def _fill(kind: str, values, nil):
+    """Values of the column's type in nil rows, so operations on whole
+    columns never see None"""
+    return np.where(nil, _FILLS[kind], values).astype(_DTYPES[kind])
+
+
+def _literal(value) -> Column:
+    if value is None:
+        return Column(NIL, None, np.True_)
+    elif type(value) is bool:
+        return Column(BOOL, value)
+    elif type(value) is str:
+        return Column(STRING, value)
+    return Column(NUMBER, np.float64(value))
+
+
+def _nil(column: Column):
+    return np.False_ if column.nil is None else column.nil
+
+
+def _truthy(column: Column):
+    """Rows where the value is neither nil nor false"""
+    if column.kind == NIL:
+        return np.False_
+    elif column.kind == BOOL:
+        return column.values & ~_nil(column)
+    return ~_nil(column)
+
+
+_DTYPES = {NUMBER: np.float64, BOOL: bool, STRING: object}
+_FILLS = {NUMBER: 0.0, BOOL: False, STRING: ""}
+
+_ARITHMETIC = {
+    TokenType.MINUS: np.subtract,
+    TokenType.STAR: np.multiply,
+    TokenType.SLASH: np.divide,
+    TokenType.GREATER_THAN: np.greater,
+    TokenType.GREATER_EQUAL: np.greater_equal,
+    TokenType.LESS_THAN: np.less,
+    TokenType.LESS_EQUAL: np.less_equal,
+}
+
+_COMPARISONS = (
+    TokenType.GREATER_THAN,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS_THAN,
+    TokenType.LESS_EQUAL,
+)
+
+
+class _Evaluator(Visitor):
+    """Visit methods take the node and the rows it is evaluated for, as a
+    mask or True for all of them, and return a Column"""
+
+    def __init__(self, columns: Mapping[str, object], rows: int) -> None:
+        self.__inputs = columns
+        self.__columns = {}
+        self.rows = rows
+        # (first failing row, message, line) in evaluation order
+        self.__failures = []
+
+    def evaluate(self, node: Node) -> Column:
+        column = self.visit(node, True)
+        if self.__failures:
+            # A row stops at its first error, and the first row to fail
+            # is the one reported
+            row, message, line = min(self.__failures, key=lambda f: f[0])
+            raise RowError(message, line, row)
+        return column
+
+    def __fail(self, message: str, line: int, rows) -> None:
+        """Records an error for `rows`, when any of them are evaluated"""
+        if np.ndim(rows):
+            if rows.any():
+                self.__failures.append((int(np.argmax(rows)), message, line))
+        elif rows and self.rows:
+            self.__failures.append((0, message, line))
+
+    def default(self, node: Node, active) -> Column:
+        raise VectorizeError(
+            f"{type(node).__name__} can't be vectorized",
+            getattr(node, "line", 0))
+
+    def visitExpressionStmt(self, node: ExpressionStmt, active) -> Column:
+        return self.visit(node._expression, active)
+
+    def visitExpr(self, node: Expr, active) -> Column:
+        return _literal(node.value)
+
+    def visitVariable(self, node: Variable, active) -> Column:
+        column = self.__columns.get(node._name)
+        if column is None:
+            if node._name not in self.__inputs:
+                raise LoxRuntimeError(
+                    f"Undefined variable '{node._name}'.", node.line)
+            column = self.__columns[node._name] = _column(
+                node._name, self.__inputs[node._name], self.rows)
+        return column
+
+    def visitCompound(self, node: Compound, active) -> Column:
+        return self.default(node, active)
+
+    def visitUnaryOp(self, node: UnaryOp, active) -> Column:
+        right = self.visit(node._right, active)
+        if node._op == TokenType.EXCLAIMATION:
+            return Column(BOOL, ~_truthy(right))
+
+        if right.kind != NUMBER:
+            self.__fail(NUMBER_OPERAND, node.line, active)
+            return Column(NUMBER, np.float64(0))
+        self.__fail(NUMBER_OPERAND, node.line, _nil(right) & active)
+        return Column(NUMBER, -right.values, right.nil)
+
+    def visitBinaryOp(self, node: BinaryOp, active) -> Column:
+        left = self.visit(node._left, active)
+        right = self.visit(node._right, active)
+        op = node._op
+        if op == TokenType.EQUAL_EQUAL:
+            return Column(BOOL, self.__equal(left, right))
+        elif op == TokenType.EXCLAIMATION_EQUAL:
+            return Column(BOOL, ~self.__equal(left, right))
+
+        kinds = (left.kind, right.kind)
+        if op == TokenType.PLUS and kinds == (STRING, STRING):
+            message = ADD_OPERANDS
+        elif kinds == (NUMBER, NUMBER):
+            message = ADD_OPERANDS if op == TokenType.PLUS \
+                else NUMBER_OPERANDS
+        else:
+            self.__fail(ADD_OPERANDS if op == TokenType.PLUS
+                        else NUMBER_OPERANDS, node.line, active)
+            # No row evaluates this, any column of the right type will do
+            return Column(BOOL if op in _COMPARISONS else NUMBER,
+                          np.False_ if op in _COMPARISONS else np.float64(0))
+
+        nil = _nil(left) | _nil(right)
+        self.__fail(message, node.line, nil & active)
+        if op == TokenType.PLUS:
+            return Column(left.kind, left.values + right.values)
+        elif op == TokenType.SLASH and not np.ndim(left.values) \
+                and not np.ndim(right.values):
+            # Lox division by zero without NumPy's scalar warnings
+            return Column(NUMBER, np.float64(
+                divide(float(left.values), float(right.values))))
+
+        values = _ARITHMETIC[op](left.values, right.values)
+        return Column(BOOL if op in _COMPARISONS else NUMBER, values)
+
+    def __equal(self, left: Column, right: Column):
+        """Rows where Lox's == holds: both nil, or neither and the same
+        type and value"""
+        left_nil = _nil(left)
+        right_nil = _nil(right)
+        both = left_nil & right_nil
+        if left.kind != right.kind or left.kind == NIL:
+            return both
+        return both | (~left_nil & ~right_nil
+                       & np.asarray(left.values == right.values, dtype=bool))
+
+    def visitLogical(self, node: Logical, active) -> Column:
+        left = self.visit(node._left, active)
+        truthy = _truthy(left)
+        # Rows that go on to evaluate the right side
+        if node._op == TokenType.OR:
+            right = self.visit(node._right, active & ~truthy)
+            keep = truthy
+        else:
+            right = self.visit(node._right, active & truthy)
+            keep = ~truthy
+
+        # A side no row takes can be of any type
+        if not np.any(keep & active):
+            return right
+        elif not np.any(~keep & active):
+            return left
+
+        kinds = {left.kind, right.kind} - {NIL}
+        if len(kinds) > 1:
+            raise VectorizeError(
+                f"'{node._op.value}' of {' and '.join(sorted(kinds))} "
+                "values can't be vectorized", node.line)
+
+        # Both sides are taken, so the left one isn't nil
+        kind = kinds.pop()
+        fill = _FILLS[kind]
+        values = np.where(keep, left.values if left.kind != NIL else fill,
+                          right.values if right.kind != NIL else fill)
+        return Column(kind, values.astype(_DTYPES[kind]),
+                      np.where(keep, _nil(left), _nil(right)))
+
+
+def _output(column: Column, rows: int) -> np.ndarray:
+    if column.kind == NIL:
+        return np.ma.masked_all(rows, dtype=object)
+
+    values = np.empty(rows, dtype=_DTYPES[column.kind])
+    values[...] = column.values
+    nil = _nil(column)
+    if np.any(nil):
+        return np.ma.masked_array(values, mask=np.broadcast_to(nil, rows))
+    return values
+
+
+def evaluateColumns(node: Node, columns: Mapping[str, object],
+                    rows: Optional[int] = None) -> np.ndarray:
+    """Evaluates `node` for every row of `columns`, a mapping of variable
+    names to arrays of equal length. Input columns can hold numbers,
+    booleans or strings, with nil as None in object arrays or as masked
+    entries of a masked array.
+
+    Returns numbers as float64, booleans as bool and strings as an object
+    array, masked where the result is nil. `rows` is only needed when no
+    columns are given, and defaults to 1 then.
+    """
+    if rows is None:
+        rows = len(next(iter(columns.values()))) if columns else 1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        column = _Evaluator(columns, rows).evaluate(node)
+    return _output(column, rows)
@@ -0,0 +1,144 @@
+"""Passes over syntax trees without a method per pass on every node class.
+
+A Visitor subclass handles a node with `visit<ClassName>`, or the method for
+the nearest base class of the node that has one. Which method handles which
+node class is worked out once per visitor class and cached, so visiting only
+costs a dict lookup. Traversal is left to the pass: Printer and Transformer
+below walk trees on explicit stacks, and `traverse.fold(tree, visitor.visit)`
+reduces one bottom up with any visitor taking the results of the children.
+"""
+import copy
+import sys
+
+from typing import Callable, Dict, Iterator, List, TextIO
+
+
+class Visitor:
+    # Node class -> method, filled in per visitor class as nodes turn up
+    _dispatch: Dict[type, Callable] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
+    def visit(self, node, *args):
+        method = self._dispatch.get(type(node))
+        if method is None:
+            method = self._resolve(type(node))
+        return method(self, node, *args)
+
+    @classmethod
+    def _resolve(cls, node_type: type) -> Callable:
+        for base in node_type.__mro__:
+            method = getattr(cls, f"visit{base.__name__}", None)
+            if method is not None:
+                break
+        else:
+            method = cls.default
+
+        cls._dispatch[node_type] = method
+        return method
+
+    def default(self, node, *args):
+        """Called for nodes that no visit method covers"""
+        raise TypeError(
+            f"{type(self).__name__} can't visit {type(node).__name__}")
+
+
+class Transformer(Visitor):
+    """Rebuilds a tree bottom up.
+
+    Visit methods get a node whose children have already been transformed
+    and return its replacement, nodes without one are kept. By default a
+    node that gets new children is copied and the original tree is left
+    untouched, with `inplace` it is updated instead.
+    """
+
+    def __init__(self, inplace: bool = False) -> None:
+        self.inplace = inplace
+
+    def transform(self, node):
+        # Each frame is a node, its children, and what they turned into
+        stack = [(node, node.children(), [])]
+        while True:
+            node, children, values = stack[-1]
+            if len(values) < len(children):
+                child = children[len(values)]
+                stack.append((child, child.children(), []))
+                continue
+
+            stack.pop()
+            if any(value is not child
+                   for value, child in zip(values, children)):
+                if not self.inplace:
+                    node = copy.copy(node)
+                node._setChildren(values)
+
+            result = self.visit(node)
+            if not stack:
+                return result
+            stack[-1][2].append(result)
+
+    def default(self, node):
+        return node
+
+
+class Printer(Visitor):
+    """Indented tree dumps, used by Node.print().
+
+    Visit methods take the node and its level and return the lines to
+    print for it in order, either strings or (child, level) pairs that are
+    expanded in their place. Nodes with children are printed as
+    `str(node)[`, the children, then `]`.
+    """
+
+    def __init__(self, indent: int = 2) -> None:
+        self.indent = indent
+
+    def lines(self, node, level: int = 0) -> Iterator[str]:
+        """Yields the lines without recursing, so any depth works"""
+        stack = [(node, level)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+            else:
+                stack.extend(reversed(self.visit(*item)))
+
+    def print(self, node, level: int = 0, file: TextIO = None) -> None:
+        (file or sys.stdout).writelines(
+            line + "\n" for line in self.lines(node, level))
+
+    def visitNode(self, node, level: int) -> List:
+        pad = " " * level * self.indent
+        children = node.children()
+        if not children:
+            return [f"{pad}{node}"]
+
+        return [f"{pad}{node}[", *((child, level + 1) for child in children),
+                f"{pad}]"]
+
+    def visitBinaryOp(self, node, level: int) -> List:
+        return self.__operator("Binary", node, level)
+
+    def visitLogical(self, node, level: int) -> List:
+        return self.__operator("Logical", node, level)
+
+    def visitUnaryOp(self, node, level: int) -> List:
+        pad = " " * level * self.indent
+        return [
+            f"{pad}Unary[",
+            f"{pad}{' ' * self.indent}{node._op}",
+            (node._right, level + 1),
+            f"{pad}]",
+        ]
+
+    def __operator(self, name: str, node, level: int) -> List:
+        pad = " " * level * self.indent
+        return [
+            f"{pad}{name}[",
+            (node._left, level + 1),
+            f"{pad}{' ' * self.indent}{node._op}",
+            (node._right, level + 1),
+            f"{pad}]",
+        ]
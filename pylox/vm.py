@@ -0,0 +1,128 @@
+from typing import List, Mapping, Optional
+
+from pylox.bytecode import Chunk, OpCode
+from pylox.runtime import (ADD_OPERANDS, NUMBER_OPERAND, NUMBER_OPERANDS,
+                           LoxRuntimeError, divide)
+
+# The dispatch loop compares against plain ints, IntEnum members would make
+# every comparison go through the enum machinery
+_CONSTANT = int(OpCode.CONSTANT)
+_CONSTANT_LONG = int(OpCode.CONSTANT_LONG)
+_NIL = int(OpCode.NIL)
+_TRUE = int(OpCode.TRUE)
+_FALSE = int(OpCode.FALSE)
+_NEGATE = int(OpCode.NEGATE)
+_NOT = int(OpCode.NOT)
+_ADD = int(OpCode.ADD)
+_SUBTRACT = int(OpCode.SUBTRACT)
+_MULTIPLY = int(OpCode.MULTIPLY)
+_DIVIDE = int(OpCode.DIVIDE)
+_GREATER = int(OpCode.GREATER)
+_GREATER_EQUAL = int(OpCode.GREATER_EQUAL)
+_LESS = int(OpCode.LESS)
+_LESS_EQUAL = int(OpCode.LESS_EQUAL)
+_EQUAL = int(OpCode.EQUAL)
+_NOT_EQUAL = int(OpCode.NOT_EQUAL)
+_RESULT = int(OpCode.RESULT)
+_GET_GLOBAL = int(OpCode.GET_GLOBAL)
+
+
+class VM:
+    """Stack machine running chunks from `pylox.bytecode`.
+
+    Same semantics as `pylox.evaluator`, runtime errors report the line of
+    the failing instruction from the chunk's line table.
+    """
+
+    def run(self, chunk: Chunk,
+            globals: Optional[Mapping[str, object]] = None) -> List:
+        """Runs the chunk and returns the value of every expression
+        statement in order, variables are read from `globals`"""
+        # Indexing bytes is cheaper than indexing an array
+        code = chunk.code.tobytes()
+        constants = chunk.constants
+        if globals is None:
+            globals = {}
+        results = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        float_ = float
+        ip = 0
+
+        # Instructions are tested roughly in order of how common they are
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == _CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op <= _NOT:
+                if op == _NEGATE:
+                    value = stack[-1]
+                    if type(value) is not float_:
+                        raise self.__error(chunk, ip, NUMBER_OPERAND)
+                    stack[-1] = -value
+                elif op == _NOT:
+                    value = stack[-1]
+                    stack[-1] = value is None or value is False
+                elif op == _TRUE:
+                    push(True)
+                elif op == _FALSE:
+                    push(False)
+                elif op == _NIL:
+                    push(None)
+                else:
+                    push(constants[int.from_bytes(code[ip:ip + 3], "little")])
+                    ip += 3
+            elif op < _EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is float_ and type(b) is float_:
+                    if op == _ADD:
+                        stack[-1] = a + b
+                    elif op == _SUBTRACT:
+                        stack[-1] = a - b
+                    elif op == _MULTIPLY:
+                        stack[-1] = a * b
+                    elif op == _DIVIDE:
+                        stack[-1] = a / b if b else divide(a, b)
+                    elif op == _GREATER:
+                        stack[-1] = a > b
+                    elif op == _GREATER_EQUAL:
+                        stack[-1] = a >= b
+                    elif op == _LESS:
+                        stack[-1] = a < b
+                    else:
+                        stack[-1] = a <= b
+                elif op == _ADD:
+                    if type(a) is not str or type(b) is not str:
+                        raise self.__error(chunk, ip, ADD_OPERANDS)
+                    stack[-1] = a + b
+                else:
+                    raise self.__error(chunk, ip, NUMBER_OPERANDS)
+            elif op == _EQUAL:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = type(a) is type(b) and a == b
+            elif op == _NOT_EQUAL:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = type(a) is not type(b) or a != b
+            elif op == _RESULT:
+                results.append(pop())
+            elif op == _GET_GLOBAL:
+                name = constants[int.from_bytes(code[ip:ip + 3], "little")]
+                try:
+                    push(globals[name])
+                except KeyError:
+                    raise self.__error(
+                        chunk, ip, f"Undefined variable '{name}'.") from None
+                ip += 3
+            else:
+                return results
+
+    def __error(self, chunk: Chunk, ip: int, message: str):
+        # ip already points past the single byte failing instruction
+        return LoxRuntimeError(message, chunk.getLine(ip - 1))
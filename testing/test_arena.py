@@ -0,0 +1,136 @@
+import contextlib
+import io
+import pytest
+
+from pylox.arena import Arena, NodeKind, NO_NODE
+from pylox.parser import BinaryOp, Constant, Parser, UnaryOp
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+
+
+def printed(nodes):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        for node in nodes:
+            node.print()
+
+    return out.getvalue()
+
+
+def test_round_trip():
+    filename = "/tmp/test.lox"
+    code = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 ' \
+        '!= (true == false) + "test" + nil; 1 + 1; "test";'
+
+    with open(filename, "w") as f:
+        f.write(code)
+
+    nodes = Parser(Scanner(filename).getTokens()).parse()
+    arena = Arena.fromExprs(nodes)
+
+    assert len(arena.roots) == 3
+    assert printed(arena.toExprs()) == printed(nodes)
+    assert printed([arena.toExpr(root) for root in arena.roots]) == \
+        printed(nodes)
+
+    # Literals are shared between trees
+    literals = [(type(v), v) for v in arena.literals]
+    assert len(literals) == len(set(literals))
+    assert arena.literals.count("test") == 1
+    assert arena.kinds.count(NodeKind.NIL) == 1
+
+
+def test_layout():
+    arena = Arena()
+    root = arena.add(BinaryOp(
+        Constant(1.0),
+        TokenType.PLUS,
+        UnaryOp(TokenType.MINUS, Constant(2.0))
+    ))
+
+    # Post-order, children before parents
+    assert list(arena.kinds) == [
+        NodeKind.CONSTANT, NodeKind.CONSTANT, NodeKind.UNARY, NodeKind.BINARY
+    ]
+    assert root == 3
+    assert (arena.lefts[root], arena.rights[root]) == (0, 2)
+    assert (arena.lefts[2], arena.rights[2]) == (NO_NODE, 1)
+    assert arena.values[root] == NO_NODE
+
+    # Any node can be turned back into a tree
+    node = arena.toExpr(2)
+    assert isinstance(node, UnaryOp)
+    assert node._right.value == 2.0
+
+
+def test_lines():
+    arena = Arena()
+    root = arena.add(BinaryOp(
+        Constant(1.0),
+        TokenType.PLUS,
+        UnaryOp(TokenType.MINUS, Constant(2.0), 4),
+        3
+    ))
+    assert list(arena.lines) == [0, 0, 4, 3]
+    assert arena.literals == [1.0, 2.0]
+
+    for node in (arena.toExpr(root), arena.toExprs()[0]):
+        assert (node.line, node._right.line) == (3, 4)
+
+
+def test_deep_tree():
+    tree = Constant(1.0)
+    for _ in range(100000):
+        tree = UnaryOp(TokenType.MINUS, tree)
+
+    arena = Arena.fromExprs([tree])
+    assert len(arena) == 100001
+
+    node = arena.toExpr(arena.roots[0])
+    for _ in range(100000):
+        node = node._right
+    assert node.value == 1.0
+
+
+def test_signed_zero():
+    arena = Arena.fromExprs([Constant(0.0), Constant(-0.0)])
+    assert [repr(v) for v in arena.literals] == ["0.0", "-0.0"]
+
+
+def fields(node):
+    """Every slot of the tree, nested, so trees compare by value"""
+    if isinstance(node, (list, tuple)):
+        return [fields(n) for n in node]
+    elif not hasattr(node, "children"):
+        return node
+    # Compound nodes are their own value
+    slots = [slot for cls in type(node).__mro__
+             for slot in getattr(cls, "__slots__", ())
+             if getattr(node, slot) is not node]
+    return (type(node).__name__,
+            {slot: fields(getattr(node, slot)) for slot in slots})
+
+
+def test_program():
+    code = open("testing/src/class.lox").read() + """
+    var a = 1; var b;
+    fun add(x, y) { return x + y; }
+    fun none() { return; }
+    for (var i = 0; i < 3; i = i + 1) print i;
+    while (a or b and !a) a = add(a, 1)(2);
+    if (a) print "yes"; else { print nil; }
+    if (b) { b.c.d = this.e; } f();
+    class A < B { m() { super.m(); } }
+    class C {}
+    """
+    statements = Parser(Scanner.scanBuffer(code)).parseProgram()
+    arena = Arena.fromExprs(statements)
+
+    assert fields(arena.toExprs()) == fields(statements)
+    assert fields([arena.toExpr(root) for root in arena.roots]) == \
+        fields(statements)
+    assert printed(arena.toExprs()) == printed(statements)
+
+    # Names are stored once, next to the strings
+    assert arena.literals.count("a") == 1
+    assert NodeKind.CLASS in arena.kinds
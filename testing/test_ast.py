@@ -1,7 +1,12 @@
+import pickle
+
 import pytest
 
+from pylox.diagnostics import Diagnostics
 from pylox.scanner import Scanner
-from pylox.parser import Parser
+from pylox.parser import BinaryOp, Call, ClassStmt, FunctionStmt, Get, \
+    Logical, Nil, Parser, ParseEngine, UnaryOp, Variable
+from pylox.token import Token, TokenType
 
 
 def test_expression():
@@ -40,6 +45,25 @@ def test_double():
     assert len(parser.parse()) == 2
 
 
+def test_numbers():
+    filename = "/tmp/test.lox"
+    code = "1.5e3 + 2.25;\n1. 5;\n1.x;\n7;"
+
+    with open(filename, "w") as f:
+        f.write(code)
+
+    for engine in ParseEngine:
+        diagnostics = Diagnostics()
+        nodes = Parser(Scanner(filename).getTokens(), engine=engine,
+                       diagnostics=diagnostics).parse()
+        assert render(nodes[0]) == "(Const[1500.0] PLUS Const[2.25])"
+        # Broken decimals are errors at the dot, not bad float() calls
+        assert [str(n) for n in nodes[1:]] == ["Const[1.0]", "Const[1.0]",
+                                               "Const[7.0]"]
+        assert [(d.line, d.lexeme) for d in diagnostics] == [
+            (1, "."), (2, ".")]
+
+
 def test_multiple_expressions():
     filename = "/tmp/test.lox"
 
@@ -64,3 +88,319 @@ def test_multiple_expressions():
         node.print()
 
     assert len(nodes) == 8
+
+
+def test_streaming_tokens():
+    filename = "/tmp/test.lox"
+    code = '1 + 2; "a" == "b";\n-3 * (4 - 5);'
+
+    with open(filename, "w") as f:
+        f.write(code)
+
+    parser = Parser(Scanner(filename).iter_tokens())
+    assert len(parser.parse()) == 3
+
+
+def test_peek():
+    tokens = [
+        Token(TokenType.NUMBER, "1", 0),
+        Token(TokenType.PLUS, "+", 0),
+        Token(TokenType.NUMBER, "2", 0),
+    ]
+
+    # The stream has no EOF so one is synthesized after the last token
+    parser = Parser(iter(tokens))
+    assert parser._peek(1) == tokens[1]
+    assert parser._peek(3) == Token(TokenType.EOF, "", 0)
+    assert parser._peek(4) == Token(TokenType.EOF, "", 0)
+    assert len(parser.parse()) == 1
+
+    parser = Parser([])
+    assert len(parser.parse()) == 0
+
+
+def test_token_buffer():
+    filename = "/tmp/test.lox"
+    code = '1 + 2; "a" == "b";\n-3 * (4 - 5);'
+
+    with open(filename, "w") as f:
+        f.write(code)
+
+    parser = Parser(Scanner(filename).getTokenBuffer())
+    assert len(parser.parse()) == 3
+
+
+def render(node):
+    if isinstance(node, BinaryOp):
+        return f"({render(node._left)} {node._op.name} {render(node._right)})"
+    elif isinstance(node, UnaryOp):
+        return f"({node._op.name} {render(node._right)})"
+    return str(node)
+
+
+def test_engines():
+    filename = "/tmp/test.lox"
+    code = """
+    !(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 != (true == false) + "test" + nil;
+    1 - 2 - 3; 1 / 2 * 3 < 4 <= 5 > 6 >= 7 == 8 != 9; - - !1;
+    ^ + 8; (1 + 2; 3 4;
+    """
+
+    with open(filename, "w") as f:
+        f.write(code)
+
+    tokens = Scanner(filename).getTokens()
+    expected = [render(n) for n in Parser(tokens).parse()]
+    assert len(expected) == 7
+
+    for engine in (ParseEngine.PRATT, ParseEngine.ITERATIVE):
+        nodes = Parser(tokens, engine=engine).parse()
+        assert [render(n) for n in nodes] == expected
+
+
+def test_deep_nesting(capsys):
+    depth = 100000
+    tokens = [Token(TokenType.LEFT_PAREN, "(", 0)] * depth \
+        + [Token(TokenType.MINUS, "-", 0)] * depth \
+        + [Token(TokenType.NUMBER, "1", 0)] \
+        + [Token(TokenType.RIGHT_PAREN, ")", 0)] * depth \
+        + [Token(TokenType.EOF, "", 0)]
+
+    nodes = Parser(tokens, engine=ParseEngine.ITERATIVE).parse()
+    assert len(nodes) == 1
+
+    # Printing doesn't recurse either, but the output grows with the square
+    # of the depth so only print part of the tree
+    node = nodes[0]
+    for _ in range(depth - 2000):
+        node = node._right
+    node.print()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2000 * 3 + 1
+    assert lines[2000 * 2] == f"{' ' * 2 * 2000}Const[1.0]"
+    assert lines[-1] == "]"
+
+
+def test_node_slots():
+    node = BinaryOp(Nil(), TokenType.PLUS, UnaryOp(TokenType.MINUS, Nil()))
+
+    assert not hasattr(node, "__dict__")
+    assert node.value is node
+    assert node._right.value is node._right
+
+    # Slotted nodes still pickle, lines included
+    copy = pickle.loads(pickle.dumps(BinaryOp(
+        Nil(), TokenType.PLUS, UnaryOp(TokenType.MINUS, Nil(), 2), 1)))
+    assert render(copy) == render(node)
+    assert (copy.line, copy._right.line) == (1, 2)
+
+
+PROGRAM = """
+var a = 1;
+var b;
+fun add(x, y) { return x + y; }
+for (var i = 0; i < 3; i = i + 1) print i;
+for (;;) { return; }
+for (a = 0; a;) {}
+while (a or b and !a) a = add(a, 1)(2);
+if (a) print "yes"; else { print nil; }
+if (b) b.c.d = this.e;
+class A < B { m() { super.m(); } }
+"""
+
+
+def program(code, **kwargs):
+    diagnostics = Diagnostics()
+    statements = Parser(list(Scanner.scanBuffer(code)), "test.lox",
+                        diagnostics=diagnostics, **kwargs).parseProgram()
+    return statements, [str(d) for d in diagnostics]
+
+
+def lines(statements, capsys):
+    capsys.readouterr()
+    for statement in statements:
+        statement.print()
+    return capsys.readouterr().out.splitlines()
+
+
+def test_program(capsys):
+    statements = Parser(Scanner("testing/src/class.lox").getTokens(),
+                        diagnostics=Diagnostics()).parseProgram()
+    assert [str(s) for s in statements] == ["Class Test", "Class Derived"]
+    derived = statements[1]
+    assert derived._superclass._name == "Test"
+    assert [str(m) for m in derived._methods] == [
+        "Function init()", "Function math(a, b)", "Function whatsup()"]
+
+    statements, errors = program(PROGRAM)
+    assert errors == []
+    assert [str(s) for s in statements] == [
+        "Var a", "Var b", "Function add(x, y)", "BlockStmt", "WhileStmt",
+        "BlockStmt", "WhileStmt", "IfStmt", "IfStmt", "Class A"]
+
+    printed = lines(statements, capsys)
+    assert printed[:9] == [
+        "Var a[", "  Const[1.0]", "]", "Var b", "Function add(x, y)[",
+        "  ReturnStmt[", "    Binary[", "      Variable[x]",
+        "      TokenType.PLUS"]
+    # for loops become while loops, the increment runs after the body
+    assert "  WhileStmt[" in printed
+    assert "        Assign i[" in printed
+    assert "    ReturnStmt" in printed
+    assert "  Bool[True]" in printed
+    assert "    Logical[" in printed
+    assert printed[96:102] == [
+        "    Set .d[", "      Get .c[", "        Variable[b]", "      ]",
+        "      Get .e[", "        This[]"]
+    assert "        This[]" in printed
+    assert "        Super[m]" in printed
+
+    # The variable names carry their symbols
+    loop = statements[6]
+    call = loop._body._expression._value
+    assert isinstance(call, Call) and isinstance(call._callee, Call)
+    assert isinstance(loop._condition, Logical)
+    assert isinstance(loop._condition._left, Variable)
+    assert loop._condition._left._symbol is not None
+
+
+def test_program_errors(capsys):
+    statements, errors = program(
+        "var = 1;\n{ 1 + }\nprint 2;\n1 = 2;\na.;\nclass { }\n"
+        "fun f( {}\nvar c = 3;\n{ print 4;\n")
+    assert errors == [
+        "test.lox:0:4: error at '=': expected a variable name",
+        "test.lox:1:6: error at '}': expected an expression",
+        "test.lox:3:2: error at '=': invalid assignment target",
+        "test.lox:4:2: error at ';': expected a property name after '.'",
+        "test.lox:5:6: error at '{': expected a class name",
+        "test.lox:6:7: error at '{': expected a parameter name",
+        "test.lox:8:0: error at end: expected '}' after block",
+    ]
+    # Every statement after an error still gets parsed
+    assert [str(s) for s in statements] == [
+        "BlockStmt", "PrintStmt", "ExpressionStmt", "Var c"]
+
+    # Stops at the first error once the collector is full
+    diagnostics = Diagnostics(max_errors=2)
+    statements = Parser(list(Scanner.scanBuffer("1 +;\n2;\n3 +;\n4;")),
+                        diagnostics=diagnostics).parseProgram()
+    assert (len(statements), len(diagnostics)) == (1, 2)
+
+    # Without a collector the errors are printed at the end
+    assert Parser(list(Scanner.scanBuffer("super;"))).parseProgram() == []
+    assert "expected '.' after 'super'" in capsys.readouterr().err
+
+    # Expressions alone still don't know about names
+    assert Parser(list(Scanner.scanBuffer("a;")),
+                  diagnostics=Diagnostics()).parse() == []
+
+
+def test_lazy(capsys):
+    code = open("testing/src/class.lox").read() \
+        + "fun outer() { fun inner() { return 1; } return inner; }"
+    eager, errors = program(code)
+    expected = lines(eager, capsys)
+
+    buffer = Scanner.scanBuffer(code)
+    for tokens in (list(buffer), buffer, iter(list(buffer))):
+        statements = Parser(tokens, lazy=True).parseProgram()
+        methods = [m for s in statements[:2] for m in s._methods]
+        assert not any(m.parsed for m in methods + [statements[2]])
+
+        # Bodies are parsed when first used, the same as eagerly
+        assert str(methods[0].body[0]._expression) == "Set .name"
+        assert methods[0].parsed and not methods[1].parsed
+        inner = statements[2].body[0]
+        assert isinstance(inner, FunctionStmt) and not inner.parsed
+        assert inner.body[0]._value.value == 1
+        assert lines(statements, capsys) == expected
+
+    # Errors in a body turn up when it is parsed
+    diagnostics = Diagnostics()
+    statements = Parser(list(Scanner.scanBuffer("fun f() { 1 +; }")), "x",
+                        diagnostics=diagnostics, lazy=True).parseProgram()
+    assert len(diagnostics) == 0
+    assert statements[0].body == []
+    assert [str(d) for d in diagnostics] == [
+        "x:0:13: error at ';': expected an expression"]
+
+    # Without one, they are printed by the body's own parse
+    statements = Parser(list(Scanner.scanBuffer("fun f() { 1 +; }")),
+                        lazy=True).parseProgram()
+    assert capsys.readouterr().err == ""
+    assert statements[0].body == []
+    assert "expected an expression" in capsys.readouterr().err
+
+    # Errors at the end of a body point at its closing brace, like they do
+    # when it is parsed eagerly
+    code = "fun f() {\n  print 1;\n  print 2\n}\nfun g() { var x = }\n" \
+        "class A { m() { this. } n() { return 1 } }\nfun h() { if (a) }\n"
+    _, expected = program(code)
+    assert expected[0] == \
+        "test.lox:3:0: error at '}': expected ';' after value"
+    for engine in ParseEngine:
+        diagnostics = Diagnostics()
+        statements = Parser(list(Scanner.scanBuffer(code)), "test.lox",
+                            engine, diagnostics, lazy=True).parseProgram()
+        for statement in statements:
+            for function in getattr(statement, "_methods", [statement]):
+                function.body
+        assert [str(d) for d in diagnostics] == expected
+
+    # An unclosed body is parsed straight away to report it
+    statements, errors = program("fun f() { 1;", lazy=True)
+    assert errors == ["test.lox:0:12: error at end: expected '}' after block"]
+    diagnostics = Diagnostics()
+    Parser(Scanner.scanBuffer("fun f() { 1;"), diagnostics=diagnostics,
+           lazy=True).parseProgram()
+    assert len(diagnostics) == 1
+
+
+def test_statement_slots():
+    statements, _ = program(PROGRAM)
+    for statement in statements:
+        assert not hasattr(statement, "__dict__")
+
+    # Compound expressions pickle like the operators
+    node = Get(Call(Variable("f", 0, 1), (Nil(),), 2), "x", 3)
+    copy = pickle.loads(pickle.dumps(node))
+    assert (str(copy), copy.line, copy._object._callee._name) == \
+        ("Get .x", 3, "f")
+    assert isinstance(pickle.loads(pickle.dumps(
+        Logical(Nil(), TokenType.OR, Nil()))), Logical)
+    assert isinstance(statements[-1], ClassStmt)
+
+
+def test_program_engines(capsys):
+    errors = "1 = 2;\na.b() = 3;\na + b = c;\nf(1, 2 +);\na = b or;\n" \
+        "print (1;\nx = y = z.w = -a.b(c)(d, e) and !f or g;\nsuper;\n"
+    for code in (PROGRAM, errors, open("testing/src/class.lox").read()):
+        expected = program(code)
+        printed = lines(expected[0], capsys)
+        for engine in (ParseEngine.PRATT, ParseEngine.ITERATIVE):
+            statements, diagnostics = program(code, engine=engine)
+            assert diagnostics == expected[1]
+            assert lines(statements, capsys) == printed
+
+
+def test_program_deep_nesting():
+    depth = 100000
+    code = "print " + "(" * depth + "-a" + ").b(c)" * depth + ";\n" \
+        + "a" + " = a" * depth + ";\nprint 1;\n"
+    statements, errors = program(code, engine=ParseEngine.ITERATIVE)
+    assert (len(statements), errors) == (3, [])
+
+    # Function bodies parsed later use the same engine
+    statements, errors = program("fun f() { print " + "(" * depth + "1"
+                                 + ")" * depth + "; }",
+                                 engine=ParseEngine.ITERATIVE, lazy=True)
+    assert statements[0].body[0]._expression.value == 1
+    assert errors == []
+
+    # The recursive rules report what they can't nest instead of crashing
+    statements, errors = program(code)
+    assert [str(s) for s in statements] == ["PrintStmt"]
+    assert len(errors) == 2
+    assert all(e.endswith(": nested too deeply") for e in errors)
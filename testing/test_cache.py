@@ -0,0 +1,190 @@
+import marshal
+import os
+
+from array import array
+
+import pytest
+
+from pylox import cache as cache_module
+from pylox.cache import Cache
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+
+CODE = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1\n' \
+    '!= (true == false) + "test" + nil; 1 + 1;\r\n"test"; -0;\n'
+
+
+def render(node):
+    if hasattr(node, "_op"):
+        left = render(node._left) if hasattr(node, "_left") else ""
+        return f"({left} {node._op.name}@{node.line} {render(node._right)})"
+    return f"{type(node).__name__}[{node.value!r}]"
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "test.lox"
+    path.write_bytes(CODE.encode())
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return Cache(str(tmp_path / "__loxcache__"))
+
+
+def entries(cache):
+    return sorted(os.listdir(cache.directory))
+
+
+def test_round_trip(source, cache):
+    expected_tokens = Scanner(source).getTokens()
+    expected = [render(n) for n in Parser(expected_tokens).parse()]
+
+    for _ in range(2):
+        tokens, nodes = cache.load(source)
+        assert list(tokens) == expected_tokens
+        assert [render(n) for n in nodes] == expected
+
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert len(entries(cache)) == 1
+    assert entries(cache)[0] == Cache.key(CODE.encode()) + ".loxcache"
+
+
+def test_invalidation(source, cache, monkeypatch):
+    cache.load(source)
+
+    # Edited source
+    with open(source, "a") as f:
+        f.write("2;")
+    _, nodes = cache.load(source)
+    assert len(nodes) == 5
+    assert cache.misses == 2
+
+    # New pylox version
+    old = Cache.key(CODE.encode())
+    monkeypatch.setattr(cache_module, "_SALT", b"pylox-next")
+    assert Cache.key(CODE.encode()) != old
+
+
+def test_parse_errors_not_cached(tmp_path, cache, capsys):
+    path = tmp_path / "error.lox"
+    path.write_text("1 + ;\n;\n2;\n")
+
+    for _ in range(2):
+        _, nodes = cache.load(str(path))
+        assert len(nodes) == 1
+        assert "error at ';'" in capsys.readouterr().err
+
+    assert cache.misses == 2
+    assert not os.path.exists(cache.directory)
+
+
+def test_lru_eviction(tmp_path, cache):
+    paths, names = [], []
+    for i in range(3):
+        path = tmp_path / f"{i}.lox"
+        path.write_text(f"{i} + {i};\n" * 50)
+        paths.append(str(path))
+        names.append(Cache.key(path.read_bytes()) + ".loxcache")
+
+    cache.load(paths[0])
+    cache.load(paths[1])
+    cache.max_size = os.path.getsize(
+        os.path.join(cache.directory, names[0])) * 2
+
+    # Entry 0 is the oldest, but reading it makes it the most recently used
+    os.utime(os.path.join(cache.directory, names[0]), ns=(1, 1))
+    os.utime(os.path.join(cache.directory, names[1]), ns=(2, 2))
+    cache.load(paths[0])
+    cache.load(paths[2])
+
+    # No temporary files left behind either
+    assert entries(cache) == sorted([names[0], names[2]])
+
+
+def test_program(tmp_path, cache, capsys):
+    path = tmp_path / "class.lox"
+    path.write_bytes(open("testing/src/class.lox", "rb").read())
+
+    expected_tokens = Scanner(str(path)).getTokens()
+    statements = Parser(expected_tokens).parseProgram()
+    expected = lines(statements, capsys)
+    for _ in range(2):
+        tokens, nodes = cache.load(str(path), program=True)
+        assert list(tokens) == expected_tokens
+        assert lines(nodes, capsys) == expected
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    # Expressions and programs of the same source are separate entries
+    assert len(cache.load(str(path))[1]) == 0
+    assert "expected an expression" in capsys.readouterr().err
+    assert cache.misses == 2
+
+
+def lines(statements, capsys):
+    capsys.readouterr()
+    for statement in statements:
+        statement.print()
+    return capsys.readouterr().out
+
+
+def corruptions(data):
+    """Entries that unmarshal but can't be decoded"""
+    tokens, ast = data[:4], data[-1]
+    yield tokens[:1] + (tokens[1][:-1],) + tokens[2:] + (ast,)
+    # A root past the end, a kind there's no node for, missing arrays
+    yield tokens + (ast[:6] + (array("i", [1000]).tobytes(),) + ast[7:],)
+    yield tokens + ((b"\xff" * len(ast[0]),) + ast[1:],)
+    yield tokens + (ast[:2],)
+
+
+@pytest.mark.parametrize("program", [False, True])
+def test_corrupt_entry(source, cache, program):
+    cache.load(source, program)
+    entry = os.path.join(cache.directory, entries(cache)[0])
+    with open(entry, "rb") as f:
+        data = marshal.load(f)
+    for i, corrupt in enumerate([b"\x00garbage", *(
+            marshal.dumps(c) for c in corruptions(data))]):
+        with open(entry, "wb") as f:
+            f.write(corrupt)
+
+        # A miss, and the entry is written again
+        assert len(cache.load(source, program)[1]) == 4
+        assert cache.misses == i + 2
+        assert len(cache.load(source, program)[1]) == 4
+        assert cache.hits == i + 1
+
+
+def test_failed_write(source, cache, monkeypatch):
+    def dump(data, f):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(marshal, "dump", dump)
+    with pytest.raises(OSError):
+        cache.load(source)
+
+    assert entries(cache) == []
+
+
+def test_concurrent_removal(source, cache, monkeypatch):
+    cache.load(source)
+    entry = os.path.join(cache.directory, entries(cache)[0])
+
+    # Entries can disappear while another process evicts them
+    stat = os.stat
+    monkeypatch.setattr(
+        os, "stat",
+        lambda path: os.remove(path) or stat(path) if path == entry
+        else stat(path))
+    cache.max_size = 0
+    cache.clear()
+    cache.load(source)
+    assert entries(cache) == []
+
+    monkeypatch.setattr(os, "listdir", lambda path: ["gone.loxcache"])
+    cache.clear()
+
+    monkeypatch.undo()
+    Cache(str(cache.directory) + "-missing").clear()
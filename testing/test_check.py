@@ -0,0 +1,151 @@
+import json
+import runpy
+import sys
+
+import pytest
+
+from pylox.__main__ import main
+from pylox.check import checkFile, checkFiles, findSources
+from pylox.parser import Parser
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "ok.lox").write_text("1 + 2;\n3;\n")
+    (tmp_path / "a" / "b" / "bad.lox").write_text("1 + ;\n;\n2 * ;\n")
+    (tmp_path / "z.lox").write_text('"fine";\n')
+    (tmp_path / "notes.txt").write_text("1 + ;\n")
+    return tmp_path
+
+
+def test_find_sources(tree):
+    extra = str(tree / "notes.txt")
+    assert findSources([str(tree / "a"), str(tree), extra]) == [
+        str(tree / "a" / "b" / "bad.lox"),
+        str(tree / "a" / "ok.lox"),
+        extra,
+        str(tree / "z.lox"),
+    ]
+
+
+def test_check_file(tree):
+    report = checkFile(str(tree / "a" / "ok.lox"))
+    assert (report.diagnostics, report.tokens, report.nodes) == ([], 7, 2)
+
+    path = str(tree / "a" / "b" / "bad.lox")
+    report = checkFile(path)
+    assert [str(d) for d in report.diagnostics] == [
+        f"{path}:0:4: error at ';': expected an expression",
+        f"{path}:1:0: error at ';': expected an expression",
+        f"{path}:2:4: error at ';': expected an expression",
+    ]
+    assert report.diagnostics[1].lexeme == ";"
+
+    # Whole programs, not just expressions
+    report = checkFile("testing/src/class.lox")
+    assert (report.diagnostics, report.nodes) == ([], 2)
+
+    # Stops at the cap
+    report = checkFile(path, max_errors=1)
+    assert (len(report.diagnostics), report.truncated) == (1, True)
+    assert not checkFile(path, max_errors=4).truncated
+
+    report = checkFile(str(tree / "missing.lox"))
+    assert str(report.diagnostics[0]).startswith(
+        f"{tree / 'missing.lox'}:0:0: error: cannot read file")
+
+
+def test_no_stderr(tree, capsys):
+    checkFile(str(tree / "a" / "b" / "bad.lox"))
+    assert capsys.readouterr().err == ""
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_files(tree, jobs):
+    paths = findSources([str(tree)]) * 5
+    reports = checkFiles(paths, jobs)
+
+    # Same order as given, whichever worker handled a file
+    assert [report.path for report in reports] == paths
+    assert [len(report.diagnostics) for report in reports] == [3, 0, 0] * 5
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_deep_nesting(tree, jobs):
+    deep = tree / "deep.lox"
+    deep.write_text("print " + "(" * 100000 + "1" + ")" * 100000 + ";\n")
+    paths = [str(deep), str(tree / "z.lox")]
+    reports = checkFiles(paths, jobs)
+    # Reported where the parser ran out of stack, the rest still checked
+    [diagnostic] = reports[0].diagnostics
+    assert (diagnostic.filename, diagnostic.lexeme, diagnostic.message) == \
+        (str(deep), "(", "nested too deeply")
+    assert reports[1].diagnostics == []
+
+
+def test_parser_failure(tree, monkeypatch):
+    def fail(self):
+        raise RecursionError("maximum recursion depth exceeded")
+    monkeypatch.setattr(Parser, "parseProgram", fail)
+
+    path = str(tree / "z.lox")
+    reports = checkFiles([path, path], 1)
+    assert [str(d) for r in reports for d in r.diagnostics] == [
+        f"{path}:0:0: error: cannot check file: "
+        "RecursionError('maximum recursion depth exceeded')"] * 2
+
+    # Bugs in the parser aren't turned into diagnostics
+    def bug(self):
+        raise AttributeError("bug")
+    monkeypatch.setattr(Parser, "parseProgram", bug)
+    with pytest.raises(AttributeError):
+        checkFiles([path], 1)
+
+
+def test_main(tree, capsys):
+    assert main(["check", str(tree / "a" / "ok.lox"), str(tree / "z.lox"),
+                 "-j", "1"]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("checked 2 files: 0 errors in 0 files")
+
+    assert main(["check", str(tree), "--verbose"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    bad = str(tree / "a" / "b" / "bad.lox")
+    assert lines[0].startswith(f"{bad}: 3 errors (")
+    assert lines[1:4] == [
+        f"{bad}:0:4: error at ';': expected an expression",
+        f"{bad}:1:0: error at ';': expected an expression",
+        f"{bad}:2:4: error at ';': expected an expression",
+    ]
+    assert lines[4].startswith(f"{tree / 'a' / 'ok.lox'}: ok (")
+    assert "7 tokens, 2 statements" in lines[4]
+    assert lines[-1].startswith("checked 3 files: 3 errors in 1 files")
+
+    assert main(["check", str(tree), "--format", "json",
+                 "--max-errors", "1"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [{
+        "filename": bad, "line": 0, "column": 4, "lexeme": ";",
+        "message": "expected an expression",
+    }, {"filename": bad, "stopped_after": 1}]
+
+    # The reports say where checking a file stopped early
+    assert main(["check", str(tree), "--max-errors", "2"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[2] == "stopped after 2 errors"
+    assert lines[-1].startswith("checked 3 files: 2 errors in 1 files")
+
+    with pytest.raises(SystemExit):
+        main([])
+
+
+def test_module(tree, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["pylox", "check", str(tree / "z.lox")])
+    # Run it fresh, like python -m would
+    monkeypatch.delitem(sys.modules, "pylox.__main__", raising=False)
+    with pytest.raises(SystemExit) as info:
+        runpy.run_module("pylox", run_name="__main__")
+
+    assert info.value.code == 0
+    assert "checked 1 files" in capsys.readouterr().out
@@ -0,0 +1,100 @@
+import os
+import runpy
+import socket
+import sys
+import threading
+
+import pytest
+
+from pylox.client import TIMEOUT, defaultSocket, main, request
+from pylox.server import serve
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.lox").write_text("print 1 + ;\n")
+    return str(tmp_path / "a.lox")
+
+
+def run(capsys, *argv):
+    status = main(list(argv))
+    out, err = capsys.readouterr()
+    return status, out, err
+
+
+def test_default_socket(monkeypatch):
+    monkeypatch.setenv("PYLOX_SOCKET", "/run/lox.sock")
+    assert defaultSocket() == "/run/lox.sock"
+    monkeypatch.delenv("PYLOX_SOCKET")
+    monkeypatch.setenv("TMPDIR", "/var/tmp")
+    assert defaultSocket() == f"/var/tmp/pylox-{os.getuid()}.sock"
+
+
+def test_no_server(source, capsys, tmp_path):
+    path = str(tmp_path / "none.sock")
+    assert request({"command": "check"}, path) is None
+
+    # In process, with the same output a server would give
+    status, out, err = run(capsys, "--socket", path, "check", "a.lox")
+    assert (status, out, err) == \
+        (1, f"{source}:0:10: error at ';': expected an expression\n", "")
+    status, out, err = run(capsys, "--socket", path, "parse", "a.lox")
+    assert (out, err.count("error")) == \
+        (f"{source}: 0 statements, 5 tokens\n", 1)
+
+    status, out, err = run(capsys, "--socket", path, "shutdown")
+    assert (status, err) == (1, f"pylox: no server on {path}\n")
+
+
+def test_server(source, capsys, tmp_path):
+    path = str(tmp_path / "s.sock")
+    thread = threading.Thread(target=serve, args=(path,))
+    thread.start()
+    try:
+        local = [run(capsys, "--socket", path, "--local", command,
+                     "--format", "json", "a.lox")
+                 for command in ("check", "parse", "dump")]
+        while request({"command": "parse"}, path) is None:
+            pass
+        remote = [run(capsys, "--socket", path, command, "--format", "json",
+                      "a.lox")
+                  for command in ("check", "parse", "dump")]
+        assert remote == local
+    finally:
+        assert run(capsys, "--socket", path, "shutdown") == (0, "", "")
+        thread.join()
+
+
+def test_no_response(tmp_path):
+    # Something that accepts connections and hangs up without answering
+    path = str(tmp_path / "s.sock")
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(path)
+    listener.listen()
+    thread = threading.Thread(target=lambda: listener.accept()[0].close())
+    thread.start()
+    assert request({"command": "check"}, path, timeout=5) is None
+    thread.join()
+    listener.close()
+
+
+def test_timeout(tmp_path):
+    # A server too busy to answer counts as none
+    path = str(tmp_path / "s.sock")
+    listener = socket.socket(socket.AF_UNIX)
+    listener.bind(path)
+    listener.listen()
+    assert request({"command": "check"}, path, timeout=0.1) is None
+    listener.close()
+    assert request.__defaults__ == (TIMEOUT,)
+
+
+def test_module(source, monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", [
+        "pylox.client", "--socket", str(tmp_path / "none.sock"), "check",
+        "a.lox"])
+    monkeypatch.delitem(sys.modules, "pylox.client")
+    with pytest.raises(SystemExit) as info:
+        runpy.run_module("pylox.client", run_name="__main__")
+    assert info.value.code == 1
@@ -0,0 +1,102 @@
+import io
+import json
+import pickle
+
+from pylox.diagnostics import Diagnostic, Diagnostics, renderHuman, \
+    renderJsonLines
+from pylox.parser import Parser, ParseEngine
+from pylox.scanner import Scanner
+
+CODE = "1 + ;\n;\n2;\n  * 3;\n(4\n"
+
+
+def parse(code=CODE, max_errors=None, engine=ParseEngine.RECURSIVE):
+    diagnostics = Diagnostics(max_errors)
+    nodes = Parser(list(Scanner.scanBuffer(code)), "test.lox",
+                   engine=engine, diagnostics=diagnostics).parse()
+    return nodes, diagnostics
+
+
+def test_records():
+    nodes, diagnostics = parse()
+    assert len(nodes) == 2
+    assert [(d.line, d.column, d.lexeme) for d in diagnostics] == [
+        (0, 4, ";"), (3, 2, "*"),
+    ]
+    assert all(d.filename == "test.lox" for d in diagnostics)
+    assert all(d.message == "expected an expression" for d in diagnostics)
+
+    # Same records whichever engine found them
+    for engine in (ParseEngine.PRATT, ParseEngine.ITERATIVE):
+        _, other = parse(engine=engine)
+        assert [d.toDict() for d in other] == \
+            [d.toDict() for d in diagnostics]
+
+
+def test_max_errors():
+    nodes, diagnostics = parse(max_errors=1)
+    assert len(diagnostics) == 1 and diagnostics.full
+    # Stopped at the first error instead of parsing the rest
+    assert nodes == []
+
+    _, diagnostics = parse("1 +;\n" * 1000, max_errors=10)
+    assert len(diagnostics) == 10
+
+
+def test_render():
+    _, diagnostics = parse()
+    assert renderHuman(diagnostics) == (
+        "test.lox:0:4: error at ';': expected an expression\n"
+        "test.lox:3:2: error at '*': expected an expression\n")
+    assert renderHuman(diagnostics, color=True).startswith(
+        "\x1b[1;31mtest.lox:0:4:\x1b[0m error at ';'")
+
+    lines = renderJsonLines(diagnostics).splitlines()
+    assert json.loads(lines[1]) == {
+        "filename": "test.lox", "line": 3, "column": 2, "lexeme": "*",
+        "message": "expected an expression",
+    }
+
+    _, diagnostics = parse(max_errors=1)
+    assert renderHuman(diagnostics).endswith("stopped after 1 errors\n")
+
+    output = io.StringIO()
+    diagnostics.render("json", output)
+    first, last = output.getvalue().splitlines()
+    assert json.loads(first)["lexeme"] == ";"
+    assert json.loads(last) == {"filename": "test.lox", "stopped_after": 1}
+
+    # Plain lists of records are told
+    records = diagnostics.records
+    assert renderHuman(records) + renderJsonLines(records) == \
+        f"{records[0]}\n{first}\n"
+    assert renderHuman(records, truncated=True) == \
+        f"{records[0]}\nstopped after 1 errors\n"
+    assert renderJsonLines(records, True) == output.getvalue()
+    assert renderJsonLines([], True) == ""
+
+    output = io.StringIO()
+    Diagnostics().render(file=output)
+    assert output.getvalue() == ""
+
+
+def test_text():
+    assert str(Diagnostic(None, 3, 1, "", "unexpected end")) == \
+        "3:1: error at end: unexpected end"
+    diagnostic = Diagnostic("a.lox", 0, 0, None, "cannot read file")
+    assert str(diagnostic) == "a.lox:0:0: error: cannot read file"
+    assert pickle.loads(pickle.dumps(diagnostic)).toDict() == \
+        diagnostic.toDict()
+
+
+def test_default_stderr(capsys):
+    # Without a collector errors go to stderr once parsing is done
+    parser = Parser(list(Scanner.scanBuffer(CODE)), "test.lox")
+    steps = parser.iter_parse()
+    next(steps)
+    assert capsys.readouterr().err == ""
+
+    assert len(list(steps)) == 1
+    assert capsys.readouterr().err == (
+        "test.lox:0:4: error at ';': expected an expression\n"
+        "test.lox:3:2: error at '*': expected an expression\n")
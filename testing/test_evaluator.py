@@ -0,0 +1,125 @@
+import math
+
+import pytest
+
+from pylox.evaluator import compileExpr, evaluate
+from pylox.parser import BinaryOp, Constant, Parser
+from pylox.runtime import LoxRuntimeError, divide, stringify
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+
+filename = "/tmp/evaluator_test.lox"
+
+
+def parse(code):
+    with open(filename, "w") as f:
+        f.write(code)
+
+    return Parser(Scanner(filename).getTokens()).parse()
+
+
+def run(code):
+    """Values from both evaluators, which must always agree"""
+    values = []
+    for node in parse(code):
+        value = evaluate(node)
+        compiled = compileExpr(node)()
+        assert stringify(value) == stringify(compiled)
+        values.append(value)
+    return values
+
+
+def error(code, evaluator):
+    node, = parse(code)
+    with pytest.raises(LoxRuntimeError) as info:
+        evaluator(node)
+    return str(info.value)
+
+
+def test_arithmetic():
+    assert run('-1.2/4.4 + -2 - (3+5) * 6.5 * 7;') == \
+        [-1.2 / 4.4 + -2 - (3 + 5) * 6.5 * 7]
+    assert run('"a" + "b" + "c";') == ["abc"]
+
+
+def test_comparison_and_logic():
+    values = run("""
+    1 < 2; 2 <= 1; 3 > 3; 3 >= 3;
+    1 == 1; 1 == true; nil == nil; "a" != "a"; "a" != 1;
+    !nil; !0; !!"a"; !false; !true;
+    """)
+    assert values == [True, False, False, True,
+                      True, False, True, False, True,
+                      True, False, True, True, False]
+
+
+def test_division_by_zero():
+    assert run("1 / 0; -1 / 0; 1 / -0;") == \
+        [math.inf, -math.inf, -math.inf]
+    value, = run("0 / 0;")
+    assert math.isnan(value)
+    assert math.isnan(divide(math.nan, 0.0))
+    assert not run("0 / 0 == 0 / 0;")[0]
+    assert run("0 / 0 != 0 / 0;") == [True]
+
+
+@pytest.mark.parametrize("evaluator", [
+    evaluate, lambda node: compileExpr(node)()])
+def test_runtime_errors(evaluator):
+    assert error('-"a";', evaluator) == \
+        "Operand must be a number. [line 0]"
+    assert error('\n\n1 + "a";', evaluator) == \
+        "Operands must be two numbers or two strings. [line 2]"
+    assert error('nil + nil;', evaluator) == \
+        "Operands must be two numbers or two strings. [line 0]"
+
+    for op in ("-", "*", "/", ">", ">=", "<", "<="):
+        assert error(f'1 {op}\n true;', evaluator) == \
+            "Operands must be numbers. [line 0]"
+
+
+def test_error_line():
+    node, = parse("1 +\n2 -\n\n-nil;")
+    with pytest.raises(LoxRuntimeError) as info:
+        compileExpr(node)()
+    assert info.value.message == "Operand must be a number."
+    assert info.value.line == 3
+
+
+def test_stringify():
+    assert [stringify(value) for value in run(
+        '1; 1.5; 3 * 0.5; "a"; true; false; nil; 1 / 0;')] == \
+        ["1", "1.5", "1.5", "a", "true", "false", "nil", "inf"]
+
+
+def test_compiled_is_reusable():
+    node, = parse("(1 + 2) * 3 == 9;")
+    compiled = compileExpr(node)
+    assert compiled() is True
+    assert compiled() is True
+
+
+def test_globals():
+    statements = Parser(list(Scanner.scanBuffer("a * b + -a;\n\nc;"))
+                        ).parseProgram()
+    node, undefined = (statement._expression for statement in statements)
+    globals = {"a": 2.0, "b": 3.0}
+    compiled = compileExpr(node, globals)
+    assert evaluate(node, globals) == compiled() == 4.0
+
+    # Variables are read when the expression runs, not when it's compiled
+    globals["a"] = 1.0
+    assert evaluate(node, globals) == compiled() == 2.0
+
+    for evaluator in (evaluate, lambda node: compileExpr(node)()):
+        with pytest.raises(LoxRuntimeError) as info:
+            evaluator(undefined)
+        assert str(info.value) == "Undefined variable 'c'. [line 2]"
+
+
+def test_deep_evaluate():
+    node = Constant(1.0)
+    for _ in range(100000):
+        node = BinaryOp(node, TokenType.PLUS, Constant(1.0))
+
+    assert evaluate(node) == 100001
@@ -0,0 +1,92 @@
+import pytest
+
+from pylox.incremental import Document, TextEdit
+from pylox.parser import Parser, BinaryOp, UnaryOp
+from pylox.scanner import Scanner
+
+filename = "/tmp/incremental_test.lox"
+
+
+def render(node):
+    if isinstance(node, BinaryOp):
+        return f"({render(node._left)} {node._op.name} {render(node._right)})"
+    elif isinstance(node, UnaryOp):
+        return f"({node._op.name} {render(node._right)})"
+    return str(node)
+
+
+def check(doc: Document):
+    """Compares the document against a scan and parse from scratch"""
+    with open(filename, "w") as f:
+        f.write(doc.text)
+
+    tokens = Scanner(filename).getTokens()
+    expected = [render(node) for node in Parser(tokens).parse()]
+
+    assert [str(t) for t in doc.getTokens()] == [str(t) for t in tokens]
+    assert [render(node) for node in doc.parse()] == expected
+
+
+def test_edit_reuses_nodes():
+    doc = Document("1 + 2;\n0;\n3 * 4;\n5 - 6;\n")
+    before = doc.parse()
+
+    after = doc.apply([TextEdit(2, 0, 2, 1, "(7 + 8)")])
+    check(doc)
+
+    # Parsing resumes at the step before the edit, since a step can look at
+    # the first token of the next one
+    assert after[0] is before[0]
+    assert after[2] is not before[2]
+    assert after[3] is before[3]
+    assert render(after[2]) == \
+        "((Const[7.0] PLUS Const[8.0]) STAR Const[4.0])"
+
+
+def test_insert_and_delete_lines():
+    doc = Document('1; 2;\n"a" == "b";\n-3;')
+    before = doc.parse()
+
+    after = doc.apply([TextEdit(0, 5, 0, 5, "\n\n4 + 5;\n")])
+    check(doc)
+    assert after[-1] is before[-1]
+    assert doc.getTokens()[-1].line == 5
+
+    # Two edits in one batch, the second one inside the first
+    doc.apply([
+        TextEdit(2, 0, 3, 0, "true;\nfalse"),
+        TextEdit(2, 0, 2, 4, "nil"),
+    ])
+    check(doc)
+
+    # Two separate edits, the first one after the second
+    doc.apply([
+        TextEdit(4, 0, 4, 0, "!"),
+        TextEdit(0, 0, 1, 0, ""),
+    ])
+    check(doc)
+
+
+def test_edit_joins_statements():
+    doc = Document("1 + 2;\n3;\n4;\n5;")
+    before = doc.parse()
+
+    # Removing a semicolon merges two steps, the parser has to run past the
+    # edited line before it lines up with the old steps again
+    after = doc.apply([TextEdit(0, 5, 0, 6, " +")])
+    check(doc)
+    assert len(after) == 3
+    assert after[1] is before[2]
+
+    doc.apply([TextEdit(3, 0, 3, 1, "^")])
+    check(doc)
+
+
+def test_empty_document():
+    doc = Document("")
+    assert doc.parse() == []
+
+    doc.apply([TextEdit(0, 0, 0, 0, "1;\n")])
+    check(doc)
+
+    assert doc.apply([]) == doc.parse()
@@ -0,0 +1,195 @@
+import io
+
+import pytest
+
+from pylox.__main__ import main
+from pylox.diagnostics import Diagnostics
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import resolve
+from pylox.runtime import LoxRuntimeError
+from pylox.scanner import Scanner
+
+
+def run(code, interpreter=None):
+    statements = Parser(list(Scanner.scanBuffer(code)),
+                        diagnostics=Diagnostics()).parseProgram()
+    diagnostics = Diagnostics()
+    resolution = resolve(statements, diagnostics=diagnostics)
+    assert not diagnostics.records
+    out = io.StringIO()
+    interpreter = interpreter or Interpreter()
+    interpreter.file = out
+    interpreter.run(statements, resolution)
+    return out.getvalue().splitlines()
+
+
+def error(code):
+    with pytest.raises(LoxRuntimeError) as info:
+        run(code)
+    return str(info.value)
+
+
+def test_statements():
+    assert run("""
+        var a = 1;
+        var b;
+        print a + 2; print b; print "s" + "t";
+        a = a * 4 - 1 / 2; print a;
+        if (a > 3 and a >= 3.5) print "big"; else print "small";
+        if (a < 0 or a <= 0) print "negative"; else print !a;
+        if (nil) print 1;
+        var i = 0;
+        while (i != 3) i = i + 1;
+        print i == 3;
+        for (var j = 0; j < 2; j = j + 1) { print -j; }
+        print 1 / 0; print nil or false; print 0 and "zero";
+        print 1 or 2; print nil and 1;
+        { var a = "shadow"; print a; }
+        print a;
+    """) == ["3", "nil", "st", "3.5", "big", "false", "true", "-0", "-1",
+             "inf", "false", "zero", "1", "nil", "shadow", "3.5"]
+
+
+def test_functions():
+    assert run("""
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        print fib(15);
+        fun nothing() {}
+        print nothing(); print fib; print clock() > 0; print clock;
+
+        fun counter() {
+            var count = 0;
+            fun increment() { count = count + 1; return count; }
+            return increment;
+        }
+        var next = counter(); next(); print next();
+
+        fun shared() {
+            var count = 0;
+            fun get() { return count; }
+            count = 5;
+            while (true) return get();
+        }
+        print shared();
+        var other = counter(); print other();
+
+        fun outer(a) {
+            fun middle() { fun inner() { a = a + 1; return a; } return inner; }
+            return middle;
+        }
+        var inner = outer(10)(); inner(); print inner();
+
+        fun local() {
+            fun even(n) { if (n == 0) return true; return odd(n - 1); }
+            fun odd(n) { if (n == 0) return false; return even(n - 1); }
+            return even(4);
+        }
+        fun odd(n) { return "global"; }
+        print local();
+
+        // Every iteration gets its own variable
+        var first;
+        for (var i = 0; i < 3; i = i + 1) {
+            var x = i;
+            fun get() { return x; }
+            if (i == 0) first = get;
+        }
+        print first();
+    """) == ["610", "nil", "<fn fib>", "true", "<native fn>", "2", "5", "1",
+             "12", "global", "0"]
+
+
+def test_classes():
+    assert run("""
+        class Animal {
+            init(name) { this.name = name; }
+            speak() { return "The " + this.name + " says "; }
+            namer() { fun get() { return this.name; } return get; }
+        }
+        class Dog < Animal {
+            init() { super.init("dog"); }
+            speak() { return super.speak() + "bark"; }
+        }
+        var dog = Dog();
+        print dog.speak(); print dog; print Dog;
+        print dog.namer()();
+        dog.name = "cat"; print dog.speak();
+        // init returns this, and runs again
+        print dog.init() == dog;
+        var speak = dog.speak; print speak();
+
+        class Empty {}
+        print Empty();
+        fun make(base) {
+            class Local < base { get() { return super.speak(); } }
+            return Local;
+        }
+        print make(Animal)("ox").get();
+    """) == ["The dog says bark", "Dog instance", "Dog", "dog",
+             "The cat says bark", "true", "The dog says bark",
+             "Empty instance", "The ox says "]
+
+
+def test_globals_persist():
+    interpreter = Interpreter()
+    run("var a = 1; fun f() { return a; }", interpreter)
+    assert run("a = 2; print f();", interpreter) == ["2"]
+
+
+def test_errors():
+    assert error("print -nil;") == "Operand must be a number. [line 0]"
+    assert error("print 1 < nil;") == "Operands must be numbers. [line 0]"
+    assert error('print 1 + "a";') == \
+        "Operands must be two numbers or two strings. [line 0]"
+    assert error("print x;") == "Undefined variable 'x'. [line 0]"
+    assert error("x = 1;") == "Undefined variable 'x'. [line 0]"
+    assert error("fun f(a) {}\nf();") == \
+        "Expected 1 arguments but got 0. [line 1]"
+    assert error("clock(1);") == "Expected 0 arguments but got 1. [line 0]"
+    assert error('"f"();') == "Can only call functions and classes. [line 0]"
+    assert error("class A {} A(1);") == \
+        "Expected 0 arguments but got 1. [line 0]"
+    assert error("print 1.x;") == "Only instances have properties. [line 0]"
+    assert error("nil.x = 1;") == "Only instances have fields. [line 0]"
+    assert error("class A {} print A().x;") == \
+        "Undefined property 'x'. [line 0]"
+    assert error("var B = 1; class A < B {}") == \
+        "Superclass must be a class. [line 0]"
+    assert error("class B {} class A < B { m() { return super.m; } }\n"
+                 "A().m();") == "Undefined property 'm'. [line 0]"
+    assert error("fun f() { f(); } f();") == "Stack overflow. [line 0]"
+
+
+def test_arity():
+    assert run("""
+        class A { init(a, b) {} }
+        class B {}
+        fun f(x) {}
+    """) == []
+    interpreter = Interpreter()
+    run("class A { init(a, b) {} } class B {} fun f(x) {}", interpreter)
+    assert [interpreter.globals[name].arity for name in "ABf"] == [2, 0, 1]
+
+
+def test_main(tmp_path, capsys):
+    path = tmp_path / "main.lox"
+    path.write_text('print "hello";')
+    assert main(["run", str(path)]) == 0
+    assert capsys.readouterr().out == "hello\n"
+
+    path.write_text("print x;")
+    assert main(["run", str(path)]) == 70
+    assert capsys.readouterr().err == \
+        f"{path}: Undefined variable 'x'. [line 0]\n"
+
+    path.write_text("return 1;\n1 +;")
+    assert main(["run", str(path)]) == 65
+    assert "expected an expression" in capsys.readouterr().err
+
+    path.write_text("return 1;")
+    assert main(["run", str(path)]) == 65
+    assert "Can't return from top-level code." in capsys.readouterr().err
+
+    assert main(["run", str(tmp_path / "missing.lox")]) == 66
+    assert "cannot read file" in capsys.readouterr().err
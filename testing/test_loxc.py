@@ -0,0 +1,89 @@
+import struct
+
+import pytest
+
+from pylox.loxc import LoxcError, LoxcReader, MAGIC, writeLoxc
+from pylox.parser import BinaryOp, Constant, Parser
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+
+CODE = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1\n' \
+    '!= (true == false) + "tëst" + nil; 1 + 1;\n"tëst"; 2 <= 3 == !false;\n'
+
+
+def render(node):
+    if hasattr(node, "_op"):
+        left = render(node._left) if hasattr(node, "_left") else ""
+        return f"({left} {node._op.name}@{node.line} {render(node._right)})"
+    return f"{type(node).__name__}[{node.value!r}]"
+
+
+def parse(tmp_path, code):
+    path = tmp_path / "test.lox"
+    path.write_text(code)
+    return Parser(Scanner(str(path)).getTokens()).parse()
+
+
+def test_round_trip(tmp_path):
+    nodes = parse(tmp_path, CODE)
+    path = str(tmp_path / "test.loxc")
+    writeLoxc(path, nodes)
+
+    with LoxcReader(path) as reader:
+        assert len(reader) == 4
+        assert [render(n) for n in reader] == [render(n) for n in nodes]
+        assert reader[-1] is reader[3]
+        assert reader.nodeCount == 40
+        # Every literal stored once
+        assert reader.constantCount == 12
+
+        with pytest.raises(IndexError):
+            reader[4]
+
+
+def test_lazy_decoding(tmp_path):
+    nodes = [BinaryOp(Constant(float(i)), TokenType.STAR, Constant(2.0), i)
+             for i in range(1000)]
+    path = str(tmp_path / "big.loxc")
+    writeLoxc(path, nodes)
+
+    reader = LoxcReader(path)
+    tree = reader[500]
+    assert (tree._left.value, tree.line) == (500.0, 500)
+    # Only the touched tree was decoded
+    assert len(reader._LoxcReader__trees) == 1
+    assert sorted(reader._LoxcReader__values) == [1, 500]
+    reader.close()
+
+
+def test_empty_program(tmp_path):
+    path = str(tmp_path / "empty.loxc")
+    writeLoxc(path, [])
+
+    with LoxcReader(path) as reader:
+        assert list(reader) == []
+
+
+def test_statements(tmp_path):
+    statements = Parser(Scanner.scanBuffer("print 1;")).parseProgram()
+    with pytest.raises(LoxcError, match="only hold expressions"):
+        writeLoxc(str(tmp_path / "program.loxc"), statements)
+
+
+def test_invalid_files(tmp_path):
+    path = str(tmp_path / "test.loxc")
+    writeLoxc(path, parse(tmp_path, CODE))
+    with open(path, "rb") as f:
+        data = f.read()
+
+    def check(content, message):
+        bad = tmp_path / "bad.loxc"
+        bad.write_bytes(content)
+        with pytest.raises(LoxcError, match=message):
+            LoxcReader(str(bad))
+
+    check(b"", "is empty")
+    check(data[:10], "is truncated")
+    check(data[:-8], "is truncated")
+    check(b"PYC!" + data[4:], "not a .loxc file")
+    check(MAGIC + struct.pack("<H", 99) + data[6:], "version 99, expected 1")
@@ -0,0 +1,140 @@
+import pytest
+
+from pylox.optimizer import Optimizer
+from pylox.parser import BinaryOp, Bool, Constant, Logical, Parser, String, \
+    UnaryOp, Variable
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+from pylox.traverse import walk
+
+filename = "/tmp/optimizer_test.lox"
+
+
+def parse(code):
+    with open(filename, "w") as f:
+        f.write(code)
+
+    return Parser(Scanner(filename).getTokens()).parse()
+
+
+def optimize(code):
+    optimizer = Optimizer()
+    nodes = parse(code)
+    return optimizer.optimizeAll(nodes), optimizer.eliminated
+
+
+def test_fold_arithmetic():
+    nodes, eliminated = optimize('-1.2/4.4 + -2 - (3+5) * 6.5 * 7;')
+
+    assert len(nodes) == 1
+    assert isinstance(nodes[0], Constant)
+    assert nodes[0].value == -1.2 / 4.4 + -2 - (3 + 5) * 6.5 * 7
+    assert eliminated == 14
+
+
+def test_fold_literals():
+    nodes, _ = optimize("""
+    "a" + "b"; 1 < 2; 2 <= 1; 3 > 3; 3 >= 3;
+    1 == 1; 1 == true; nil == nil; "a" != "a"; !nil; !0; -(-4);
+    """)
+    values = [node.value for node in nodes]
+
+    assert [type(node) for node in nodes] == \
+        [String] + [Bool] * 10 + [Constant]
+    assert values == [
+        "ab", True, False, False, True,
+        True, False, True, False, True, False, 4.0
+    ]
+
+
+def test_expression():
+    code = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 ' \
+        '!= (true == false) + "test" + nil'
+    nodes, eliminated = optimize(code)
+
+    # 5 > ... folds, but comparing its result to 10.0 and adding a bool to
+    # a string are runtime errors
+    assert len(list(walk(nodes[0]))) == 12
+    assert eliminated == len(list(walk(parse(code)[0]))) - 12
+
+
+def test_unsafe_left_alone():
+    nodes, eliminated = optimize(
+        '1 / 0; 1 + "a"; "a" - "b"; "a" < "b"; -"a"; true * 1;')
+
+    assert eliminated == 0
+    for node in nodes:
+        assert isinstance(node, (BinaryOp, UnaryOp))
+
+
+def test_identities():
+    nodes, eliminated = optimize(
+        '(1 / 0) * 1; 1 * (2 / 0); (1 / 0) / 1; !!(1 / 0 < 2); -(-(1 / 0));'
+        '!!"a" + "b"; -(-("a" + 1)); !!(1 + nil); -(-"a"); -(-!(1 / 0 < 2));')
+
+    for node in nodes[:5]:
+        assert isinstance(node, BinaryOp)
+        assert node._op in (TokenType.SLASH, TokenType.LESS_THAN)
+
+    # Only safe for bools and numbers
+    assert isinstance(nodes[5], BinaryOp)
+    assert isinstance(nodes[6], UnaryOp)
+    assert isinstance(nodes[7], UnaryOp)
+    assert isinstance(nodes[8]._right, UnaryOp)
+    assert isinstance(nodes[9]._right._right, UnaryOp)
+    assert eliminated == 2 * 5 + 2
+
+
+def test_copy_on_write():
+    unchanged = parse('1 / 0 + -(2 / 0);')[0]
+    changed = parse('(1 + 1) / 0;')[0]
+    optimizer = Optimizer()
+
+    assert optimizer.optimize(unchanged) is unchanged
+
+    node = optimizer.optimize(changed)
+    assert node is not changed
+    assert node._right is changed._right
+    assert isinstance(changed._left, BinaryOp)
+    assert node._left.value == 2.0
+
+
+def test_logical():
+    tokens = list(Scanner.scanBuffer(
+        "print 1 or 2; print nil and x / 1; print false or x; print true and "
+        "2 * 3; print !!(a or b); print !!(a < 1 and b > 2); print a or "
+        "1 + 1; print a and b;"))
+    optimizer = Optimizer()
+    nodes = optimizer.optimizeAll(
+        s._expression for s in Parser(tokens).parseProgram())
+
+    # Short-circuits to the operand that is the result
+    assert (type(nodes[0]), nodes[0].value) == (Constant, 1.0)
+    assert nodes[1].value is None
+    assert isinstance(nodes[2], Variable)
+    assert nodes[3].value == 6.0
+
+    # The result is an operand, not a bool, so !! has to stay
+    for node in nodes[4:6]:
+        assert isinstance(node._right._right, Logical)
+    assert isinstance(nodes[6], Logical) and nodes[6]._right.value == 2.0
+    # The skipped side goes as a whole, and 2 * 3 and 1 + 1 fold as usual
+    assert optimizer.eliminated == 2 + 4 + 2 + 4 + 2
+
+
+def test_compound():
+    code = "print f(1 + 2); x = 3 * 4; print a.b(5 - 1); a.c = !true; g();"
+    statements = Parser(list(Scanner.scanBuffer(code))).parseProgram()
+    optimizer = Optimizer()
+    nodes = optimizer.optimizeAll(s._expression for s in statements)
+
+    assert nodes[0]._arguments[0].value == 3.0
+    assert nodes[1]._value.value == 12.0
+    assert nodes[2]._arguments[0].value == 4.0
+    assert nodes[3]._value.value is False
+    assert optimizer.eliminated == 2 * 3 + 1
+
+    # Copies, the parsed trees are left alone
+    assert isinstance(statements[0]._expression._arguments[0], BinaryOp)
+    assert nodes[2]._callee is statements[2]._expression._callee
+    assert nodes[4] is statements[4]._expression
@@ -0,0 +1,99 @@
+from pylox.diagnostics import Diagnostics
+from pylox.parser import Parser
+from pylox.resolver import resolve
+from pylox.scanner import Scanner
+from pylox.traverse import walk
+
+CODE = """
+var g = 1;
+fun outer(a) {
+    var b = a;
+    { var c = b; }
+    fun middle() {
+        fun inner() { return a + g; }
+        return inner;
+    }
+    return middle;
+}
+class A < B {
+    m() { return super.m(this); }
+}
+"""
+
+
+def parse(code):
+    return Parser(list(Scanner.scanBuffer(code)),
+                  diagnostics=Diagnostics()).parseProgram()
+
+
+def errors(code):
+    diagnostics = Diagnostics()
+    resolve(parse(code), "test.lox", diagnostics)
+    return [d.text for d in diagnostics]
+
+
+def test_slots():
+    statements = parse(CODE)
+    resolution = resolve(statements)
+    _, outer, klass = statements
+    bindings = {}
+    for statement in statements:
+        for node in walk(statement):
+            if node in resolution.bindings:
+                bindings.setdefault(str(node), []).append(
+                    resolution.bindings[node])
+
+    # Globals aren't bound, locals are (depth, slot) with blocks getting
+    # slots in their function's frame
+    assert "Var g" not in bindings and "Variable[g]" not in bindings
+    assert bindings["Var b"] == [(0, 1)]
+    assert bindings["Var c"] == [(0, 2)]
+    assert bindings["Function middle()"] == [(0, 3)]
+    assert bindings["Variable[a]"] == [(0, 0), (2, 0)]
+    assert bindings["Variable[b]"] == [(0, 1)]
+
+    # a lives in outer's frame as a cell, middle passes it on to inner
+    middle = outer.body[2]
+    inner = middle.body[0]
+    assert resolution.functions[outer].size == 4
+    assert resolution.functions[outer].cells == {0}
+    assert resolution.functions[middle].free == [(1, 0)]
+    assert resolution.functions[inner].free == [(2, 0)]
+
+    # super is a variable around the methods, this is slot 0 of a method
+    method = klass._methods[0]
+    assert resolution.supers[klass] == 0
+    assert resolution.script.size == 1 and resolution.script.cells == {0}
+    assert resolution.functions[method].free == [(1, 0)]
+    call = method.body[0]._value
+    assert resolution.bindings[call._callee] == (1, 0)
+    assert resolution.receivers[call._callee] == (0, 0)
+    assert resolution.bindings[call._arguments[0]] == (0, 0)
+
+
+def test_errors(capsys):
+    assert errors("""
+        { var a = 1; var a = 2; }
+        { var b = b; }
+        return 1;
+        print this;
+        print super.x;
+        class A { init() { return 1; } m() { super.m(); } }
+        class B < B { init() { return; } }
+        fun f(x, x) {}
+    """) == [
+        "error at 'a': Already a variable with this name in this scope.",
+        "error at 'b': Can't read local variable in its own initializer.",
+        "error at 'return': Can't return from top-level code.",
+        "error at 'this': Can't use 'this' outside of a class.",
+        "error at 'super': Can't use 'super' outside of a class.",
+        "error at 'return': Can't return a value from an initializer.",
+        "error at 'super': Can't use 'super' in a class with no superclass.",
+        "error at 'B': A class can't inherit from itself.",
+        "error at 'x': Already a variable with this name in this scope.",
+    ]
+
+    # Printed at the end without a collector
+    resolve(parse("return;"), "test.lox")
+    assert capsys.readouterr().err == \
+        "test.lox:0:0: error at 'return': Can't return from top-level code.\n"
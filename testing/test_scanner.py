@@ -1,7 +1,7 @@
 import pytest
 
 from pylox.token import Token, TokenType
-from pylox.scanner import Scanner
+from pylox.scanner import Scanner, ScanEngine, _scanChunk
 
 filename = "/tmp/scanner_test.lox"
 
@@ -297,3 +297,157 @@ def test_scanner_double_token():
 
     for idx, t in enumerate(scanner.getTokens()):
         assert expected[idx] == t, f"{expected[idx]} vs {t}"
+
+
+def test_scanner_engines_match():
+    with open(filename, "w") as f:
+        src_content = '\t var a = = b;\tc ! = d  \n'
+        src_content += 'print "unterminated string   \n'
+        src_content += 'x = 1.5 >= "" <= ^ é;\n\n'
+        src_content += '2e10 1.5E-3 1. 5 1.x 12abc 1.5e x2.5 ²;\n'
+        f.write(src_content)
+
+    for src in (filename, "testing/src/class.lox"):
+        legacy = Scanner(src, ScanEngine.LEGACY).getTokens()
+        regex = Scanner(src, ScanEngine.REGEX).getTokens()
+
+        assert len(legacy) == len(regex)
+        for expected, t in zip(legacy, regex):
+            assert expected == t, f"{expected} vs {t}"
+
+
+def test_scanner_keyword_prefix():
+    with open(filename, "w") as f:
+        src_content = 'var format = standard;'
+        f.write(src_content)
+
+    expected = [
+        Token(TokenType.VAR, "var", 0),
+        Token(TokenType.IDENTIFIER, "format", 0),
+        Token(TokenType.EQUAL, "=", 0),
+        Token(TokenType.IDENTIFIER, "standard", 0),
+        Token(TokenType.SEMICOLON, ";", 0),
+        Token(TokenType.EOF, "", 0)
+    ]
+
+    scanner = Scanner(filename)
+
+    for idx, t in enumerate(scanner.getTokens()):
+        assert expected[idx] == t, f"{expected[idx]} vs {t}"
+
+
+def test_scanner_iter_tokens():
+    with open(filename, "w") as f:
+        src_content = 'var a = "one";\n\nprint a + 1.5;\n'
+        f.write(src_content)
+
+    expected = Scanner(filename).getTokens()
+
+    for engine in ScanEngine:
+        for chunk_size in (1, 4, Scanner.CHUNK_SIZE):
+            tokens = list(Scanner(filename, engine).iter_tokens(chunk_size))
+
+            assert len(expected) == len(tokens)
+            for e, t in zip(expected, tokens):
+                assert e == t, f"{e} vs {t}"
+
+
+def test_scanner_token_buffer():
+    with open(filename, "w") as f:
+        src_content = 'var a = = "one";\t^\nprint "open  \n'
+        f.write(src_content)
+
+    for src in (filename, "testing/src/class.lox"):
+        scanner = Scanner(src)
+        expected = scanner.getTokens()
+        buffer = scanner.getTokenBuffer()
+
+        assert len(expected) == len(buffer)
+        for e, t in zip(expected, buffer):
+            assert e == t, f"{e} vs {t}"
+
+
+def test_scanner_parallel(tmp_path):
+    sources = {
+        "lines": 'var a = = "one";\t^\nprint "open  \n' * 50,
+        "crlf": 'print "é" + 1;\r\n\r\n  fun f() {}\r\n' * 50,
+        "no_newline": "1 + 2;\n" * 50 + "3",
+        "blank_lines": "\n\n\n" * 50,
+        "one_line": "a + b " * 200,
+        "empty": "",
+    }
+
+    for name, src_content in sources.items():
+        path = tmp_path / f"{name}.lox"
+        path.write_bytes(src_content.encode())
+        scanner = Scanner(str(path))
+        expected = scanner.getTokenBuffer()
+
+        for jobs in (1, 2, 3):
+            buffer = scanner.getTokenBufferParallel(jobs, min_chunk=64)
+
+            assert buffer.source == expected.source, name
+            assert buffer.types == expected.types, name
+            assert buffer.starts == expected.starts, name
+            assert buffer.ends == expected.ends, name
+            assert buffer.lines == expected.lines, name
+            assert list(buffer) == scanner.getTokens(), name
+
+    # Workers scan a byte range given where it starts in the source
+    path = tmp_path / "chunk.lox"
+    path.write_bytes(b'1;\n"\xc3\xa9" + 2;\n')
+    types, starts, ends, lines = _scanChunk(str(path), 3, 13, 3, 1)
+    expected = Scanner(str(path)).getTokenBuffer()
+    assert (types, starts, ends, lines) == (
+        expected.types[2:-1].tobytes(), expected.starts[2:-1].tobytes(),
+        expected.ends[2:-1].tobytes(), expected.lines[2:-1].tobytes())
+
+
+def test_scanner_columns():
+    with open(filename, "w") as f:
+        f.write('1 + 2;\n  "ab" ==  x;\n')
+
+    expected = [0, 2, 4, 5, 2, 7, 11, 12]
+    tokens = Scanner(filename).getTokens()
+    assert [t.column for t in tokens[:-1]] == expected
+
+    buffer = Scanner(filename).getTokenBuffer()
+    assert [buffer[i].column for i in range(len(expected))] == expected
+
+
+def test_scanner_numbers():
+    with open(filename, "w") as f:
+        f.write("1.337 + 2e3 * 1.5E-2 - 1. 5 + 1.x + 12abc + 1.337;")
+
+    expected = [
+        (TokenType.NUMBER, "1.337", 1.337),
+        (TokenType.PLUS, "+", None),
+        (TokenType.NUMBER, "2e3", 2000.0),
+        (TokenType.STAR, "*", None),
+        (TokenType.NUMBER, "1.5E-2", 0.015),
+        (TokenType.MINUS, "-", None),
+        # A dot needs digits right after it to be part of a number
+        (TokenType.NUMBER, "1", 1.0),
+        (TokenType.DOT, ".", None),
+        (TokenType.NUMBER, "5", 5.0),
+        (TokenType.PLUS, "+", None),
+        (TokenType.NUMBER, "1", 1.0),
+        (TokenType.DOT, ".", None),
+        (TokenType.IDENTIFIER, "x", None),
+        (TokenType.PLUS, "+", None),
+        (TokenType.IDENTIFIER, "12abc", None),
+        (TokenType.PLUS, "+", None),
+        (TokenType.NUMBER, "1.337", 1.337),
+        (TokenType.SEMICOLON, ";", None),
+        (TokenType.EOF, "", None),
+    ]
+
+    for engine in ScanEngine:
+        tokens = Scanner(filename, engine).getTokens()
+        assert [(t.type, t.lexeme, t.value) for t in tokens] == expected
+        # Repeated literals share one value
+        assert tokens[0].value is tokens[-3].value
+
+    buffer = Scanner(filename).getTokenBuffer()
+    assert [(t.type, t.lexeme, t.value) for t in buffer] == expected
+    assert buffer[0].value is buffer[-3].value
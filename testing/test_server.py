@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from pylox import server as server_module
+from pylox.__main__ import main
+from pylox.client import request
+from pylox.server import AstCache, Server, handle, serve
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "ok.lox").write_text("var a = 1;\nprint a + 2;\n")
+    (tmp_path / "bad.lox").write_text("1 + ;\nprint 2;\n")
+    return {name: str(tmp_path / f"{name}.lox") for name in ("ok", "bad")}
+
+
+def wait(path):
+    """Until a server answers on `path`"""
+    for _ in range(500):
+        if request({"command": "parse"}, path) is not None:
+            return
+        time.sleep(0.01)
+    raise TimeoutError(path)
+
+
+@pytest.fixture
+def running(tmp_path):
+    """A server in a thread of its own, like a separate process"""
+    path = str(tmp_path / "s.sock")
+    thread = threading.Thread(target=serve, args=(path,))
+    thread.start()
+    wait(path)
+    yield path
+    request({"command": "shutdown"}, path)
+    thread.join()
+
+
+def test_cache(files, tmp_path):
+    cache = AstCache(size=2)
+    first = cache.load(files["ok"])
+    assert (len(first.statements), first.tokens, first.diagnostics) == \
+        (2, 11, [])
+    assert cache.load(files["ok"]) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Edits are noticed whatever the timestamps say
+    stat = os.stat(files["ok"])
+    (tmp_path / "ok.lox").write_text("var b = 1;\nprint b + 2;\n")
+    os.utime(files["ok"], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    second = cache.load(files["ok"])
+    assert second is not first and cache.misses == 2
+
+    # The least recently used file goes first
+    cache.load(files["bad"])
+    cache.load(files["ok"])
+    (tmp_path / "c.lox").write_text("3;\n")
+    cache.load(str(tmp_path / "c.lox"))
+    assert len(cache) == 2
+    assert cache.load(files["ok"]) is second
+    assert len(cache.load(files["bad"]).diagnostics) == 1
+    assert cache.misses == 5
+
+    with pytest.raises(FileNotFoundError):
+        cache.load(str(tmp_path / "missing.lox"))
+
+
+def test_handle(files, tmp_path):
+    cache = AstCache()
+    paths = [files["ok"], files["bad"]]
+    response = handle({"command": "check", "paths": paths}, cache)
+    assert response == {
+        "status": 1,
+        "stdout": f"{files['bad']}:0:4: error at ';': "
+                  "expected an expression\n",
+        "stderr": "",
+    }
+    response = handle({"command": "check", "paths": paths[:1]}, cache)
+    assert response["status"] == 0 and cache.hits == 1
+
+    response = handle({"command": "check", "paths": paths[1:],
+                       "format": "json"}, cache)
+    assert json.loads(response["stdout"])["lexeme"] == ";"
+
+    response = handle({"command": "parse", "paths": paths}, cache)
+    assert response["stdout"] == \
+        f"{files['ok']}: 2 statements, 11 tokens\n" \
+        f"{files['bad']}: 1 statements, 7 tokens\n"
+    assert "expected an expression" in response["stderr"]
+
+    response = handle({"command": "dump", "paths": paths[:1]}, cache)
+    assert response["stdout"].splitlines()[:3] == \
+        ["Var a[", "  Const[1.0]", "]"]
+    assert (response["status"], response["stderr"]) == (0, "")
+
+    missing = str(tmp_path / "missing.lox")
+    for command in ("check", "dump"):
+        response = handle({"command": command, "paths": [missing]}, cache)
+        text = response["stdout"] + response["stderr"]
+        assert response["status"] == 1
+        assert text.startswith(f"{missing}:0:0: error: cannot read file")
+        assert "Var" not in text
+
+    assert handle({"command": "shutdown"}, cache)["status"] == 0
+
+
+@pytest.mark.parametrize("message, error", [
+    ([], "unknown command"),
+    ({"command": "run"}, "unknown command"),
+    ({"command": "check", "paths": "a.lox"}, "bad check request"),
+    ({"command": "dump", "paths": [1]}, "bad dump request"),
+    ({"command": "parse", "paths": [], "format": "xml"}, "bad parse request"),
+])
+def test_bad_requests(message, error):
+    assert handle(message, AstCache()) == \
+        {"status": 2, "stdout": "", "stderr": f"pylox: {error}\n"}
+
+
+def test_concurrent_clients(files, tmp_path, monkeypatch):
+    path = str(tmp_path / "s.sock")
+    monkeypatch.setattr(server_module, "REQUEST_LIMIT", 1024)
+
+    async def client(server, command, count):
+        reader, writer = await asyncio.open_unix_connection(path)
+        responses = []
+        for _ in range(count):
+            message = {"command": command, "paths": [files["ok"]]}
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        return responses
+
+    async def raw(data):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(data)
+        await writer.drain()
+        line = await reader.readline()
+        writer.close()
+        return json.loads(line)["stderr"]
+
+    async def scenario():
+        server = Server(path)
+        await server.start()
+        results = await asyncio.gather(
+            *(client(server, command, 5)
+              for command in ("check", "parse", "dump") * 4))
+        assert all(response["status"] == 0
+                   for responses in results for response in responses)
+        # Parsed once, however many clients asked
+        assert (server.cache.misses, server.cache.hits) == (1, 59)
+
+        assert await raw(b"{\n") == "pylox: request is not JSON\n"
+        assert await raw(b"x" * 2048 + b"\n") == "pylox: request too long\n"
+
+        # A client that leaves without reading its response
+        reader, writer = await asyncio.open_unix_connection(path)
+        message = {"command": "dump", "paths": [files["ok"]]}
+        writer.write(json.dumps(message).encode() + b"\n")
+        writer.close()
+        await asyncio.sleep(0.1)
+        assert (await client(server, "check", 1))[0]["status"] == 0
+
+        await server.close()
+        assert not os.path.exists(path)
+
+    asyncio.run(scenario())
+
+
+def test_failing_request(files, running, monkeypatch):
+    def fail(request, cache):
+        raise RecursionError("maximum recursion depth exceeded")
+    monkeypatch.setattr(server_module, "handle", fail)
+
+    response = request({"command": "check", "paths": [files["ok"]]}, running)
+    assert response == {"status": 2, "stdout": "", "stderr": (
+        "pylox: internal error: "
+        "RecursionError('maximum recursion depth exceeded')\n")}
+
+    # Nothing else is affected
+    monkeypatch.undo()
+    response = request({"command": "check", "paths": [files["ok"]]}, running)
+    assert response["status"] == 0
+
+
+def test_socket_in_use(running, tmp_path):
+    with pytest.raises(OSError, match="already listening"):
+        asyncio.run(Server(running).start())
+    assert main(["serve", "--socket", running]) == 1
+
+    # A socket left behind by a server that is gone is replaced
+    path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    thread = threading.Thread(target=main,
+                              args=(["serve", "--socket", path],))
+    thread.start()
+    wait(path)
+    assert request({"command": "shutdown"}, path)["status"] == 0
+    thread.join()
+    assert not os.path.exists(path)
+
+
+def test_interrupted(monkeypatch):
+    def interrupt(path, cache):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(server_module, "serve", interrupt)
+    assert main(["serve", "--socket", "unused.sock"]) == 0
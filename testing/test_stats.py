@@ -0,0 +1,107 @@
+import json
+import pickle
+
+import pytest
+
+from pylox.__main__ import main
+from pylox.diagnostics import Diagnostics
+from pylox.parser import Parser, ParseEngine
+from pylox.scanner import Scanner
+from pylox.stats import Stats
+
+CODE = "1 + 2 * -(3 - 4);\n1 + ;\n;\n\"a\" == nil;\n"
+
+
+def parse(engine=ParseEngine.RECURSIVE):
+    stats = Stats()
+    buffer = Scanner.scanBuffer(CODE)
+    stats.countTokens(buffer.types)
+    with stats.phase("parse"):
+        nodes = Parser(list(buffer), diagnostics=Diagnostics(), engine=engine,
+                       stats=stats).parse()
+    return stats, nodes
+
+
+def test_rules():
+    stats, nodes = parse()
+    assert len(nodes) == 2
+
+    calls = {name: entry[0] for name, entry in stats.rules.items()}
+    assert calls["_exp"] == 4
+    assert calls["_unary"] == 10
+    assert calls["_primary"] == 8
+    assert calls["_pratt"] == 0
+
+    # Recursive calls don't count twice in the cumulative time, and the
+    # time spent in a rule itself never exceeds it
+    _, seconds, own = stats.rules["_exp"]
+    assert seconds <= stats.phases["parse"]
+    for _, seconds, own in stats.rules.values():
+        assert 0 <= own <= seconds + 1e-9
+
+    assert (stats.recoveries, stats.skipped) == (1, 1)
+
+
+def test_engines():
+    stats, _ = parse(ParseEngine.PRATT)
+    assert stats.rules["_pratt"][0] == 10
+    assert stats.rules["_equality"][0] == 0
+
+    stats, _ = parse(ParseEngine.ITERATIVE)
+    assert stats.rules["_iterative"][0] == 3
+
+
+def test_disabled():
+    # Without stats the parser runs its own methods, not wrappers
+    parser = Parser([])
+    assert "_unary" not in vars(parser)
+    assert "_unary" in vars(Parser(list(Scanner.scanBuffer(CODE)),
+                                   stats=Stats()))
+
+
+def test_tokens_and_output():
+    stats, _ = parse()
+    assert stats.tokens["NUMBER"] == 5
+    assert stats.tokens["SEMICOLON"] == 4
+    assert stats.tokens["EOF"] == 1
+
+    data = json.loads(stats.toJson())
+    assert data["recoveries"] == 1
+    assert "_pratt" not in data["rules"]
+    assert data["rules"]["_primary"]["calls"] == 8
+    assert set(data["rules"]["_primary"]) == {
+        "calls", "seconds", "self_seconds"}
+
+
+def test_merge():
+    stats, _ = parse()
+    total = pickle.loads(pickle.dumps(Stats()))
+    total.merge(stats)
+    total.merge(stats)
+    assert total.tokens["NUMBER"] == 10
+    assert total.rules["_exp"][0] == 8
+    assert total.phases["parse"] == pytest.approx(2 * stats.phases["parse"])
+    assert total.recoveries == 2
+
+
+def test_main_stats(tmp_path, capsys):
+    (tmp_path / "a.lox").write_text(CODE)
+    (tmp_path / "b.lox").write_text("1;\n")
+    output = tmp_path / "stats.json"
+
+    assert main(["check", str(tmp_path), "-j", "1",
+                 "--stats", str(output)]) == 1
+    data = json.loads(output.read_text())
+    assert data["files"] == 2
+    assert set(data["phases"]) == {"read", "scan", "parse"}
+    assert data["tokens"]["NUMBER"] == 6
+    # check parses whole programs, where the lone ; is an error of its own
+    assert data["recoveries"] == 2
+
+    capsys.readouterr()
+    main(["check", str(tmp_path / "b.lox"), str(tmp_path / "missing.lox"),
+          "--stats", "-"])
+    out = capsys.readouterr().out
+    data = json.loads(out[out.index("{"):])
+    assert data["files"] == 1
+    assert data["rules"]["_primary"]["calls"] == 1
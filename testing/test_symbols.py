@@ -0,0 +1,76 @@
+from pylox.incremental import Document, TextEdit
+from pylox.scanner import ScanEngine, Scanner
+from pylox.symbols import SymbolTable
+from pylox.token import TokenType
+
+CODE = 'var alpha = beta + alpha;\nprint alpha.gamma(beta, "alpha") ^;\n'
+
+
+def identifiers(tokens):
+    return [(t.lexeme, t.symbol) for t in tokens
+            if t.type == TokenType.IDENTIFIER]
+
+
+def test_symbol_table():
+    symbols = SymbolTable()
+    assert symbols.intern("a") == 0
+    assert symbols.intern("b") == 1
+    assert symbols.intern("a") == 0
+    assert symbols.lookup("c") is None
+    assert "b" in symbols and "c" not in symbols
+    assert symbols.name(1) == "b"
+    assert list(symbols) == ["a", "b"] and len(symbols) == 2
+
+    # Equal number literals share one value, however they are written
+    assert symbols.number("1.5") == 1.5
+    assert symbols.number("1.50") is symbols.number("15e-1")
+
+
+def test_scanner_symbols(tmp_path):
+    path = tmp_path / "test.lox"
+    path.write_text(CODE)
+
+    expected = [("alpha", 0), ("beta", 1), ("alpha", 0), ("alpha", 0),
+                ("gamma", 2), ("beta", 1), ("^", 3)]
+    for engine in ScanEngine:
+        scanner = Scanner(str(path), engine)
+        tokens = scanner.getTokens()
+        assert identifiers(tokens) == expected
+        assert list(scanner.symbols) == ["alpha", "beta", "gamma", "^"]
+
+        # One string object per name
+        alphas = [t.lexeme for t in tokens if t.symbol == 0]
+        assert all(lexeme is alphas[0] for lexeme in alphas)
+
+    # Everything else has no symbol, strings included
+    assert all(t.symbol is None for t in tokens
+               if t.type != TokenType.IDENTIFIER)
+
+    # Buffers intern while scanning into the scanner's table, so IDs are
+    # the token list's whichever order they are read in
+    scanner = Scanner(str(path))
+    buffer = scanner.getTokenBuffer()
+    assert list(scanner.symbols) == ["alpha", "beta", "gamma", "^"]
+    assert identifiers(reversed(list(buffer))) == expected[::-1]
+    assert buffer[0].symbol is None
+    assert buffer.symbols is scanner.symbols
+
+    scanner = Scanner(str(path))
+    buffer = scanner.getTokenBufferParallel(2, min_chunk=8)
+    assert identifiers(buffer) == identifiers(Scanner(str(path)).getTokens())
+
+
+def test_shared_table():
+    symbols = SymbolTable()
+    symbols.intern("beta")
+    tokens = list(Scanner.scanText("alpha + beta;", 0, symbols))
+    assert identifiers(tokens) == [("alpha", 1), ("beta", 0)]
+    assert identifiers(Scanner.scanText("beta;")) == [("beta", 0)]
+
+
+def test_document_symbols():
+    document = Document("alpha + beta;\n")
+    document.apply([TextEdit(0, 0, 0, 5, "beta + gamma")])
+    assert identifiers(document.getTokens()) == [
+        ("beta", 1), ("gamma", 2), ("beta", 1)]
+    assert list(document.symbols) == ["alpha", "beta", "gamma"]
@@ -1,6 +1,6 @@
 import pytest
 
-from pylox.token import Token, TokenType
+from pylox.token import Token, TokenBuffer, TokenType
 
 
 def test_token():
@@ -9,3 +9,37 @@ def test_token():
     assert("[1336] . -> TokenType.DOT" != str(token))
     assert("[1337] , -> TokenType.DOT" != str(token))
     assert("[1337] . -> TokenType.WHILE" != str(token))
+
+    # Number tokens always carry their value
+    assert Token(TokenType.NUMBER, "2.5", 0).value == 2.5
+    assert Token(TokenType.NUMBER, "2.5", 0, value=1.0).value == 1.0
+    assert token.value is None
+
+
+def test_token_buffer():
+    source = 'print "hi" = = x;'
+    buffer = TokenBuffer(source)
+    buffer.append(TokenType.PRINT, 0, 5, 0)
+    buffer.append(TokenType.STRING, 7, 9, 0)
+    buffer.append(TokenType.EQUAL_EQUAL, 11, 14, 0)
+    buffer.append(TokenType.IDENTIFIER, 15, 16, 1)
+    buffer.append(TokenType.EOF, 17, 17, 1)
+
+    expected = [
+        Token(TokenType.PRINT, "print", 0),
+        Token(TokenType.STRING, "hi", 0),
+        Token(TokenType.EQUAL_EQUAL, "==", 0),
+        Token(TokenType.IDENTIFIER, "x", 1),
+        Token(TokenType.EOF, "", 1),
+    ]
+
+    assert len(buffer) == len(expected)
+    assert list(buffer) == expected
+    assert buffer[-1] == expected[-1]
+    assert buffer.type(3) == TokenType.IDENTIFIER
+    assert buffer.lexeme(1) == "hi"
+    assert buffer.line(3) == 1
+    assert str(buffer[2]) == str(expected[2])
+
+    with pytest.raises(IndexError):
+        buffer[len(expected)]
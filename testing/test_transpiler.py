@@ -0,0 +1,132 @@
+import ast
+import math
+import traceback
+
+import pytest
+
+from pylox.evaluator import evaluate
+from pylox.parser import BinaryOp, Constant, Parser
+from pylox.runtime import LoxRuntimeError, stringify
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+from pylox.transpiler import compileProgram, run, transpile
+
+filename = "/tmp/transpiler_test.lox"
+
+
+def parse(code):
+    with open(filename, "w") as f:
+        f.write(code)
+
+    return Parser(Scanner(filename).getTokens()).parse()
+
+
+def execute(code):
+    nodes = parse(code)
+    values = run(compileProgram(nodes, filename))
+    assert [stringify(v) for v in values] == \
+        [stringify(evaluate(node)) for node in nodes]
+    return values
+
+
+def error(code):
+    with pytest.raises(LoxRuntimeError) as info:
+        execute(code)
+    return str(info.value)
+
+
+def source(code):
+    return [ast.unparse(value) for value in transpile(parse(code)).body.elts]
+
+
+def test_matches_evaluator():
+    values = execute("""
+    1.4 + 2; 3.1465-4; 5.2 * 6; 7/8.1;
+    1==1;
+    2!=1==false;
+    "test"=="test";
+    1 - 2 - 3; - - 1; !nil; !!"a"; 1 == true; nil != nil; nil == nil;
+    1 < 2; 2 <= 1; 3 > 3; 3 >= 3; "a" + "b"; !(1 < 2) == !true;
+    -1.2/4.4 + -2 - (3+5) * 6.5 * 7;
+    1 / 0; 0 / 0 == 0 / 0; (1 + 2) / (3 - 3);
+    """)
+    assert len(values) == 24
+    assert values[20] == -1.2 / 4.4 + -2 - (3 + 5) * 6.5 * 7
+    assert values[21] == math.inf
+    assert values[22] is False
+    assert values[23] == math.inf
+
+
+def test_native_operators():
+    # Statically typed operands use Python's own operators
+    assert source('1 + 2 * -3 < 4; "a" + "b" == "ab"; !(1 >= 2); 1 / 2;') \
+        == ["1.0 + 2.0 * -3.0 < 4.0", "'a' + 'b' == 'ab'",
+            "not 1.0 >= 2.0", "1.0 / 2.0"]
+
+
+def test_helpers():
+    # Anything that could differ from Python goes through the runtime
+    assert source('1 + nil; 1 / 0; 1 == "a"; !1; -"a"; 1 < true;') == [
+        "_binary_plus(1.0, None, 0)",
+        "_binary_slash(1.0, 0.0, 0)",
+        "_binary_equal_equal(1.0, 'a', 0)",
+        "_unary_exclaimation(1.0, 0)",
+        "_unary_minus('a', 0)",
+        "_binary_less_than(1.0, True, 0)",
+    ]
+
+
+def test_runtime_errors():
+    assert error('1;\n-"a";') == "Operand must be a number. [line 1]"
+    assert error('\n\n1 +\n"a";') == \
+        "Operands must be two numbers or two strings. [line 2]"
+    assert error('("a" + 1) + 2;') == \
+        "Operands must be two numbers or two strings. [line 0]"
+    for op in ("-", "*", "/", ">", ">=", "<", "<="):
+        assert error(f'1;\n\n1 {op} nil;') == \
+            "Operands must be numbers. [line 2]"
+
+
+def test_traceback_lines():
+    code = compileProgram(parse('1;\n2;\n\n-nil;'), filename)
+    with pytest.raises(LoxRuntimeError) as info:
+        run(code)
+
+    frame = [f for f in traceback.extract_tb(info.value.__traceback__)
+             if f.filename == filename][0]
+    assert frame.lineno == info.value.line + 1 == 4
+
+
+def test_reusable():
+    code = compileProgram(parse("(1 + 2) * 3 == 9; 4;"))
+    assert run(code) == run(code) == [True, 4.0]
+
+
+def test_globals():
+    # Lox names can be Python keywords or clash with the helpers
+    statements = Parser(list(Scanner.scanBuffer(
+        "None * _binary_plus + -None;\n\nc;"))).parseProgram()
+    nodes = [statement._expression for statement in statements]
+    assert [ast.unparse(value) for value in transpile(nodes[:1]).body.elts] \
+        == ["_binary_star(_var_None, _var__binary_plus, 0) + "
+            "_unary_minus(_var_None, 0)"]
+    code = compileProgram(nodes[:1], filename)
+    assert run(code, {"None": 2.0, "_binary_plus": 3.0}) == [4.0]
+    assert run(code, {"None": 1.0, "_binary_plus": 3.0}) == [2.0]
+
+    with pytest.raises(LoxRuntimeError) as info:
+        run(code)
+    assert str(info.value) == "Undefined variable 'None'. [line 0]"
+    with pytest.raises(LoxRuntimeError) as info:
+        run(compileProgram(nodes, filename),
+            {"None": 2.0, "_binary_plus": 3.0})
+    assert str(info.value) == "Undefined variable 'c'. [line 2]"
+
+
+def test_deep_nesting():
+    node = Constant(1.0)
+    for _ in range(100000):
+        node = BinaryOp(node, TokenType.PLUS, Constant(1.0))
+
+    with pytest.raises(RecursionError):
+        compileProgram([node])
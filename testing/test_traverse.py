@@ -0,0 +1,44 @@
+import pytest
+
+from pylox.parser import BinaryOp, Constant, Nil, UnaryOp
+from pylox.token import TokenType
+from pylox.traverse import depth, fold, walk
+
+
+def test_walk():
+    tree = BinaryOp(
+        UnaryOp(TokenType.MINUS, Constant(1.0)),
+        TokenType.PLUS,
+        Nil()
+    )
+
+    nodes = list(walk(tree))
+    assert nodes == [tree, tree._left, tree._left._right, tree._right]
+
+
+def test_fold():
+    tree = BinaryOp(
+        Constant(2.0),
+        TokenType.STAR,
+        UnaryOp(TokenType.MINUS, Constant(3.0))
+    )
+
+    def evaluate(node, values):
+        if isinstance(node, BinaryOp):
+            return values[0] * values[1]
+        elif isinstance(node, UnaryOp):
+            return -values[0]
+        return node.value
+
+    assert fold(tree, evaluate) == -6.0
+    assert depth(tree) == 3
+    assert depth(Nil()) == 1
+
+
+def test_deep_tree():
+    tree = Constant(1.0)
+    for _ in range(100000):
+        tree = UnaryOp(TokenType.MINUS, tree)
+
+    assert depth(tree) == 100001
+    assert sum(1 for _ in walk(tree)) == 100001
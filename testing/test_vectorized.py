@@ -0,0 +1,170 @@
+import io
+
+import pytest
+
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import resolve
+from pylox.runtime import LoxRuntimeError, stringify
+from pylox.scanner import Scanner
+
+np = pytest.importorskip("numpy")
+vectorized = pytest.importorskip("pylox.vectorized")
+evaluateColumns = vectorized.evaluateColumns
+
+
+def formula(source):
+    return Parser(list(Scanner.scanBuffer(f"{source};"))).parseProgram()[0]
+
+
+COLUMNS = {
+    "x": np.array([1.0, 2.0, 0.0, -3.0]),
+    "i": np.array([4, 0, -1, 2]),
+    "s": np.array(["a", "b", "", "b"]),
+    "b": np.array([True, False, True, False]),
+    "n": np.array([1.5, None, 3.0, None], dtype=object),
+    "t": np.array([None, "u", None, "b"], dtype=object),
+    "m": np.ma.masked_array([1.0, 2.0, 3.0, 4.0],
+                            mask=[False, False, True, False]),
+}
+
+
+def rows():
+    """The columns as the values a row by row evaluation sees"""
+    for row in range(4):
+        values = {}
+        for name, column in COLUMNS.items():
+            value = None if np.ma.is_masked(column[row]) else column[row]
+            if isinstance(value, np.generic):
+                value = value.item()
+            values[name] = float(value) if type(value) is int else value
+        yield values
+
+
+def interpret(source, row):
+    statements = Parser(list(Scanner.scanBuffer(
+        f"print {source};"))).parseProgram()
+    interpreter = Interpreter(io.StringIO())
+    interpreter.globals.update(row)
+    interpreter.run(statements, resolve(statements))
+    return interpreter.file.getvalue().strip()
+
+
+def output(result, row):
+    if np.ma.is_masked(result[row]):
+        return "nil"
+    value = result[row]
+    return stringify(value.item() if isinstance(value, np.generic)
+                     else value)
+
+
+@pytest.mark.parametrize("source", [
+    "x * 2 + i - 1", "x / i", "-x", "(x - 1) / 0", "x > i", "x <= 0",
+    "x >= i", "x < 1", "!x", "!b", "!n", "!nil", "x == i", "x != 2",
+    "s + \"!\"", "s == \"b\"", "s == t", "s != x", "b == true", "n == nil",
+    "nil == nil", "t == nil", "n != nil and n > 2", "n or 0", "m or x",
+    "t or s", "b and x > 0", "b or nil", "nil or nil", "m and nil",
+    "1 + 2 * 3", "\"a\" + \"b\"", "4 / 0", "\"a\" or \"b\"", "!(x > 0)",
+])
+def test_matches_interpreter(source):
+    result = evaluateColumns(formula(source), COLUMNS)
+    assert len(result) == 4
+    for row, values in enumerate(rows()):
+        assert output(result, row) == interpret(source, values)
+
+
+def test_types():
+    assert evaluateColumns(formula("x + i"), COLUMNS).dtype == np.float64
+    assert evaluateColumns(formula("x > i"), COLUMNS).dtype == bool
+    assert evaluateColumns(formula("s + s"), COLUMNS).dtype == object
+    assert not np.ma.isMaskedArray(evaluateColumns(formula("x"), COLUMNS))
+
+    result = evaluateColumns(formula("n * 2"), {"n": COLUMNS["m"][[0, 1]]})
+    assert result.tolist() == [2.0, 4.0]
+    result = evaluateColumns(formula("n"), COLUMNS)
+    assert result.mask.tolist() == [False, True, False, True]
+    assert evaluateColumns(formula("nil"), COLUMNS).mask.all()
+
+    # Without columns the literals fill as many rows as asked for
+    assert evaluateColumns(formula("1 + 1"), {}).tolist() == [2.0]
+    assert evaluateColumns(formula("true"), {}, rows=3).tolist() == [True] * 3
+    assert evaluateColumns(formula("-1"), {}, rows=0).tolist() == []
+
+
+@pytest.mark.parametrize("source, row", [
+    ("n + 1", 1),
+    ("x + s", 0),
+    ("-s", 0),
+    ("-n", 1),
+    ("x > t", 0),
+    ("s - s", 0),
+    ("x < nil", 0),
+    ("-nil", 0),
+    ("t + \"!\"", 0),
+    ("m * 2", 2),
+    ("!b and n < 3", 1),
+    ("n or t - 1", 1),
+    # A row stops at its first error, and the earliest row is reported
+    ("-t + (x + s)", 0),
+    ("(x + s) + -t", 0),
+    ("(m - 1) + (n - 1)", 1),
+])
+def test_errors(source, row):
+    with pytest.raises(vectorized.RowError) as info:
+        evaluateColumns(formula(source), COLUMNS)
+    assert info.value.row == row
+
+    with pytest.raises(LoxRuntimeError) as expected:
+        interpret(source, list(rows())[row])
+    assert info.value.message == expected.value.message
+    assert str(info.value) == f"{info.value.message} [line 0, row {row}]"
+
+
+def test_no_rows_evaluated():
+    # Right sides that no row reaches can't fail
+    assert evaluateColumns(formula("false and -s"), COLUMNS).tolist() == \
+        [False] * 4
+    assert evaluateColumns(formula("true or s - 1"), COLUMNS).tolist() == \
+        [True] * 4
+    assert evaluateColumns(formula("\"a\" - 1"), {}, rows=0).tolist() == []
+
+
+def test_not_vectorizable():
+    for source in ("f(x)", "x = 1", "a.b", "a.b = 1", "this", "super.m"):
+        with pytest.raises(vectorized.VectorizeError, match="can't be vec"):
+            evaluateColumns(formula(source), COLUMNS)
+
+    with pytest.raises(vectorized.VectorizeError) as info:
+        evaluateColumns(formula("\n b or x"), COLUMNS)
+    assert str(info.value) == \
+        "'or' of bool and number values can't be vectorized [line 1]"
+
+    statement = Parser(list(Scanner.scanBuffer("print 1;"))).parseProgram()[0]
+    with pytest.raises(vectorized.VectorizeError, match="PrintStmt"):
+        evaluateColumns(statement, COLUMNS)
+
+
+def test_columns():
+    with pytest.raises(LoxRuntimeError, match="Undefined variable 'y'"):
+        evaluateColumns(formula("y + 1"), COLUMNS)
+    with pytest.raises(ValueError, match="column 'y' has 2 rows, expected 4"):
+        evaluateColumns(formula("x + y"), {**COLUMNS, "y": np.zeros(2)})
+    with pytest.raises(vectorized.VectorizeError,
+                       match="column 'y' mixes float, str values"):
+        evaluateColumns(formula("y"),
+                        {"y": np.array([1.0, "a", None], dtype=object)})
+
+    objects = {
+        "f": np.array([True, None], dtype=object),
+        "g": np.array([None, None], dtype=object),
+        "h": np.array([1, None], dtype=object),
+        "u": np.array([b"a", b"b"]),
+    }
+    assert evaluateColumns(formula("f == true"), objects).tolist() == \
+        [True, False]
+    assert evaluateColumns(formula("g == nil"), objects).tolist() == \
+        [True, True]
+    assert evaluateColumns(formula("h == 1"), objects).tolist() == \
+        [True, False]
+    assert evaluateColumns(formula("u + \"!\""), objects).tolist() == \
+        ["a!", "b!"]
@@ -0,0 +1,123 @@
+import io
+
+import pytest
+
+from pylox.diagnostics import Diagnostics
+from pylox.parser import BinaryOp, Constant, Expr, Logical, Nil, Parser, \
+    String, UnaryOp, Variable
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+from pylox.traverse import fold
+from pylox.visitor import Printer, Transformer, Visitor
+
+PROGRAM = """
+var a = "s";
+fun f(x, y) { return x + -y; }
+for (var i = 0; i < 3; i = i + 1) print f(i, a).b;
+if (a and nil) a.b = "c"; else { }
+if (a) {}
+class A < B { m() { super.m(); this.x; } }
+class C { n() { return; } }
+"""
+
+
+def program():
+    return Parser(list(Scanner.scanBuffer(PROGRAM)),
+                  diagnostics=Diagnostics()).parseProgram()
+
+
+def dump(statements):
+    out = io.StringIO()
+    for statement in statements:
+        statement.print(file=out)
+    return out.getvalue()
+
+
+class Evaluator(Visitor):
+    def visitBinaryOp(self, node, values):
+        return values[0] + values[1]
+
+    def visitUnaryOp(self, node, values):
+        return -values[0]
+
+    def visitExpr(self, node, values):
+        return node.value
+
+
+def test_dispatch():
+    tree = BinaryOp(Constant(2.0), TokenType.PLUS,
+                    UnaryOp(TokenType.MINUS, Constant(3.0)))
+    evaluator = Evaluator()
+    assert fold(tree, evaluator.visit) == -1.0
+
+    # Resolved once per node class, falling back to the nearest base class
+    assert Evaluator._dispatch == {
+        BinaryOp: Evaluator.visitBinaryOp,
+        UnaryOp: Evaluator.visitUnaryOp,
+        Constant: Evaluator.visitExpr,
+    }
+    assert Visitor._dispatch == {}
+    assert fold(Logical(Constant(1.0), TokenType.OR, Constant(2.0)),
+                evaluator.visit) == 3.0
+    assert Evaluator._dispatch[Logical] is Evaluator.visitBinaryOp
+
+    with pytest.raises(TypeError, match="Evaluator can't visit str"):
+        evaluator.visit("1", [])
+
+
+class Rename(Transformer):
+    """Prefixes every variable and string"""
+
+    def visitVariable(self, node):
+        return Variable(f"_{node._name}", node._symbol, node.line)
+
+    def visitString(self, node):
+        return String(f"_{node.value}")
+
+    def visitNil(self, node):
+        return Constant(0.0)
+
+
+def test_transform():
+    statements = program()
+    before = dump(statements)
+
+    # Copy on write, the original tree is left as it was
+    renamed = [Rename().transform(statement) for statement in statements]
+    assert dump(statements) == before
+    after = dump(renamed)
+    assert after == before.replace("Variable[", "Variable[_") \
+        .replace("String['", "String['_").replace("NIL[]", "Const[0.0]")
+
+    # Untouched subtrees are shared
+    assert renamed[1]._body[0] is not statements[1]._body[0]
+    assert renamed[4]._then is statements[4]._then
+    assert renamed[6] is statements[6]
+
+    # In place keeps the nodes, only their children change
+    in_place = [Rename(inplace=True).transform(statement)
+                for statement in statements]
+    assert all(new is old for new, old in zip(in_place, statements))
+    assert dump(statements) == after
+
+
+def test_transform_leaf():
+    assert isinstance(Rename().transform(Nil()), Constant)
+    node = UnaryOp(TokenType.MINUS, Constant(1.0))
+    assert Rename().transform(node) is node
+
+
+def test_printer():
+    tree = Logical(Variable("a", 0), TokenType.AND,
+                   UnaryOp(TokenType.EXCLAIMATION, Nil()))
+    assert list(Printer(indent=1).lines(tree, 1)) == [
+        " Logical[",
+        "  Variable[a]",
+        "  TokenType.AND",
+        "  Unary[",
+        "   TokenType.EXCLAIMATION",
+        "   NIL[]",
+        "  ]",
+        " ]",
+    ]
+    assert isinstance(tree, Expr)
@@ -0,0 +1,144 @@
+import math
+
+import pytest
+
+from pylox.bytecode import Chunk, OpCode, compileExprs, disassemble
+from pylox.evaluator import evaluate
+from pylox.optimizer import Optimizer
+from pylox.parser import Constant, Parser
+from pylox.runtime import LoxRuntimeError, stringify
+from pylox.scanner import Scanner
+from pylox.vm import VM
+
+filename = "/tmp/vm_test.lox"
+
+
+def parse(code):
+    with open(filename, "w") as f:
+        f.write(code)
+
+    return Parser(Scanner(filename).getTokens()).parse()
+
+
+def run(code):
+    nodes = parse(code)
+    values = VM().run(compileExprs(nodes))
+    assert [stringify(v) for v in values] == \
+        [stringify(evaluate(node)) for node in nodes]
+    return values
+
+
+def error(code):
+    with pytest.raises(LoxRuntimeError) as info:
+        run(code)
+    return str(info.value)
+
+
+def test_matches_evaluator():
+    values = run("""
+    1.4 + 2; 3.1465-4; 5.2 * 6; 7/8.1;
+    1==1;
+    2!=1==false;
+    "test"=="test";
+    1 - 2 - 3; - - 1; !nil; !!"a"; 1 == true; nil != nil;
+    1 < 2; 2 <= 1; 3 > 3; 3 >= 3; "a" + "b";
+    -1.2/4.4 + -2 - (3+5) * 6.5 * 7;
+    """)
+    assert len(values) == 19
+    assert values[-1] == -1.2 / 4.4 + -2 - (3 + 5) * 6.5 * 7
+
+
+def test_division_by_zero():
+    values = run("1 / 0; -1 / 0; 0 / 0;")
+    assert values[:2] == [math.inf, -math.inf]
+    assert math.isnan(values[2])
+
+
+def test_runtime_errors():
+    assert error('1;\n-"a";') == "Operand must be a number. [line 1]"
+    assert error('\n\n1 +\n"a";') == \
+        "Operands must be two numbers or two strings. [line 2]"
+    assert error('"a" + 1;') == \
+        "Operands must be two numbers or two strings. [line 0]"
+    for op in ("-", "*", "/", ">", ">=", "<", "<="):
+        assert error(f'1;\n\n1 {op} nil;') == \
+            "Operands must be numbers. [line 2]"
+
+
+def test_constant_pool():
+    chunk = compileExprs(parse('1 + 1 + 1; "a" + "a"; 2;'))
+    assert chunk.constants == [1.0, "a", 2.0]
+
+    # -0.0 == 0.0 but they are different constants
+    zero, = Optimizer().optimizeAll(parse("-0;"))
+    chunk = compileExprs([Constant(0.0), zero])
+    assert [repr(c) for c in chunk.constants] == ["0.0", "-0.0"]
+
+
+def test_long_constants():
+    code = " + ".join(str(i) for i in range(300)) + ";"
+    chunk = compileExprs(parse(code))
+    assert len(chunk.constants) == 300
+    assert OpCode.CONSTANT_LONG in chunk.code
+    assert VM().run(chunk) == [float(sum(range(300)))]
+
+
+def test_globals():
+    statements = Parser(list(Scanner.scanBuffer("a * b + -a;\n\nc;"))
+                        ).parseProgram()
+    nodes = [statement._expression for statement in statements]
+    chunk = compileExprs(nodes[:1])
+    assert chunk.constants == ["a", "b"]
+    assert VM().run(chunk, {"a": 2.0, "b": 3.0}) == [4.0]
+    assert VM().run(chunk, {"a": 1.0, "b": 3.0}) == [2.0]
+
+    with pytest.raises(LoxRuntimeError) as info:
+        VM().run(compileExprs(nodes))
+    assert str(info.value) == "Undefined variable 'a'. [line 0]"
+    with pytest.raises(LoxRuntimeError) as info:
+        VM().run(compileExprs(nodes), {"a": 2.0, "b": 3.0})
+    assert str(info.value) == "Undefined variable 'c'. [line 2]"
+
+
+def test_line_table():
+    chunk = compileExprs(parse("1 +\n2;\n\n\n3 * 4;\n"))
+    # One entry per run of instructions from the same line
+    assert list(chunk.line_numbers) == [0, 4]
+    assert [chunk.getLine(i) for i in range(len(chunk))] == \
+        [0] * 6 + [4] * 7
+
+
+def test_disassemble():
+    chunk = compileExprs(parse('1 + 2;\n!nil == true;\n-"a" != false;'))
+    assert disassemble(chunk) == [
+        "0000    0 CONSTANT            0 1.0",
+        "0002    | CONSTANT            1 2.0",
+        "0004    | ADD",
+        "0005    | RESULT",
+        "0006    1 NIL",
+        "0007    | NOT",
+        "0008    | TRUE",
+        "0009    | EQUAL",
+        "0010    | RESULT",
+        "0011    2 CONSTANT            2 'a'",
+        "0013    | NEGATE",
+        "0014    | FALSE",
+        "0015    | NOT_EQUAL",
+        "0016    | RESULT",
+        "0017    | RETURN",
+    ]
+
+    chunk = Chunk()
+    for i in range(257):
+        chunk.writeConstant(float(i), 3)
+    assert disassemble(chunk)[-1] == "0512    | CONSTANT_LONG     256 256.0"
+
+    chunk = compileExprs(
+        [s._expression for s in Parser(list(Scanner.scanBuffer("-a;")))
+         .parseProgram()])
+    assert disassemble(chunk) == [
+        "0000    0 GET_GLOBAL          0 'a'",
+        "0004    | NEGATE",
+        "0005    | RESULT",
+        "0006    | RETURN",
+    ]
@@ -0,0 +1,72 @@
+"""Measures memory and collector pauses for a large parsed program, held as
+Expr nodes and as an Arena.
+
+Usage: python -m tools.benchmarks.ast_memory [statements]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from pylox.arena import Arena
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+
+STATEMENT = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 ' \
+    '!= (true == false) + "test" + nil;'
+
+
+def retained(fn):
+    """Result of fn() and the bytes it keeps alive"""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, size
+
+
+def pause() -> float:
+    """Best of a few full collections, in milliseconds"""
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        gc.collect()
+        times.append(time.perf_counter() - start)
+
+    return min(times) * 1000
+
+
+def main(statements: int = 20000) -> None:
+    tokens = list(Scanner.scanText(STATEMENT)) * statements
+    nodes = Parser(tokens).parse()
+    count = len(Arena.fromExprs(nodes[:1])) * statements
+    del nodes
+
+    nodes, tree_size = retained(lambda: Parser(tokens).parse())
+    del tokens
+    tree_pause = pause()
+
+    start = time.perf_counter()
+    Arena.fromExprs(nodes)
+    to_arena = time.perf_counter() - start
+
+    arena, arena_size = retained(lambda: Arena.fromExprs(nodes))
+    del nodes
+
+    start = time.perf_counter()
+    arena.toExprs()
+    to_tree = time.perf_counter() - start
+    arena_pause = pause()
+
+    print(f"nodes: {count}")
+    print(f"Expr tree: {tree_size / count:6.1f} bytes/node "
+          f"full gc {tree_pause:7.2f}ms")
+    print(f"Arena:     {arena_size / count:6.1f} bytes/node "
+          f"full gc {arena_pause:7.2f}ms")
+    print(f"tree -> arena {to_arena:.3f}s, arena -> tree {to_tree:.3f}s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
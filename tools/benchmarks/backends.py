@@ -0,0 +1,85 @@
+"""Compares every way of executing Lox expressions.
+
+Arithmetic and comparison heavy programs are compiled once and run
+`runs` times by the tree walker, compiled closures, the bytecode VM and
+transpiled Python code objects. Operands are global variables read while
+the program runs, with literals CPython would fold the transpiled
+arithmetic away while compiling and the comparison would measure nothing.
+
+Usage: python -m tools.benchmarks.backends [repeat] [runs]
+"""
+import gc
+import sys
+import time
+
+from pylox.bytecode import compileExprs
+from pylox.evaluator import compileExpr, evaluate
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from pylox.transpiler import compileProgram, run
+from pylox.vm import VM
+
+WORKLOADS = {
+    "arithmetic": "-a/b + -c - (d+e) * f * g / c + h * (i - j);",
+    "comparison": "a < b == (c >= d) != !(e <= f) == (g > h != (i == i));",
+}
+
+GLOBALS = {
+    "arithmetic": {"a": 1.2, "b": 4.4, "c": 2.0, "d": 3.0, "e": 5.0,
+                   "f": 6.5, "g": 7.0, "h": 1.5, "i": 4.0, "j": 2.25},
+    "comparison": {name: float(value)
+                   for value, name in enumerate("abcdefghi", 1)},
+}
+
+
+def parse(code: str, repeat: int):
+    statements = Parser(list(Scanner.scanBuffer(code * repeat))).parseProgram()
+    return [statement._expression for statement in statements]
+
+
+def backends(nodes, globals):
+    """(name, compile, execute) for each backend"""
+    vm = VM()
+    return [
+        ("walker", lambda: nodes,
+         lambda nodes: [evaluate(node, globals) for node in nodes]),
+        ("closures", lambda: [compileExpr(node, globals) for node in nodes],
+         lambda compiled: [fn() for fn in compiled]),
+        ("vm", lambda: compileExprs(nodes),
+         lambda chunk: vm.run(chunk, globals)),
+        ("python", lambda: compileProgram(nodes),
+         lambda code: run(code, globals)),
+    ]
+
+
+def main(repeat: int = 1000, runs: int = 20) -> None:
+    for workload, code in WORKLOADS.items():
+        nodes = parse(code, repeat)
+        print(f"{workload} ({len(nodes)} statements x {runs} runs)")
+
+        results = {}
+        expected = None
+        for name, compile, execute in backends(nodes, GLOBALS[workload]):
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            program = compile()
+            compiled = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(runs):
+                values = execute(program)
+            elapsed = time.perf_counter() - start
+            gc.enable()
+
+            expected = expected or values
+            assert values == expected
+            results[name] = elapsed
+            print(f"{name:>10}: {len(nodes) * runs / elapsed:12,.0f} "
+                  f"statements/s, compile {compiled:6.3f}s")
+
+        for name, elapsed in results.items():
+            print(f"{name:>10}: {results['walker'] / elapsed:6.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,51 @@
+"""Compares scanning and parsing a file with loading it from the cache.
+
+Usage: python -m tools.benchmarks.cache [lines]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from pylox.cache import Cache
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+
+LINE = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 ' \
+    '!= (true == false) + "test" + nil;\n'
+
+
+def timed(fn):
+    # Collections triggered by the growing AST would dominate otherwise
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return result, elapsed
+
+
+def main(lines: int = 20000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.lox")
+        with open(path, "w") as f:
+            f.write(LINE * lines)
+
+        cache = Cache(os.path.join(directory, "__loxcache__"))
+        nodes, uncached = timed(
+            lambda: Parser(Scanner(path).getTokens()).parse())
+        _, cold = timed(lambda: cache.load(path))
+        (_, cached_nodes), warm = timed(lambda: cache.load(path))
+        assert len(cached_nodes) == len(nodes)
+
+        entry, = os.listdir(cache.directory)
+        size = os.path.getsize(os.path.join(cache.directory, entry))
+        print(f"{'uncached':>10}: {uncached:6.3f}s")
+        print(f"{'cold':>10}: {cold:6.3f}s (entry {size / 1024:,.0f} KiB)")
+        print(f"{'warm':>10}: {warm:6.3f}s {uncached / warm:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""Measures how `python -m pylox check` scales with worker processes.
+
+Generates a synthetic corpus of .lox files, some with syntax errors, and
+checks it with 1, 2, 4, ... up to the CPU count workers.
+
+Usage: python -m tools.benchmarks.check [files] [lines]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from pylox.check import checkFiles, findSources
+
+LINES = [
+    '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 '
+    '!= (true == false) + "test" + nil;\n',
+    '1 - 2 - 3; 1 / 2 * 3 < 4 <= 5 > 6 >= 7 == 8 != 9; - - !1;\n',
+    '"a" + "b" == "ab"; nil == false; (1 + 2) * 3;\n',
+]
+ERROR = '(1 + ;\n'
+
+
+def corpus(directory: str, files: int, lines: int) -> None:
+    rng = random.Random(0)
+    for index in range(files):
+        folder = os.path.join(directory, f"pkg{index % 16}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file{index}.lox"), "w") as f:
+            for _ in range(lines):
+                f.write(ERROR if rng.random() < 0.001 else rng.choice(LINES))
+
+
+def main(files: int = 2000, lines: int = 50) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        corpus(directory, files, lines)
+        paths = findSources([directory])
+
+        jobs = [1]
+        while jobs[-1] * 2 <= (os.cpu_count() or 1):
+            jobs.append(jobs[-1] * 2)
+
+        baseline = None
+        for count in jobs:
+            start = time.perf_counter()
+            reports = checkFiles(paths, count)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+
+            errors = sum(len(report.diagnostics) for report in reports)
+            print(f"{count:3} jobs: {len(paths) / elapsed:8,.0f} files/s "
+                  f"{elapsed:6.3f}s {baseline / elapsed:5.2f}x "
+                  f"({errors} errors)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,144 @@
+"""Deterministic synthetic Lox sources for benchmarking.
+
+Every generator builds a pool of random lines from a seeded generator and
+samples it until the requested size is reached, so any size from a few
+bytes to hundreds of megabytes is quick to produce and identical between
+runs.
+
+Usage: python -m tools.benchmarks.corpus <kind> <size> <path>
+"""
+import random
+import sys
+
+from typing import Callable, Dict
+
+# Distinct lines generated per corpus, sampled to fill the requested size
+POOL_SIZE = 1000
+
+BINARY = ["+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!="]
+WORDS = ["alpha", "beta", "gamma", "delta", "lox", "tree", "walk", "hello"]
+
+
+def number(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return str(rng.randint(0, 1000))
+    return f"{rng.randint(0, 100)}.{rng.randint(0, 99)}"
+
+
+def operand(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.7:
+        return number(rng)
+    elif roll < 0.8:
+        return rng.choice(["true", "false", "nil"])
+    elif roll < 0.9:
+        return f'"{rng.choice(WORDS)}"'
+    return f"-{number(rng)}"
+
+
+def operators(rng: random.Random) -> str:
+    """Long flat expressions, mostly binary operators between literals"""
+    terms = [operand(rng) for _ in range(rng.randint(4, 16))]
+    text = terms[0]
+    for term in terms[1:]:
+        if rng.random() < 0.2:
+            text = f"({text})"
+        text += f" {rng.choice(BINARY)} {term}"
+    return f"{'!' if rng.random() < 0.1 else ''}{text};\n"
+
+
+def strings(rng: random.Random) -> str:
+    """String literals of varied length joined with +"""
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        parts.append(f'"{words}"')
+    return " + ".join(parts) + ";\n"
+
+
+def nesting(rng: random.Random) -> str:
+    """Deeply parenthesized and negated expressions"""
+    depth = rng.randint(10, 40)
+    text = number(rng)
+    for _ in range(depth):
+        roll = rng.random()
+        if roll < 0.5:
+            text = f"({text} {rng.choice(BINARY[:4])} {number(rng)})"
+        elif roll < 0.8:
+            text = f"({text})"
+        else:
+            text = f"-{text}"
+    return text + ";\n"
+
+
+def classes(rng: random.Random) -> str:
+    """Class declarations in the style of testing/src/class.lox"""
+    name = f"{rng.choice(WORDS).capitalize()}{rng.randint(0, 999)}"
+    base = f" < {rng.choice(WORDS).capitalize()}" if rng.random() < 0.5 else ""
+    a, b = rng.sample(WORDS, 2)
+    return (
+        f"class {name}{base}\n"
+        "{\n"
+        f"    init({a})\n"
+        "    {\n"
+        f"        this.{a} = {a};\n"
+        f"        this.count = {number(rng)};\n"
+        "    }\n"
+        "\n"
+        f"    {b}({a}, other)\n"
+        "    {\n"
+        f"        if ({a} > other)\n"
+        "        {\n"
+        f"            return {a} - other * {number(rng)};\n"
+        "        }\n"
+        "        else\n"
+        "        {\n"
+        f'            return "{b} " + {a} + "\\n";\n'
+        "        }\n"
+        "    }\n"
+        "};\n"
+        "\n"
+    )
+
+
+GENERATORS: Dict[str, Callable[[random.Random], str]] = {
+    "operators": operators,
+    "strings": strings,
+    "nesting": nesting,
+    "classes": classes,
+}
+
+SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parseSize(text: str) -> int:
+    """'1K', '10M' or a plain number of bytes"""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def generate(kind: str, size: int, seed: int = 0) -> str:
+    """About `size` bytes of source, never cutting a line in half"""
+    rng = random.Random(seed)
+    pool = [GENERATORS[kind](rng) for _ in range(POOL_SIZE)]
+
+    lines = []
+    total = 0
+    choice = rng.choice
+    while total < size:
+        line = choice(pool)
+        lines.append(line)
+        total += len(line)
+
+    return "".join(lines)
+
+
+def write(kind: str, size: int, path: str, seed: int = 0) -> None:
+    with open(path, "w") as f:
+        f.write(generate(kind, size, seed))
+
+
+if __name__ == "__main__":
+    write(sys.argv[1], parseSize(sys.argv[2]), sys.argv[3])
@@ -0,0 +1,72 @@
+"""Times the explicit stack parser and traversals on deeply nested input.
+
+Time per level should stay flat as the depth grows. Printing is only timed
+up to PRINT_LIMIT levels since the indented output itself grows with the
+square of the depth.
+
+Usage: python -m tools.benchmarks.deep_nesting [max_depth]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from pylox.parser import Parser, ParseEngine
+from pylox.token import Token, TokenType
+from pylox.traverse import depth, walk
+
+PRINT_LIMIT = 10000
+
+
+def groups(n: int):
+    """((((1))))"""
+    return [Token(TokenType.LEFT_PAREN, "(", 0)] * n \
+        + [Token(TokenType.NUMBER, "1", 0)] \
+        + [Token(TokenType.RIGHT_PAREN, ")", 0)] * n
+
+
+def negations(n: int):
+    """- - - - 1"""
+    return [Token(TokenType.MINUS, "-", 0)] * n \
+        + [Token(TokenType.NUMBER, "1", 0)]
+
+
+def sums(n: int):
+    """1 + (1 + (1 + 1))"""
+    one = Token(TokenType.NUMBER, "1", 0)
+    plus = Token(TokenType.PLUS, "+", 0)
+    return [one, plus, Token(TokenType.LEFT_PAREN, "(", 0)] * n + [one] \
+        + [Token(TokenType.RIGHT_PAREN, ")", 0)] * n
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(max_depth: int = 100000) -> None:
+    print(f"{'input':>10} {'depth':>8} {'parse us/lvl':>13} "
+          f"{'print us/lvl':>13} {'walk us/lvl':>12}")
+
+    for generate in (groups, negations, sums):
+        n = 1000
+        while n <= max_depth:
+            tokens = generate(n) + [Token(TokenType.EOF, "", 0)]
+            nodes, parse = timed(
+                lambda: Parser(tokens, engine=ParseEngine.ITERATIVE).parse())
+            output = float("nan")
+            if n <= PRINT_LIMIT:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    _, output = timed(lambda: nodes[0].print())
+            height, traverse = timed(
+                lambda: (sum(1 for _ in walk(nodes[0])), depth(nodes[0])))
+
+            print(f"{generate.__name__:>10} {height[1]:>8} "
+                  f"{parse / n * 1e6:13.2f} {output / n * 1e6:13.2f} "
+                  f"{traverse / n * 1e6:12.2f}")
+            n *= 10
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,175 @@
+"""Slot indexed frames vs a chain of dicts for variable heavy programs.
+
+The chain version is the interpreter without the resolver: every block and
+call gets a dict of its own linked to the enclosing one, and every variable
+is looked up by name from the innermost dict outwards. Everything but the
+variables and scopes is compiled by the same Compiler, so the difference is
+down to the environments alone.
+
+Usage: python -m tools.benchmarks.environments [scale]
+"""
+import gc
+import io
+import sys
+import time
+
+from pylox.interpreter import Code, Compiler, Interpreter, LoxFunction, \
+    sequence
+from pylox.parser import Parser
+from pylox.resolver import Resolution, resolve
+from pylox.runtime import LoxRuntimeError
+from pylox.scanner import Scanner
+
+PROGRAMS = {
+    "fib": """
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(SCALE + 16);
+""",
+    "loops": """
+fun loops(n) {
+    var total = 0;
+    for (var i = 0; i < n; i = i + 1) {
+        for (var j = 0; j < n; j = j + 1) {
+            var product = i * j;
+            total = total + product;
+        }
+    }
+    return total;
+}
+print loops(SCALE * 100);
+""",
+    "closures": """
+fun counter() {
+    var count = 0;
+    fun increment() {
+        count = count + 1;
+        return count;
+    }
+    return increment;
+}
+var next = counter();
+for (var i = 0; i < SCALE * 20000; i = i + 1) next();
+print next();
+""",
+}
+
+
+class Environment:
+    __slots__ = ("values", "enclosing")
+
+    def __init__(self, enclosing: "Environment" = None) -> None:
+        self.values = {}
+        self.enclosing = enclosing
+
+
+class ChainFunction(LoxFunction):
+    """Closes over the whole environment it was declared in"""
+    __slots__ = ("params",)
+
+    def call(self, arguments: list, line: int):
+        if len(arguments) != self.code.arity:
+            raise LoxRuntimeError("Wrong number of arguments.", line)
+        environment = Environment(self.free)
+        environment.values.update(zip(self.params, arguments))
+        result = self.code.body(environment, None)
+        return None if result is None else result[0]
+
+
+class ChainCompiler(Compiler):
+    """Compiled code takes the innermost Environment instead of a frame"""
+
+    def visitVariable(self, node):
+        name = node._name
+        line = node.line
+
+        def get(environment, _):
+            while environment is not None:
+                values = environment.values
+                if name in values:
+                    return values[name]
+                environment = environment.enclosing
+            raise LoxRuntimeError(f"Undefined variable '{name}'.", line)
+        return get
+
+    def visitAssign(self, node):
+        name = node._name
+        value = self.visit(node._value)
+        line = node.line
+
+        def assign(environment, _):
+            result = value(environment, _)
+            while environment is not None:
+                values = environment.values
+                if name in values:
+                    values[name] = result
+                    return result
+                environment = environment.enclosing
+            raise LoxRuntimeError(f"Undefined variable '{name}'.", line)
+        return assign
+
+    def visitVarStmt(self, node):
+        name = node._name
+        initializer = self.visit(node._initializer) \
+            if node._initializer is not None else lambda environment, _: None
+
+        def declare(environment, _):
+            environment.values[name] = initializer(environment, _)
+        return declare
+
+    def visitBlockStmt(self, node):
+        body = sequence([self.visit(statement)
+                         for statement in node._statements])
+        return lambda environment, _: body(Environment(environment), _)
+
+    def visitFunctionStmt(self, node):
+        name = node._name
+        params = node._params
+        code = Code(name, len(params), self.compile(node.body), 0, (), 0,
+                    False)
+
+        def declare(environment, _):
+            function = ChainFunction(code, environment)
+            function.params = params
+            environment.values[name] = function
+        return declare
+
+
+def run(source: str, chain: bool) -> str:
+    statements = Parser(list(Scanner.scanBuffer(source))).parseProgram()
+    out = io.StringIO()
+    if chain:
+        root = Environment()
+        ChainCompiler(Resolution(), {}, out).compile(statements)(root, None)
+    else:
+        Interpreter(out).run(statements, resolve(statements))
+    return out.getvalue()
+
+
+def timed(fn, repeat: int = 3):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        gc.enable()
+    return result, min(times)
+
+
+def main(scale: int = 8) -> None:
+    print(f"{'program':>10} {'dict chain':>12} {'slots':>12} {'speedup':>8}")
+    for name, source in PROGRAMS.items():
+        source = source.replace("SCALE", str(scale))
+        chain, chain_time = timed(lambda: run(source, True))
+        slots, slots_time = timed(lambda: run(source, False))
+        assert chain == slots
+        print(f"{name:>10} {chain_time:11.3f}s {slots_time:11.3f}s "
+              f"{chain_time / slots_time:7.2f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,62 @@
+"""Compares the tree walking evaluator with compiled closures.
+
+Every expression is evaluated `repeat` times, the way a loop body would be.
+The compiled numbers include the one-off cost of compiling.
+
+Usage: python -m tools.benchmarks.evaluators [repeat]
+"""
+import gc
+import sys
+import time
+
+from pylox.evaluator import compileExpr, evaluate
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from pylox.token import Token, TokenType
+
+EXPRESSIONS = [
+    '-1.2/4.4 + -2 - (3+5) * 6.5 * 7 >= 10.0 == !(1 != 2);',
+    '"a" + "b" + "c" + "d" == "abcd";',
+    '!(5 > -1.2/4.4 + -2 - (3+5) * 6.5 * 7) == (nil == false);',
+]
+
+
+def walk(nodes, repeat: int):
+    for node in nodes:
+        for _ in range(repeat):
+            evaluate(node)
+
+
+def compiled(nodes, repeat: int):
+    for node in nodes:
+        run = compileExpr(node)
+        for _ in range(repeat):
+            run()
+
+
+def main(repeat: int = 20000) -> None:
+    tokens = [token for code in EXPRESSIONS for token in Scanner.scanText(code)]
+    nodes = Parser(tokens + [Token(TokenType.EOF, "", 0)]).parse()
+    results = {}
+
+    for name, evaluator in (("walker", walk), ("compiled", compiled)):
+        best = None
+        for _ in range(3):
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            evaluator(nodes, repeat)
+            elapsed = time.perf_counter() - start
+            gc.enable()
+            best = elapsed if best is None else min(best, elapsed)
+
+        results[name] = best
+        evaluations = len(nodes) * repeat
+        print(f"{name:>10}: {evaluations / best:12,.0f} evaluations/s "
+              f"{best:6.3f}s")
+
+    print(f"{'speedup':>10}: {results['walker'] / results['compiled']:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
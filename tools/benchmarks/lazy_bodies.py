@@ -0,0 +1,65 @@
+"""Eager vs lazy parsing of a large library where few functions are called.
+
+Parses the `classes` corpus both ways, then forces the bodies of a small
+fraction of the methods, the way a program touching a few entry points of
+a big library would. Reports parse time and the tracemalloc peak of each.
+
+Usage: python -m tools.benchmarks.lazy_bodies [size] [fraction used]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from pylox.diagnostics import Diagnostics
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from tools.benchmarks.corpus import generate, parseSize
+
+
+def parse(tokens, lazy: bool, fraction: float):
+    program = Parser(tokens, diagnostics=Diagnostics(),
+                     lazy=lazy).parseProgram()
+    methods = [method for cls in program for method in cls._methods]
+    step = max(1, round(1 / fraction)) if fraction else len(methods) + 1
+    for method in methods[::step]:
+        method.body
+    return program
+
+
+def best(fn, repeat: int = 3):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        gc.enable()
+    return result, min(times)
+
+
+def peak(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main(size: str = "4M", fraction: str = "0.05") -> None:
+    fraction = float(fraction)
+    tokens = Scanner.scanBuffer(generate("classes", parseSize(size)))
+    print(f"{len(tokens):,} tokens, {fraction:.0%} of the methods used")
+
+    for lazy in (False, True):
+        _, elapsed = best(lambda: parse(tokens, lazy, fraction))
+        memory = peak(lambda: parse(tokens, lazy, fraction))
+        print(f"{'lazy' if lazy else 'eager':>6}: {elapsed:8.3f}s "
+              f"{memory / (1 << 20):8.1f}MB")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,71 @@
+"""Compares loading a precompiled program from pickle and from .loxc.
+
+Pickle has to rebuild the whole object graph on load, the .loxc reader
+maps the file and only decodes the trees that are accessed.
+
+Usage: python -m tools.benchmarks.loxc [lines]
+"""
+import gc
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from pylox.loxc import LoxcReader, writeLoxc
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+
+LINE = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 ' \
+    '!= (true == false) + "test" + nil;\n'
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return result, elapsed
+
+
+def unpickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def main(lines: int = 20000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "bench.lox")
+        with open(source, "w") as f:
+            f.write(LINE * lines)
+        nodes = Parser(Scanner(source).getTokens()).parse()
+
+        pickled = os.path.join(directory, "bench.pickle")
+        loxc = os.path.join(directory, "bench.loxc")
+        # Pickle recurses through the tree, deep expressions need headroom
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+        _, pickle_write = timed(lambda: pickle.dump(
+            nodes, open(pickled, "wb"), pickle.HIGHEST_PROTOCOL))
+        _, loxc_write = timed(lambda: writeLoxc(loxc, nodes))
+
+        loaded, pickle_load = timed(lambda: unpickle(pickled))
+        assert len(loaded) == len(nodes)
+
+        reader, loxc_open = timed(lambda: LoxcReader(loxc))
+        _, loxc_one = timed(lambda: reader[len(reader) // 2])
+        _, loxc_all = timed(lambda: list(reader))
+        reader.close()
+
+        print(f"{'':>8} {'size':>10} {'write':>8} {'load all':>9} "
+              f"{'open':>8} {'1 tree':>8}")
+        print(f"{'pickle':>8} {os.path.getsize(pickled) / 1024:8,.0f}KB "
+              f"{pickle_write:7.3f}s {pickle_load:8.3f}s")
+        print(f"{'loxc':>8} {os.path.getsize(loxc) / 1024:8,.0f}KB "
+              f"{loxc_write:7.3f}s {loxc_open + loxc_one + loxc_all:8.3f}s "
+              f"{loxc_open * 1000:6.3f}ms {loxc_one * 1000:6.3f}ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
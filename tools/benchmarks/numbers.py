@@ -0,0 +1,59 @@
+"""Token count, scan and parse time of a number heavy source.
+
+Usage: python -m tools.benchmarks.numbers [lines]
+"""
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+
+
+def literal(rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return str(rng.randint(0, 1000))
+    return f"{rng.randint(0, 1000)}.{rng.randint(0, 9999)}"
+
+
+def source(lines: int) -> str:
+    rng = random.Random(0)
+    return "".join(
+        " + ".join(literal(rng) for _ in range(10)) + ";\n"
+        for _ in range(lines))
+
+
+def best(fn, repeat: int = 5):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        gc.enable()
+    return result, min(times)
+
+
+def main(lines: int = 20000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "numbers.lox")
+        with open(path, "w") as f:
+            f.write(source(lines))
+
+        tokens, scan = best(lambda: Scanner(path).getTokens())
+        nodes, parse = best(lambda: Parser(tokens).parse())
+
+    numbers = sum(1 for token in tokens if token.type == TokenType.NUMBER)
+    print(f"tokens:  {len(tokens):10,} ({numbers:,} NUMBER)")
+    print(f"scan:    {scan:10.3f}s")
+    print(f"parse:   {parse:10.3f}s")
+    print(f"total:   {scan + parse:10.3f}s for {len(nodes):,} statements")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,43 @@
+"""Compares serial and parallel scanning of one large file.
+
+Usage: python -m tools.benchmarks.parallel_scan [lines]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pylox.scanner import Scanner
+
+LINE = 'var total = "label" + (alpha * beta) / 5 - 12 >= gamma != delta;\n'
+
+
+def main(lines: int = 200000) -> None:
+    with tempfile.NamedTemporaryFile("w", suffix=".lox", delete=False) as f:
+        f.write(LINE * lines)
+        path = f.name
+
+    try:
+        scanner = Scanner(path)
+        start = time.perf_counter()
+        expected = scanner.getTokenBuffer()
+        serial = time.perf_counter() - start
+        print(f"{'serial':>10}: {len(expected) / serial:12,.0f} tokens/s "
+              f"{serial:6.3f}s")
+
+        jobs = 2
+        while jobs <= max(os.cpu_count() or 1, 2):
+            start = time.perf_counter()
+            buffer = scanner.getTokenBufferParallel(jobs)
+            elapsed = time.perf_counter() - start
+            assert buffer.types == expected.types
+            assert buffer.lines == expected.lines
+            print(f"{jobs:>5} jobs: {len(buffer) / elapsed:12,.0f} tokens/s "
+                  f"{elapsed:6.3f}s {serial / elapsed:5.2f}x")
+            jobs *= 2
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,52 @@
+"""Compares parse throughput of the expression engines on operator heavy code.
+
+Usage: python -m tools.benchmarks.parse_engines [repeat]
+"""
+import gc
+import sys
+import time
+
+from pylox.parser import Parser, ParseEngine
+from pylox.token import Token, TokenType
+
+EXPRESSION = '!(5 > (-1.2/4.4 + -2 - (3+5) * 6.5 * 7) >= 10.0) == 1 ' \
+    '!= (true == false) + "test" + nil;'
+
+
+def tokenize(repeat: int):
+    """Tokens for the expression repeated, tokenized once up front so only
+    parsing is timed"""
+    from pylox.scanner import Scanner
+    tokens = list(Scanner.scanText(EXPRESSION))
+    return tokens * repeat + [Token(TokenType.EOF, "", 0)]
+
+
+def main(repeat: int = 5000) -> None:
+    tokens = tokenize(repeat)
+    results = {}
+
+    for engine in ParseEngine:
+        best = None
+        for _ in range(3):
+            # Like timeit, keep the collector out of the numbers. Collections
+            # triggered by the growing AST cost the same for every engine.
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            nodes = Parser(tokens, engine=engine).parse()
+            elapsed = time.perf_counter() - start
+            gc.enable()
+            best = elapsed if best is None else min(best, elapsed)
+
+        assert len(nodes) == repeat
+        results[engine] = best
+        print(f"{engine.value:>10}: {len(tokens) / best:12,.0f} tokens/s "
+              f"{best:6.3f}s")
+
+    baseline = results[ParseEngine.RECURSIVE]
+    for engine, elapsed in results.items():
+        print(f"{engine.value:>10}: {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""Latency of one check request, cold CLI runs vs the pylox server.
+
+Each run checks the same file:
+- cli: `python -m pylox check`, a fresh process importing everything.
+- local: `python -m pylox.client --local`, the thin client's fallback.
+- client: `python -m pylox.client` against a running server, a fresh
+  process that only forwards the request.
+- socket: the same request sent from this process on a new connection, the
+  server's share of the client's latency.
+
+The server is started once before and shut down after. It has parsed the
+file after the first request, so the warm rows include its AST cache.
+
+Usage: python -m tools.benchmarks.server [runs] [size]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pylox.client import request
+from tools.benchmarks.corpus import generate, parseSize
+
+
+def latencies(fn, runs: int) -> list:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def command(*argv: str):
+    def run():
+        subprocess.run([sys.executable, "-m", *argv], check=True,
+                       stdout=subprocess.DEVNULL)
+    return run
+
+
+def main(runs: int = 20, size: str = "64k") -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "bench.lox")
+        with open(source, "w") as f:
+            f.write(generate("classes", parseSize(size)))
+        socket = os.path.join(directory, "pylox.sock")
+
+        server = subprocess.Popen([sys.executable, "-m", "pylox", "serve",
+                                   "--socket", socket])
+        message = {"command": "check", "paths": [source], "format": "human"}
+        try:
+            while request(message, socket) is None:
+                time.sleep(0.01)
+
+            cases = {
+                "cli": command("pylox", "check", "-j", "1", source),
+                "local": command("pylox.client", "--socket", socket,
+                                 "--local", "check", source),
+                "client": command("pylox.client", "--socket", socket,
+                                  "check", source),
+                "socket": lambda: request(message, socket),
+            }
+            print(f"{'mode':>8} {'median':>10} {'p90':>10}")
+            for name, fn in cases.items():
+                times = latencies(fn, runs)
+                p90 = statistics.quantiles(times, n=10)[-1]
+                print(f"{name:>8} {statistics.median(times) * 1000:8.2f}ms "
+                      f"{p90 * 1000:8.2f}ms")
+        finally:
+            request({"command": "shutdown"}, socket)
+            server.wait()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20, *args[1:])
@@ -0,0 +1,189 @@
+"""Scanner and parser throughput over synthetic corpora, with baselines.
+
+`run` measures every corpus kind at every size: tokens/s for scanning,
+nodes/s for parsing, and the tracemalloc peak of doing both. Results are
+printed as a table and can be saved as a JSON baseline. Throughput that
+drops as the size grows shows up in the "scaling" column, the throughput
+relative to the smallest size of the same corpus.
+
+`compare` diffs two saved runs and exits with status 1 if any throughput
+dropped, or peak memory grew, by more than the threshold.
+
+Usage:
+    python -m tools.benchmarks.suite run [--sizes 1K,100K,1M]
+        [--corpus operators,strings] [--repeat 3] [--output base.json]
+    python -m tools.benchmarks.suite compare base.json new.json
+        [--threshold 0.1]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from typing import Dict, List
+
+from pylox import __version__
+from pylox.diagnostics import Diagnostics
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from pylox.traverse import walk
+from tools.benchmarks.corpus import GENERATORS, parseSize, write
+
+DEFAULT_SIZES = "1K,10K,100K,1M"
+
+# Metric name and whether bigger is better
+METRICS = {
+    "tokens_per_s": True,
+    "nodes_per_s": True,
+    "peak_bytes": False,
+}
+
+
+def best(fn, repeat: int):
+    """Result and fastest time of fn() with the collector off"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        gc.enable()
+
+    return result, min(times)
+
+
+def measure(kind: str, size: int, path: str, repeat: int) -> Dict:
+    write(kind, size, path)
+    tokens, scan = best(lambda: Scanner(path).getTokens(), repeat)
+    nodes, parse = best(
+        lambda: Parser(tokens, path,
+                       diagnostics=Diagnostics()).parseProgram(),
+        repeat)
+    token_count = len(tokens)
+    node_count = sum(1 for node in nodes for _ in walk(node))
+
+    # Measured apart from the timings since tracing slows everything down
+    del tokens, nodes
+    gc.collect()
+    diagnostics = Diagnostics()
+    tracemalloc.start()
+    Parser(Scanner(path).getTokens(), path,
+           diagnostics=diagnostics).parseProgram()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "corpus": kind,
+        "size": os.path.getsize(path),
+        "tokens": token_count,
+        "nodes": node_count,
+        "errors": len(diagnostics),
+        "scan_s": scan,
+        "parse_s": parse,
+        "tokens_per_s": token_count / scan,
+        "nodes_per_s": node_count / parse,
+        "peak_bytes": peak,
+    }
+
+
+def run(args: argparse.Namespace) -> int:
+    kinds = args.corpus.split(",")
+    sizes = [parseSize(size) for size in args.sizes.split(",")]
+    results = []
+
+    print(f"{'corpus':>10} {'bytes':>12} {'tokens/s':>12} {'nodes/s':>12} "
+          f"{'peak':>10} {'scaling':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in kinds:
+            first = None
+            for size in sizes:
+                path = os.path.join(directory, f"{kind}.lox")
+                result = measure(kind, size, path, args.repeat)
+                results.append(result)
+                first = first or result
+                scaling = result["tokens_per_s"] / first["tokens_per_s"]
+                print(f"{kind:>10} {result['size']:12,} "
+                      f"{result['tokens_per_s']:12,.0f} "
+                      f"{result['nodes_per_s']:12,.0f} "
+                      f"{result['peak_bytes'] / (1 << 20):8.1f}MB "
+                      f"{scaling:7.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "pylox": __version__,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    previous = {(r["corpus"], r["size"]): r for r in baseline["results"]}
+    regressions = 0
+    for result in current["results"]:
+        old = previous.get((result["corpus"], result["size"]))
+        if old is None:
+            continue
+
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            if not old[metric]:
+                # Nothing to compare against, e.g. no nodes parsed
+                continue
+            change = result[metric] / old[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > args.threshold:
+                flag = " REGRESSION"
+                regressions += 1
+            changes.append(f"{metric} {change:+7.1%}{flag}")
+
+        print(f"{result['corpus']:>10} {result['size']:12,}: "
+              + ", ".join(changes))
+
+    print(f"{regressions} regressions over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="tools.benchmarks.suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runner = commands.add_parser("run", help="measure and print results")
+    runner.add_argument("--corpus", default=",".join(GENERATORS),
+                        help="comma separated corpus kinds")
+    runner.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma separated sizes like 1K,10M")
+    runner.add_argument("--repeat", type=int, default=3,
+                        help="timed runs per measurement, the best is kept")
+    runner.add_argument("--output", help="save the results as JSON")
+    runner.set_defaults(run=run)
+
+    comparer = commands.add_parser(
+        "compare", help="flag regressions between two saved runs")
+    comparer.add_argument("baseline")
+    comparer.add_argument("current")
+    comparer.add_argument("--threshold", type=float, default=0.1,
+                          help="allowed relative slowdown, 0.1 is 10%%")
+    comparer.set_defaults(run=compare)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Compares memory per token of Scanner.getTokens() and getTokenBuffer().
+
+Usage: python -m tools.benchmarks.token_memory [lines]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pylox.scanner import Scanner
+
+LINE = 'var total = "label" + (alpha * beta) / 5 - 12 >= gamma != delta;\n'
+
+
+def measure(fn):
+    """Returns the result, retained bytes and untraced wall time of fn()"""
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, size, elapsed
+
+
+def main(lines: int = 20000) -> None:
+    with tempfile.NamedTemporaryFile("w", suffix=".lox", delete=False) as f:
+        f.write(LINE * lines)
+        path = f.name
+
+    try:
+        # The source text itself is shared by both representations, so it is
+        # read before tracing starts and excluded from the buffer numbers
+        with open(path) as f:
+            source_size = sys.getsizeof(f.read())
+
+        tokens, token_size, token_time = measure(
+            lambda: Scanner(path).getTokens())
+        buffer, buffer_size, buffer_time = measure(
+            lambda: Scanner(path).getTokenBuffer())
+        buffer_size -= source_size
+    finally:
+        os.remove(path)
+
+    count = len(tokens)
+    print(f"tokens: {count}")
+    print(f"Token list:  {token_size / count:8.1f} bytes/token "
+          f"{token_time:6.3f}s")
+    print(f"TokenBuffer: {buffer_size / count:8.1f} bytes/token "
+          f"{buffer_time:6.3f}s")
+    print(f"reduction:   {token_size / buffer_size:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
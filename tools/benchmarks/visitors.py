@@ -0,0 +1,83 @@
+"""Visitor dispatch and tree printing over a million node tree.
+
+Compares looking up the visit method by name for every node, the way a
+plain getattr based visitor does, with the cached per class dispatch of
+pylox.visitor.Visitor. Both count nodes in a traverse.fold over the same
+tree, a bare walk shows the cost of the traversal itself. Printing goes to
+an in-memory buffer.
+
+Usage: python -m tools.benchmarks.visitors [nodes]
+"""
+import gc
+import io
+import random
+import sys
+import time
+
+from collections import deque
+
+from pylox.parser import BinaryOp, Constant, UnaryOp
+from pylox.token import TokenType
+from pylox.traverse import fold, walk
+from pylox.visitor import Visitor
+
+
+def tree(nodes: int):
+    """A balanced tree of additions and negations over constants"""
+    rng = random.Random(0)
+    level = deque(Constant(float(i)) for i in range(nodes // 2 + 1))
+    while len(level) > 1:
+        left, right = level.popleft(), level.popleft()
+        if rng.random() < 0.2:
+            right = UnaryOp(TokenType.MINUS, right)
+        level.append(BinaryOp(left, TokenType.PLUS, right))
+    return level[0]
+
+
+class Counter(Visitor):
+    def visitBinaryOp(self, node, values):
+        return 1 + values[0] + values[1]
+
+    def visitUnaryOp(self, node, values):
+        return 1 + values[0]
+
+    def visitConstant(self, node, values):
+        return 1
+
+
+class NamedCounter(Counter):
+    """Builds the method name and looks it up for every node"""
+
+    def visit(self, node, *args):
+        return getattr(self, f"visit{type(node).__name__}")(node, *args)
+
+
+def timed(fn, repeat: int = 3):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        gc.enable()
+    return result, min(times)
+
+
+def main(nodes: int = 1000000) -> None:
+    root = tree(nodes)
+    count, elapsed = timed(lambda: sum(1 for _ in walk(root)))
+    print(f"{count:,} nodes")
+    print(f"walk:              {elapsed:8.3f}s")
+
+    for visitor in (NamedCounter(), Counter()):
+        result, elapsed = timed(lambda: fold(root, visitor.visit))
+        assert result == count
+        print(f"{type(visitor).__name__ + ' fold:':<19}{elapsed:8.3f}s")
+
+    _, elapsed = timed(lambda: root.print(file=io.StringIO()))
+    print(f"print:             {elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""Compares the bytecode VM with the AST evaluators.
+
+Runs the expression statements from the parser tests, repeated to make a
+larger program. Compiling is timed separately from running, since a
+compiled program is meant to be run more than once.
+
+Usage: python -m tools.benchmarks.vm [repeat]
+"""
+import gc
+import sys
+import time
+
+from pylox.bytecode import compileExprs
+from pylox.evaluator import compileExpr, evaluate
+from pylox.parser import Parser
+from pylox.scanner import Scanner
+from pylox.token import Token, TokenType
+from pylox.vm import VM
+
+PROGRAM = """
+1.4 + 2; 3.1465-4; 5.2 * 6; 7/8.1;
+1==1;
+2!=1==false;
+"test"=="test";
+2.1234/-3 + 1;
+1 - 2 - 3; - - 1;
+!(5 > -1.2/4.4 + -2 - (3+5) * 6.5 * 7) == (1 != 2) != (true == false);
+"""
+
+
+def best(fn, *args):
+    """Fastest of three runs with the collector off, and its result"""
+    times = []
+    for _ in range(3):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+        gc.enable()
+
+    return min(times), result
+
+
+def walk(nodes):
+    return [evaluate(node) for node in nodes]
+
+
+def closures(compiled):
+    return [run() for run in compiled]
+
+
+def main(repeat: int = 10000) -> None:
+    tokens = list(Scanner.scanText(PROGRAM.replace("\n", " "))) * repeat
+    nodes = Parser(tokens + [Token(TokenType.EOF, "", 0)]).parse()
+
+    compile_time, chunk = best(compileExprs, nodes)
+    closure_compile_time, compiled = best(
+        lambda: [compileExpr(node) for node in nodes])
+    print(f"{'compile':>10}: bytecode {compile_time:6.3f}s "
+          f"({len(chunk.code):,} bytes, {len(chunk.constants)} constants), "
+          f"closures {closure_compile_time:6.3f}s")
+
+    results = {}
+    expected = None
+    for name, fn, arg in (("walker", walk, nodes),
+                          ("closures", closures, compiled),
+                          ("vm", VM().run, chunk)):
+        elapsed, values = best(fn, arg)
+        expected = expected or values
+        assert values == expected
+        results[name] = elapsed
+        print(f"{name:>10}: {len(nodes) / elapsed:12,.0f} statements/s "
+              f"{elapsed:6.3f}s")
+
+    for name, elapsed in results.items():
+        print(f"{name:>10}: {results['walker'] / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))